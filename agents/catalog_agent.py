@@ -3,9 +3,134 @@ Catalog agent for fetching and managing outfit items from the Roblox catalog.
 This agent handles communication with external APIs and catalog data management.
 """
 
-from typing import List, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Union
+import asyncio
+import logging
+import os
 import random
-from .contracts import TagSpec, CatalogItem, RecommendIn
+from .contracts import TagSpec, CatalogItem, OutfitRecord, RecommendIn
+from . import catalog_store, embeddings, outfit_solver
+from .rules import get_rules
+
+logger = logging.getLogger(__name__)
+
+# Minimum local results for a part (capped at the candidates requested) before the network
+# fetcher is skipped; fewer local matches are too thin a pool to rank from
+STORE_MIN_RESULTS = int(os.getenv("CATALOG_STORE_MIN_RESULTS", "20"))
+
+# Async catalog source: (theme, part, limit) -> items exposing `assetId` and `type`, either
+# all at once (an awaitable list) or page by page (an async iterator of lists)
+CatalogFetcher = Callable[[str, str, int], Union[Awaitable[List[Any]], AsyncIterator[List[Any]]]]
+
+
+async def iter_part(
+    tag_spec: TagSpec,
+    part: str,
+    fetcher: Optional[CatalogFetcher] = None,
+    limit: int = 10
+) -> AsyncIterator[List[OutfitRecord]]:
+    """
+    Fetch candidate catalog items for one outfit part, yielding them in batches.
+    The local catalog store is queried first (theme keyword, part as item type,
+    TagSpec.budget as the per-item price cap), then the embedding index of the
+    store for items semantically close to the original prompt, both in a worker
+    thread; the network fetcher is only used when both have fewer than
+    CATALOG_STORE_MIN_RESULTS matches, and its items priced above TagSpec.budget
+    are dropped. A paginating fetcher's pages are yielded
+    as they arrive; local results come as a single batch.
+    
+    Args:
+        tag_spec: Style specification whose theme drives the search
+        part: Outfit part to search for (e.g. "shirt", "Back Accessory")
+        fetcher: Async catalog source; the local sample catalog is used if None
+        limit: Maximum number of candidates in all batches together
+        
+    Yields:
+        Lists of OutfitRecord candidates for the part
+    """
+    local = await asyncio.to_thread(_local_candidates, tag_spec, part, limit)
+    if local is not None:
+        yield local
+        return
+    
+    if fetcher is None:
+        yield _network_records(run(TagSpec(theme=tag_spec.theme, parts=[part])), tag_spec)[:limit]
+        return
+    result = fetcher(tag_spec.theme, part, limit)
+    if not hasattr(result, "__aiter__"):
+        yield _network_records(await result, tag_spec)[:limit]
+        return
+    count = 0
+    try:
+        async for page in result:
+            records = _network_records(page, tag_spec)[:limit - count]
+            if records:
+                count += len(records)
+                yield records
+            if count >= limit:
+                break
+    finally:
+        await result.aclose()
+
+
+async def fetch_part(
+    tag_spec: TagSpec,
+    part: str,
+    fetcher: Optional[CatalogFetcher] = None,
+    limit: int = 10
+) -> List[OutfitRecord]:
+    """
+    Fetch candidate catalog items for one outfit part (all batches of `iter_part`).
+    
+    Args:
+        tag_spec: Style specification whose theme drives the search
+        part: Outfit part to search for (e.g. "shirt", "Back Accessory")
+        fetcher: Async catalog source; the local sample catalog is used if None
+        limit: Maximum number of candidates to return
+        
+    Returns:
+        List of OutfitRecord candidates for the part
+    """
+    records: List[OutfitRecord] = []
+    async for batch in iter_part(tag_spec, part, fetcher, limit):
+        records.extend(batch)
+    return records
+
+
+def _local_candidates(tag_spec: TagSpec, part: str, limit: int) -> Optional[List[OutfitRecord]]:
+    """
+    Candidates from the local catalog store or its embedding index, or None if they have too few.
+    Blocking (SQLite and NumPy), so it is run in a worker thread.
+    """
+    min_results = max(1, min(STORE_MIN_RESULTS, limit))
+    store = catalog_store.get_store()
+    if store is not None:
+        try:
+            records = store.search(tag_spec.theme, types=[part], max_price=tag_spec.budget, limit=limit)
+        except Exception as e:
+            logger.warning(f"Local catalog search failed for theme '{tag_spec.theme}', part '{part}': {e}")
+            records = []
+        if len(records) >= min_results:
+            return [OutfitRecord(str(record.asset_id), record.type, record.price, record.favorites)
+                    for record in records]
+        
+        index = embeddings.get_asset_index()
+        if index is not None:
+            hits = index.search(tag_spec.prompt or tag_spec.theme, item_type=part, k=limit,
+                                max_price=tag_spec.budget, min_score=embeddings.ASSET_MIN_SCORE)
+            if hits and len(hits) >= min_results:
+                return [OutfitRecord(str(asset_id), item_type, price) for asset_id, item_type, _, price in hits]
+    return None
+
+
+def _network_records(items: List[Any], tag_spec: TagSpec) -> List[OutfitRecord]:
+    """Convert fetched items to OutfitRecords, dropping those priced above TagSpec.budget."""
+    records = [item if isinstance(item, OutfitRecord) else OutfitRecord(str(item.assetId), item.type)
+               for item in items]
+    if tag_spec.budget is not None:
+        # Network and sample items without a known price are kept
+        records = [record for record in records if record.price is None or record.price <= tag_spec.budget]
+    return records
 
 
 def run(input_data: Union[TagSpec, RecommendIn]) -> List[CatalogItem]:
@@ -18,24 +143,17 @@ def run(input_data: Union[TagSpec, RecommendIn]) -> List[CatalogItem]:
     Returns:
         List of CatalogItem objects matching the specifications
     """
+    rules = get_rules()
+    
     if isinstance(input_data, TagSpec):
         # Handle TagSpec input for detailed catalog search
-        theme = input_data.theme.lower()
-        parts = input_data.parts or ["shirt", "pants", "shoes", "accessories"]
+        parts = input_data.parts or list(rules.theme_parts[0])
         
         # Generate catalog items based on theme and parts specification
         catalog_items = []
         
-        # Sample asset ID base numbers for different themes
-        theme_bases = {
-            "formal": 7890000000,
-            "casual": 1234000000,
-            "sporty": 1356000000,
-            "gothic": 1912000000,
-            "kawaii": 2578000000
-        }
-        
-        base_id = theme_bases.get(theme, 1000000000)
+        # Sample asset ID base number of the theme
+        base_id = rules.theme_asset_base[rules.theme_id(input_data.theme)]
         
         for i, part in enumerate(parts[:6]):  # Limit to 6 items
             asset_id = str(base_id + i * 111111)
@@ -45,52 +163,14 @@ def run(input_data: Union[TagSpec, RecommendIn]) -> List[CatalogItem]:
     
     elif isinstance(input_data, RecommendIn):
         # Handle RecommendIn input for basic theme-based search
-        theme = input_data.theme.lower()
-        
-        # Sample catalog data for different themes
-        sample_catalogs = {
-            "formal": [
-                CatalogItem(assetId="7890123456", type="shirt"),
-                CatalogItem(assetId="8901234567", type="pants"),
-                CatalogItem(assetId="9012345678", type="tie"),
-                CatalogItem(assetId="1023456789", type="shoes"),
-                CatalogItem(assetId="1134567890", type="jacket")
-            ],
-            "casual": [
-                CatalogItem(assetId="1234567890", type="shirt"),
-                CatalogItem(assetId="2345678901", type="pants"),
-                CatalogItem(assetId="3456789012", type="hat"),
-                CatalogItem(assetId="4567890123", type="shoes"),
-                CatalogItem(assetId="5678901234", type="accessory")
-            ],
-            "sporty": [
-                CatalogItem(assetId="1356789012", type="jersey"),
-                CatalogItem(assetId="1467890123", type="shorts"),
-                CatalogItem(assetId="1578901234", type="sneakers"),
-                CatalogItem(assetId="1689012345", type="cap"),
-                CatalogItem(assetId="1790123456", type="socks")
-            ],
-            "gothic": [
-                CatalogItem(assetId="1912345678", type="shirt"),
-                CatalogItem(assetId="2023456789", type="pants"),
-                CatalogItem(assetId="2134567890", type="boots"),
-                CatalogItem(assetId="2245678901", type="cape"),
-                CatalogItem(assetId="2356789012", type="necklace")
-            ],
-            "kawaii": [
-                CatalogItem(assetId="2578901234", type="dress"),
-                CatalogItem(assetId="2689012345", type="bow"),
-                CatalogItem(assetId="2790123456", type="shoes"),
-                CatalogItem(assetId="2801234567", type="bag"),
-                CatalogItem(assetId="2912345678", type="hairpin")
-            ]
-        }
-        
-        # Get catalog items for the theme, or use casual as default
-        catalog_items = sample_catalogs.get(theme, sample_catalogs["casual"])
+        # Sample catalog data of the theme (unknown themes get the rules' fallback mix)
+        catalog_items = [CatalogItem(assetId=item.assetId, type=item.type)
+                         for item in rules.theme_samples[rules.theme_id(input_data.theme)]]
         
-        # Randomize and return 6-10 items (or all available if fewer than 6)
+        # Randomize and return 6-10 items (or all available if fewer than 6),
+        # one of each item type before any type repeats
         random.shuffle(catalog_items)
+        catalog_items = outfit_solver.spread_by_type(catalog_items)
         max_items = min(10, len(catalog_items))
         min_items = min(6, len(catalog_items))
         num_items = random.randint(min_items, max_items) if max_items > min_items else max_items
@@ -0,0 +1,306 @@
+"""
+Local persistent catalog store backed by SQLite with an FTS5 full-text index.
+Holds catalog assets (type, theme tags, price, favorite count, creator) so the
+catalog agent can answer keyword + type + budget queries locally before going to
+the network.
+
+Command line usage:
+    python -m agents.catalog_store import items.jsonl   # one JSON asset per line
+    python -m agents.catalog_store search "gothic" --type shirt --max-price 100
+    python -m agents.catalog_store stats
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv(
+    "CATALOG_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "catalog.sqlite3")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    asset_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL,
+    themes TEXT NOT NULL DEFAULT '',
+    price INTEGER,
+    creator TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL,
+    favorites INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_assets_type_price ON assets (type, price);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS assets_fts USING fts5(
+    name, themes, content='assets', content_rowid='asset_id'
+);
+CREATE TRIGGER IF NOT EXISTS assets_ai AFTER INSERT ON assets BEGIN
+    INSERT INTO assets_fts (rowid, name, themes) VALUES (new.asset_id, new.name, new.themes);
+END;
+CREATE TRIGGER IF NOT EXISTS assets_ad AFTER DELETE ON assets BEGIN
+    INSERT INTO assets_fts (assets_fts, rowid, name, themes) VALUES ('delete', old.asset_id, old.name, old.themes);
+END;
+CREATE TRIGGER IF NOT EXISTS assets_au AFTER UPDATE ON assets BEGIN
+    INSERT INTO assets_fts (assets_fts, rowid, name, themes) VALUES ('delete', old.asset_id, old.name, old.themes);
+    INSERT INTO assets_fts (rowid, name, themes) VALUES (new.asset_id, new.name, new.themes);
+END;
+"""
+
+
+_COLUMNS = "a.asset_id, a.name, a.type, a.themes, a.price, a.creator, a.favorites"
+
+
+class CatalogRecord(NamedTuple):
+    """One catalog asset as stored locally."""
+    asset_id: int
+    name: str
+    type: str
+    themes: str
+    price: Optional[int]
+    creator: str
+    favorites: Optional[int] = None
+
+
+class CatalogStore:
+    """
+    SQLite-backed catalog index.
+    Types and theme tags are stored lowercased; themes are space-separated tags.
+    Each thread gets its own connection, so queries can run in worker threads
+    (e.g. via asyncio.to_thread) instead of blocking the event loop.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway store)
+        """
+        self.path = path
+        if path == ":memory:":
+            # A named shared-cache database, so every thread's connection sees the same data.
+            # The name must be unique: a recycled id() would reopen a dead store's data while
+            # its worker-thread connections are still alive.
+            self._uri = f"file:catalog-store-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._uri = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        conn = self._conn
+        conn.executescript(_SCHEMA)
+        if "favorites" not in {row[1] for row in conn.execute("PRAGMA table_info(assets)")}:
+            conn.execute("ALTER TABLE assets ADD COLUMN favorites INTEGER")
+        try:
+            conn.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite FTS5 is not available, catalog keyword search falls back to LIKE")
+            self.fts = False
+        conn.commit()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._uri, uri=self.path == ":memory:", check_same_thread=False)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Close every thread's connection."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+
+    def upsert_many(self, records: Iterable[CatalogRecord]) -> int:
+        """
+        Insert or replace assets in one transaction.
+
+        Args:
+            records: Assets to store
+
+        Returns:
+            Number of records written
+        """
+        now = time.time()
+        rows = [
+            (int(r.asset_id), r.name or "", r.type.lower(), " ".join(r.themes.lower().split()),
+             r.price, r.creator or "", now, r.favorites)
+            for r in records
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO assets (asset_id, name, type, themes, price, creator, updated_at, favorites) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(asset_id) DO UPDATE SET name=excluded.name, type=excluded.type, "
+                "themes=CASE WHEN instr(' ' || assets.themes || ' ', ' ' || excluded.themes || ' ') > 0 "
+                "THEN assets.themes ELSE trim(assets.themes || ' ' || excluded.themes) END, "
+                "price=excluded.price, creator=excluded.creator, updated_at=excluded.updated_at, "
+                "favorites=coalesce(excluded.favorites, assets.favorites)",
+                rows
+            )
+        return len(rows)
+
+    def search(
+        self,
+        keyword: Optional[str] = None,
+        types: Optional[Sequence[str]] = None,
+        max_price: Optional[int] = None,
+        limit: int = 20
+    ) -> List[CatalogRecord]:
+        """
+        Find assets by keyword (name or theme tags), type and price.
+
+        Args:
+            keyword: Words that must all appear in the name or theme tags
+            types: Allowed item types (case-insensitive)
+            max_price: Maximum price per item; assets without a price are excluded
+            limit: Maximum number of results
+
+        Returns:
+            Matching records, most relevant first (FTS5 bm25 rank; most recently
+            updated first without a keyword or without FTS5)
+        """
+        clauses: List[str] = []
+        params: List = []
+        words = [w for w in (keyword or "").lower().split() if w]
+
+        if words and self.fts:
+            query = " ".join('"' + w.replace('"', '""') + '"' for w in words)
+            sql = (f"SELECT {_COLUMNS} "
+                   "FROM assets_fts JOIN assets a ON a.asset_id = assets_fts.rowid "
+                   "WHERE assets_fts MATCH ?")
+            params.append(query)
+            order = "assets_fts.rank"
+        else:
+            sql = f"SELECT {_COLUMNS} FROM assets a WHERE 1=1"
+            order = "a.updated_at DESC"
+            for word in words:
+                clauses.append("(a.name LIKE ? OR a.themes LIKE ?)")
+                params.extend([f"%{word}%", f"%{word}%"])
+
+        if types:
+            clauses.append(f"a.type IN ({','.join('?' * len(types))})")
+            params.extend(t.lower() for t in types)
+        if max_price is not None:
+            clauses.append("a.price IS NOT NULL AND a.price <= ?")
+            params.append(max_price)
+
+        for clause in clauses:
+            sql += " AND " + clause
+        # Ordering has to score every match, so broad theme queries cost more than a bare
+        # LIMIT; callers run searches off the event loop
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+        return [CatalogRecord(*row) for row in self._conn.execute(sql, params)]
+
+    def iter_records(self) -> Iterator[CatalogRecord]:
+        """Stream every stored asset (used to build the embedding index)."""
+        cursor = self._conn.execute(f"SELECT {_COLUMNS} FROM assets a")
+        for row in cursor:
+            yield CatalogRecord(*row)
+
+    def stats(self) -> dict:
+        count, newest = self._conn.execute("SELECT COUNT(*), MAX(updated_at) FROM assets").fetchone()
+        return {
+            "path": self.path,
+            "assets": count,
+            "fts": self.fts,
+            "last_update_age": round(time.time() - newest, 1) if newest else None,
+        }
+
+
+_store: Optional[CatalogStore] = None
+
+
+def get_store() -> Optional[CatalogStore]:
+    """
+    Return the shared store at CATALOG_DB_PATH, opening it on first use.
+    Returns None when the store is disabled (CATALOG_STORE_ENABLED=0).
+    """
+    global _store
+    if os.getenv("CATALOG_STORE_ENABLED", "1").lower() not in ("1", "true", "yes"):
+        return None
+    if _store is None:
+        _store = CatalogStore(DEFAULT_DB_PATH)
+    return _store
+
+
+def _record_from_json(obj: dict) -> CatalogRecord:
+    themes = obj.get("themes", "")
+    if isinstance(themes, list):
+        themes = " ".join(themes)
+    return CatalogRecord(
+        asset_id=int(obj["assetId"] if "assetId" in obj else obj["id"]),
+        name=obj.get("name", ""),
+        type=obj.get("type", "accessory"),
+        themes=themes,
+        price=obj.get("price"),
+        creator=obj.get("creator", ""),
+        favorites=obj.get("favorites")
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the local catalog store")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Import assets from a JSON-lines file")
+    imp.add_argument("file")
+    srch = sub.add_parser("search", help="Search the store")
+    srch.add_argument("keyword", nargs="?")
+    srch.add_argument("--type", action="append")
+    srch.add_argument("--max-price", type=int)
+    srch.add_argument("--limit", type=int, default=20)
+    sub.add_parser("stats", help="Show store statistics")
+    args = parser.parse_args(argv)
+
+    store = CatalogStore(args.db)
+    if args.command == "import":
+        batch: List[CatalogRecord] = []
+        total = 0
+        with open(args.file) as f:
+            for line in f:
+                if line.strip():
+                    batch.append(_record_from_json(json.loads(line)))
+                if len(batch) >= 10000:
+                    total += store.upsert_many(batch)
+                    batch = []
+        total += store.upsert_many(batch)
+        print(f"Imported {total} assets into {args.db}")
+    elif args.command == "search":
+        started = time.perf_counter()
+        records = store.search(args.keyword, args.type, args.max_price, args.limit)
+        for record in records:
+            print(json.dumps(record._asdict()))
+        print(f"{len(records)} results in {(time.perf_counter() - started) * 1000:.2f}ms", file=sys.stderr)
+    else:
+        print(json.dumps(store.stats(), indent=2))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -24,14 +24,18 @@ class RecommendIn(BaseModel):
     """Input contract for recommendation functionality."""
     theme: str = Field(..., description="Theme for outfit recommendations")
     user_id: int = Field(..., description="User ID")
+    budget: Optional[int] = Field(None, description="Maximum price in Robux per outfit item")
+    outfit_budget: Optional[int] = Field(None, description="Maximum total price in Robux for the outfit")
 
 
 class TagSpec(BaseModel):
     """Specification for tagging and filtering outfit recommendations."""
     theme: str = Field(..., description="Primary theme for the outfit")
     vibe: Optional[str] = Field(None, description="Additional vibe or mood specification")
-    budget: Optional[int] = Field(None, description="Budget limit for the outfit")
+    budget: Optional[int] = Field(None, description="Budget limit per outfit item")
+    outfit_budget: Optional[int] = Field(None, description="Budget limit for the whole outfit")
     parts: Optional[List[str]] = Field(None, description="Specific parts to include in the outfit")
+    prompt: Optional[str] = Field(None, description="Original free-text theme when it was resolved to a known theme")
 
 
 class CatalogItem(BaseModel):
@@ -40,6 +44,37 @@ class CatalogItem(BaseModel):
     type: str = Field(..., description="Type of outfit item")
 
 
+class OutfitRecord:
+    """
+    Lightweight catalog item for hot paths.
+    Carries the same fields as CatalogItem without per-instance validation, so
+    catalog pages and pipeline results can be built and serialized cheaply.
+    The price (Robux, None if unknown) is used for budgets and the favorite
+    count (None if unknown) for ranking; neither is serialized.
+    """
+
+    __slots__ = ("assetId", "type", "price", "favorites")
+
+    def __init__(self, assetId: str, type: str, price: Optional[int] = None, favorites: Optional[int] = None):
+        self.assetId = assetId
+        self.type = type
+        self.price = price
+        self.favorites = favorites
+
+    def as_dict(self) -> dict:
+        """Wire representation, identical to CatalogItem.model_dump()."""
+        return {"assetId": self.assetId, "type": self.type}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, OutfitRecord) and other.assetId == self.assetId and other.type == self.type
+
+    def __hash__(self) -> int:
+        return hash((self.assetId, self.type))
+
+    def __repr__(self) -> str:
+        return f"OutfitRecord(assetId={self.assetId!r}, type={self.type!r})"
+
+
 class RecommendOut(BaseModel):
     """Output contract for recommendation functionality."""
     success: bool = Field(..., description="Whether the request was successful")
@@ -0,0 +1,452 @@
+"""
+Hashed n-gram embeddings and CPU nearest-neighbour search for semantic matching.
+Text is embedded without a model: word tokens and their character trigrams are
+hashed into a fixed number of signed buckets and the vector is L2-normalized,
+so related spellings ("pirates", "pirate captain") land close together.
+
+Two indexes use these vectors:
+- ThemeIndex: one row per descriptive phrase of every theme in the rules (name,
+  keywords, description clauses); a theme scores its best phrase. It is built
+  from the live rules in well under a millisecond, so it follows hot reloads.
+- AssetIndex: catalog item names and theme tags from the local catalog store,
+  built offline into .npy files that are memory-mapped at startup and searched
+  with a brute-force matrix-vector product over the rows of one item type.
+
+Command line usage:
+    python -m agents.embeddings build              # embed the local catalog store
+    python -m agents.embeddings query "pirate captain" --type hat
+    python -m agents.embeddings stats
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import catalog_store
+from .keyword_matcher import tokenize
+from .lazy import lazy_import
+from .rules import CompiledRules, get_rules
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "EMBEDDING_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "embeddings")
+)
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))
+# Minimum cosine similarity for a free-text prompt to resolve to a theme / to accept a local asset
+THEME_MIN_SCORE = float(os.getenv("EMBEDDING_THEME_MIN_SCORE", "0.45"))
+ASSET_MIN_SCORE = float(os.getenv("EMBEDDING_ASSET_MIN_SCORE", "0.5"))
+INDEX_RELOAD_INTERVAL = float(os.getenv("EMBEDDING_RELOAD_INTERVAL", "30"))
+
+FORMAT_VERSION = 1
+
+# Filler words of outfit prompts that say nothing about the style
+_STOPWORDS = frozenset(
+    "a an the and or of in on at with for to from my me i i'm im want wanna need like look looking "
+    "make give get some something outfit outfits style styles clothes clothing wear wearing dress up "
+    "as be can you please could would should it is are this that".split()
+)
+_WORD_WEIGHT = 1.0
+_TRIGRAM_WEIGHT = 0.5
+
+
+def features(text: str) -> List[Tuple[str, float]]:
+    """Weighted hashing features of text: content words and their boundary-marked character trigrams."""
+    out: List[Tuple[str, float]] = []
+    for token in tokenize(text):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s"):
+            token = token[:-1]
+        out.append(("w:" + token, _WORD_WEIGHT))
+        marked = f"<{token}>"
+        out.extend((marked[i:i + 3], _TRIGRAM_WEIGHT) for i in range(len(marked) - 2))
+    return out
+
+
+@lru_cache(maxsize=4096)
+def _embed(text: str, dim: int):
+    buckets: List[int] = []
+    weights: List[float] = []
+    for feature, weight in features(text):
+        h = zlib.crc32(feature.encode())
+        buckets.append(h % dim)
+        weights.append(weight if h & 0x80000000 else -weight)
+    vector = np.bincount(buckets, weights=weights, minlength=dim).astype(np.float32) if buckets \
+        else np.zeros(dim, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if norm:
+        vector /= norm
+    vector.flags.writeable = False
+    return vector
+
+
+def embed(text: str, dim: int = EMBEDDING_DIM):
+    """
+    Embed text as a unit-length float32 vector (all zeros if it has no content words).
+
+    Args:
+        text: Free text (prompt, theme phrase or item name)
+        dim: Number of hash buckets
+
+    Returns:
+        Read-only NumPy vector of shape (dim,); repeated texts are served from a small LRU cache
+    """
+    return _embed(" ".join(text.lower().split()), dim)
+
+
+class ThemeIndex:
+    """Phrase vectors of every theme of one CompiledRules, grouped by theme."""
+
+    __slots__ = ("rules", "dim", "vectors", "starts", "themes")
+
+    def __init__(self, rules: CompiledRules, dim: int = EMBEDDING_DIM):
+        """
+        Args:
+            rules: Compiled rules whose theme phrases are embedded
+            dim: Embedding dimension
+        """
+        self.rules = rules
+        self.dim = dim
+        rows: List[Any] = []
+        starts: List[int] = []
+        themes: List[str] = []
+        for theme_id, theme in enumerate(rules.themes, start=1):
+            vectors = [v for v in (embed(phrase, dim) for phrase in rules.theme_phrases[theme_id]) if v.any()]
+            if vectors:
+                starts.append(len(rows))
+                themes.append(theme)
+                rows.extend(vectors)
+        self.vectors = np.stack(rows) if rows else np.zeros((0, dim), dtype=np.float32)
+        self.starts = np.asarray(starts, dtype=np.intp)
+        self.themes: Tuple[str, ...] = tuple(themes)
+
+    def scores(self, text: str):
+        """Best phrase similarity of text to each theme, in `themes` order."""
+        query = embed(text, self.dim)
+        if not self.themes or not query.any():
+            return np.zeros(len(self.themes), dtype=np.float32)
+        return np.maximum.reduceat(self.vectors @ query, self.starts)
+
+    def rank(self, text: str, k: int = 3) -> List[Tuple[str, float]]:
+        """The k themes most similar to text, best first, as (theme, score) pairs."""
+        scores = self.scores(text)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(self.themes[i], round(float(scores[i]), 4)) for i in order]
+
+    def resolve(self, text: str, min_score: float = THEME_MIN_SCORE) -> Optional[str]:
+        """The most similar theme if it scores at least min_score, else None."""
+        best = self.rank(text, 1)
+        return best[0][0] if best and best[0][1] >= min_score else None
+
+
+class AssetIndex:
+    """
+    Memory-mapped catalog item vectors, with rows sorted by item type.
+    Files in the index directory: vectors.npy (float32, assets x dim), asset_ids.npy,
+    prices.npy (int64, -1 when unknown) and meta.json (dimension, type row ranges).
+    """
+
+    __slots__ = ("path", "dim", "vectors", "asset_ids", "prices", "type_ranges", "built_at", "source")
+
+    def __init__(self, path: str):
+        """
+        Open an index directory written by build_asset_index.
+
+        Args:
+            path: Index directory
+
+        Raises:
+            OSError: If a file is missing
+            ValueError: If the files are inconsistent or of an unknown format
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported embedding index format {meta.get('format')!r}")
+        self.path = path
+        self.dim = int(meta["dim"])
+        self.built_at = meta.get("built_at")
+        self.source = meta.get("source")
+        # Plain ndarray views of the mappings: np.memmap results carry per-operation overhead
+        self.vectors = np.asarray(np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"))
+        self.asset_ids = np.asarray(np.load(os.path.join(path, "asset_ids.npy"), mmap_mode="r"))
+        self.prices = np.asarray(np.load(os.path.join(path, "prices.npy"), mmap_mode="r"))
+        self.type_ranges: Dict[str, Tuple[int, int]] = {
+            item_type: (int(start), int(end)) for item_type, (start, end) in meta["types"].items()
+        }
+        n = int(meta["assets"])
+        if self.vectors.shape != (n, self.dim) or self.asset_ids.shape != (n,) or self.prices.shape != (n,):
+            raise ValueError(f"embedding index files in {path} do not match meta.json")
+
+    def __len__(self) -> int:
+        return self.asset_ids.shape[0]
+
+    def search(
+        self,
+        text: str,
+        item_type: Optional[str] = None,
+        k: int = 10,
+        max_price: Optional[int] = None,
+        min_score: float = 0.0
+    ) -> List[Tuple[int, str, float, Optional[int]]]:
+        """
+        Find the catalog items most similar to text.
+
+        Args:
+            text: Free-text query (theme or prompt)
+            item_type: Only search items of this type (case-insensitive)
+            k: Maximum number of results
+            max_price: Maximum price per item; items without a price are excluded
+            min_score: Minimum cosine similarity
+
+        Returns:
+            (asset_id, item type, score, price or None) tuples, best first
+        """
+        query = embed(text, self.dim)
+        if not query.any():
+            return []
+        if item_type is not None:
+            ranges = [(item_type.lower(), self.type_ranges.get(item_type.lower()))]
+        else:
+            ranges = list(self.type_ranges.items())
+        results: List[Tuple[int, str, float, Optional[int]]] = []
+        for name, bounds in ranges:
+            if bounds is None or bounds[0] == bounds[1]:
+                continue
+            start, end = bounds
+            scores = self.vectors[start:end] @ query
+            if max_price is not None:
+                prices = self.prices[start:end]
+                scores = np.where((prices >= 0) & (prices <= max_price), scores, -1.0)
+            top = min(k, scores.shape[0])
+            candidates = np.argpartition(-scores, top - 1)[:top]
+            for i in candidates:
+                if scores[i] >= min_score and scores[i] > -1.0:
+                    price = int(self.prices[start + i])
+                    results.append((int(self.asset_ids[start + i]), name, round(float(scores[i]), 4),
+                                    price if price >= 0 else None))
+        results.sort(key=lambda hit: -hit[2])
+        return results[:k]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "assets": len(self),
+            "dim": self.dim,
+            "types": len(self.type_ranges),
+            "built_at": self.built_at,
+        }
+
+
+def build_asset_index(
+    records: Iterable[catalog_store.CatalogRecord],
+    path: str = DEFAULT_INDEX_PATH,
+    dim: int = EMBEDDING_DIM,
+    chunk_size: int = 10000
+) -> int:
+    """
+    Embed catalog records (name and theme tags) into an index directory.
+    Vectors are written in chunks straight into a memory-mapped .npy file, and each
+    file is swapped in with an atomic rename (meta.json last), so a running server
+    picks up the new index on its next reload check.
+
+    Args:
+        records: Catalog assets to index
+        path: Output directory
+        dim: Embedding dimension
+        chunk_size: Rows embedded per write
+
+    Returns:
+        Number of assets indexed
+    """
+    rows = sorted(
+        ((r.type.lower(), int(r.asset_id), -1 if r.price is None else int(r.price), f"{r.name} {r.themes}")
+         for r in records),
+        key=lambda row: row[0]
+    )
+    os.makedirs(path, exist_ok=True)
+    n = len(rows)
+    vectors = np.lib.format.open_memmap(os.path.join(path, "vectors.npy.tmp"), mode="w+",
+                                        dtype=np.float32, shape=(n, dim))
+    for start in range(0, n, chunk_size):
+        chunk = rows[start:start + chunk_size]
+        vectors[start:start + len(chunk)] = np.stack([_embed_uncached(row[3], dim) for row in chunk])
+    vectors.flush()
+    del vectors
+    with open(os.path.join(path, "asset_ids.npy.tmp"), "wb") as f:
+        np.save(f, np.asarray([row[1] for row in rows], dtype=np.int64))
+    with open(os.path.join(path, "prices.npy.tmp"), "wb") as f:
+        np.save(f, np.asarray([row[2] for row in rows], dtype=np.int64))
+
+    types: Dict[str, List[int]] = {}
+    for i, row in enumerate(rows):
+        bounds = types.setdefault(row[0], [i, i])
+        bounds[1] = i + 1
+    with open(os.path.join(path, "meta.json.tmp"), "w") as f:
+        json.dump({"format": FORMAT_VERSION, "dim": dim, "assets": n, "types": types,
+                   "built_at": time.time(), "source": catalog_store.DEFAULT_DB_PATH}, f)
+    for name in ("vectors.npy", "asset_ids.npy", "prices.npy", "meta.json"):
+        os.replace(os.path.join(path, name + ".tmp"), os.path.join(path, name))
+    return n
+
+
+def _embed_uncached(text: str, dim: int):
+    # Bulk builds bypass the LRU cache so they don't evict the live prompts
+    return _embed.__wrapped__(" ".join(text.lower().split()), dim)
+
+
+class AssetIndexLoader:
+    """Holds the memory-mapped AssetIndex of a directory and reopens it when meta.json changes."""
+
+    def __init__(self, path: str, reload_interval: float = INDEX_RELOAD_INTERVAL):
+        """
+        Args:
+            path: Index directory
+            reload_interval: Minimum seconds between mtime checks
+        """
+        self.path = path
+        self.reload_interval = reload_interval
+        self._index: Optional[AssetIndex] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked: Optional[float] = None
+        self.reloads = 0
+        self.errors = 0
+
+    def get(self) -> Optional[AssetIndex]:
+        """Return the active index (None if none has been built), reopening it first if it changed."""
+        now = time.monotonic()
+        if self._checked is None or now - self._checked >= self.reload_interval:
+            self._checked = now
+            self.reload()
+        return self._index
+
+    def reload(self) -> bool:
+        """
+        Reopen the index if meta.json changed. An index that fails to open is logged and the
+        previous one stays active.
+
+        Returns:
+            True if a new index was activated
+        """
+        try:
+            stat = os.stat(os.path.join(self.path, "meta.json"))
+        except OSError:
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+        try:
+            index = AssetIndex(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            self.errors += 1
+            logger.error(f"Failed to open embedding index {self.path}: {e}")
+            return False
+        if self._index is not None:
+            self.reloads += 1
+        logger.info(f"Opened embedding index {self.path} ({len(index)} assets, dim {index.dim})")
+        self._index = index
+        self._signature = signature
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._index.stats() if self._index is not None else {"path": self.path, "assets": 0}
+        stats.update(reloads=self.reloads, errors=self.errors)
+        return stats
+
+
+_asset_loader = AssetIndexLoader(DEFAULT_INDEX_PATH)
+_theme_index: Optional[ThemeIndex] = None
+_resolutions = {"semantic": 0, "unresolved": 0}
+
+
+def theme_index(rules: Optional[CompiledRules] = None) -> ThemeIndex:
+    """Return the ThemeIndex of the given (default: live) rules, rebuilding it when the rules change."""
+    global _theme_index
+    rules = rules if rules is not None else get_rules()
+    index = _theme_index
+    if index is None or index.rules is not rules:
+        index = ThemeIndex(rules)
+        _theme_index = index
+    return index
+
+
+def resolve_theme(text: str, rules: Optional[CompiledRules] = None) -> Optional[str]:
+    """
+    Resolve a free-text prompt without keyword hits to the most similar known theme.
+
+    Args:
+        text: Free text
+        rules: Rules to resolve against (the live rules if None)
+
+    Returns:
+        The theme name, or None if no theme scores at least EMBEDDING_THEME_MIN_SCORE
+    """
+    theme = theme_index(rules).resolve(text)
+    _resolutions["semantic" if theme else "unresolved"] += 1
+    return theme
+
+
+def get_asset_index() -> Optional[AssetIndex]:
+    """Return the catalog item index at EMBEDDING_INDEX_PATH, or None if it has not been built."""
+    return _asset_loader.get()
+
+
+def stats() -> Dict[str, Any]:
+    index = _theme_index
+    return {
+        "dim": EMBEDDING_DIM,
+        "theme_phrases": int(index.vectors.shape[0]) if index is not None else 0,
+        "theme_resolutions": dict(_resolutions),
+        "query_cache": _embed.cache_info()._asdict(),
+        "assets": _asset_loader.stats(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build and query the embedding index")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Index directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Embed every asset of the local catalog store")
+    build.add_argument("--db", default=catalog_store.DEFAULT_DB_PATH, help="SQLite database path")
+    build.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    query = sub.add_parser("query", help="Rank themes and assets for a prompt")
+    query.add_argument("text")
+    query.add_argument("--type")
+    query.add_argument("-k", type=int, default=5)
+    sub.add_parser("stats", help="Show index statistics")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        store = catalog_store.CatalogStore(args.db)
+        started = time.perf_counter()
+        count = build_asset_index(store.iter_records(), args.index, args.dim)
+        store.close()
+        print(f"Indexed {count} assets into {args.index} in {time.perf_counter() - started:.1f}s")
+        return
+
+    loader = AssetIndexLoader(args.index)
+    if args.command == "query":
+        index = loader.get()
+        started = time.perf_counter()
+        themes = theme_index().rank(args.text, args.k)
+        assets = index.search(args.text, args.type, args.k) if index is not None else []
+        elapsed = time.perf_counter() - started
+        print(json.dumps({"themes": themes, "assets": assets}, indent=2))
+        print(f"{elapsed * 1000:.3f}ms", file=sys.stderr)
+    else:
+        loader.get()
+        print(json.dumps(loader.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Compiled multi-keyword matcher used for theme, vibe and intent detection.
+Keywords (single words or phrases) are compiled once into a token trie, so all
+hits in a prompt are found in a single pass that is linear in the prompt length,
+and matches respect word boundaries ("hi" does not match inside "this").
+"""
+
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# Words, optionally joined by hyphens or apostrophes ("sci-fi", "don't")
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+# Trie node key holding the label ranks of keywords that end at this node
+_END = ""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into word tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class KeywordMatcher:
+    """
+    Match a vocabulary of labelled keywords against free text.
+
+    The vocabulary maps each label to its keywords; label order is the precedence
+    order used by `first`, after the longest keyword at each position has won. A
+    trailing plural "s" on a prompt word is tolerated ("knights" matches "knight").
+    """
+
+    def __init__(self, vocabulary: Mapping[str, Iterable[str]]):
+        """
+        Args:
+            vocabulary: Ordered mapping of label -> keywords (phrases allowed)
+        """
+        self.labels: Tuple[str, ...] = tuple(vocabulary)
+        self._trie: Dict = {}
+        self._max_len = 0
+        for rank, label in enumerate(self.labels):
+            for keyword in vocabulary[label]:
+                tokens = tokenize(keyword)
+                if not tokens:
+                    continue
+                node = self._trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault(_END, set()).add(rank)
+                self._max_len = max(self._max_len, len(tokens))
+
+    def _step(self, node: Dict, token: str) -> Optional[Dict]:
+        child = node.get(token)
+        if child is None and len(token) > 3 and token.endswith("s"):
+            child = node.get(token[:-1])
+        return child
+
+    def ranks(self, text: str) -> Set[int]:
+        """
+        Return the ranks (label indexes) of every label with a keyword hit in text.
+        Hits are leftmost-longest: a keyword inside a longer keyword's hit does not count
+        ("medieval warrior" is not also a hit for "medieval").
+        """
+        tokens = tokenize(text)
+        hits: Set[int] = set()
+        start = 0
+        while start < len(tokens):
+            node = self._trie
+            longest: Optional[Set[int]] = None
+            end = start + 1
+            for length, token in enumerate(tokens[start:start + self._max_len], 1):
+                node = self._step(node, token)
+                if node is None:
+                    break
+                ranks = node.get(_END)
+                if ranks:
+                    longest, end = ranks, start + length
+            if longest:
+                hits.update(longest)
+            start = end
+        return hits
+
+    def find_all(self, text: str) -> List[str]:
+        """Return every label with a hit in text, in precedence order."""
+        return [self.labels[rank] for rank in sorted(self.ranks(text))]
+
+    def first(self, text: str, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        Return the highest-precedence label with a hit in text.
+
+        Args:
+            text: Free text to scan
+            exclude: Labels to skip even if they match
+
+        Returns:
+            The winning label, or None if nothing matched
+        """
+        excluded = set(exclude)
+        for rank in sorted(self.ranks(text)):
+            label = self.labels[rank]
+            if label not in excluded:
+                return label
+        return None
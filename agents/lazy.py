@@ -0,0 +1,53 @@
+"""
+Deferred module imports for faster cold starts.
+`lazy_import` returns a module object right away and executes the module the
+first time one of its attributes is used, so heavy dependencies (NumPy) and the
+agent pipeline are only loaded by the requests that need them, or by the
+background warm-up after the server is already accepting connections.
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a module lazily.
+
+    Args:
+        name: Absolute module name (e.g. "numpy", "agents.orchestrator")
+
+    Returns:
+        The module if it is already imported, otherwise a module that loads on first attribute access
+
+    Raises:
+        ModuleNotFoundError: If the module does not exist (checked without executing it)
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+def is_loaded(module: ModuleType) -> bool:
+    """Whether a module returned by lazy_import has actually been executed."""
+    # type() rather than isinstance(): reading __class__ would trigger the load
+    return type(module) is not importlib.util._LazyModule
+
+
+def ensure_loaded(module: ModuleType) -> ModuleType:
+    """Execute a lazily imported module now (no-op if already loaded)."""
+    getattr(module, "__name__")
+    return module
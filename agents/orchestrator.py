@@ -3,17 +3,469 @@ Orchestrator agent for coordinating other agents in the outfit recommendation sy
 The orchestrator manages the flow between different agents to provide comprehensive recommendations.
 """
 
-from typing import Union
-from .contracts import ChatIn, ChatOut, RecommendIn, RecommendOut
+import asyncio
+import logging
+import os
+import time
+from typing import AbstractSet, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from .contracts import ChatIn, ChatOut, OutfitRecord, RecommendIn, RecommendOut, TagSpec
+from . import catalog_agent, outfit_solver, ranker_agent, stylist_agent
+from .catalog_agent import CatalogFetcher
+from .rules import CompiledRules, get_rules
+
+logger = logging.getLogger(__name__)
+
+# Callbacks receiving (stage, seconds) after each pipeline stage, e.g. for metrics
+STAGE_OBSERVERS: List[Callable[[str, float], None]] = []
+
+
+def _observe_stage(stage: str, started: float) -> float:
+    """Report a stage duration to the registered observers and return the current time."""
+    now = time.perf_counter()
+    for observer in STAGE_OBSERVERS:
+        observer(stage, now - started)
+    return now
+
+
+class PipelineConfig:
+    """Concurrency limit and per-stage deadlines for the async recommendation pipeline."""
+
+    __slots__ = ("concurrency", "catalog_deadline", "part_timeout", "candidates_per_part")
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        catalog_deadline: float = 1.0,
+        part_timeout: float = 1.0,
+        candidates_per_part: int = 10
+    ):
+        """
+        Args:
+            concurrency: Maximum catalog fetches in flight per pipeline run
+            catalog_deadline: Seconds allowed for the whole catalog fan-out stage
+            part_timeout: Seconds allowed for a single part's fetch; fetches still running then are
+                cancelled, so it must exceed the catalog client's per-attempt timeout for retries to happen
+            candidates_per_part: Catalog candidates requested per part
+        """
+        self.concurrency = concurrency
+        self.catalog_deadline = catalog_deadline
+        self.part_timeout = part_timeout
+        self.candidates_per_part = candidates_per_part
+
+
+DEFAULT_CONFIG = PipelineConfig(
+    concurrency=int(os.getenv("PIPELINE_CONCURRENCY", "8")),
+    catalog_deadline=float(os.getenv("PIPELINE_CATALOG_DEADLINE", "1.0")),
+    part_timeout=float(os.getenv("PIPELINE_PART_TIMEOUT", "1.0")),
+    candidates_per_part=int(os.getenv("PIPELINE_CANDIDATES_PER_PART", "40"))
+)
+
+
+async def iter_candidates(
+    tag_spec: TagSpec,
+    fetcher: Optional[CatalogFetcher] = None,
+    config: PipelineConfig = DEFAULT_CONFIG
+) -> AsyncIterator[Tuple[str, List[OutfitRecord]]]:
+    """
+    Fetch catalog candidates for every part in the TagSpec concurrently, yielding
+    each batch of a part's candidates (e.g. one catalog page) as soon as it arrives.
+
+    Parts are fetched with asyncio under a semaphore. A part that fails or misses
+    the per-part timeout or the stage deadline keeps only the batches that arrived
+    in time, so a slow part cannot hold up the whole outfit. Fetches still running
+    when the deadline passes, or when the consumer stops iterating (e.g. its client
+    disconnected), are cancelled.
+
+    Args:
+        tag_spec: Style specification from the stylist stage
+        fetcher: Async catalog source passed to the catalog agent
+        config: Pipeline limits and deadlines
+
+    Yields:
+        (part, candidate items) pairs in arrival order; a part may appear several times
+    """
+    semaphore = asyncio.Semaphore(config.concurrency)
+    loop = asyncio.get_running_loop()
+    # Batches as they arrive; None marks a part as finished
+    queue: "asyncio.Queue[Optional[Tuple[str, List[OutfitRecord]]]]" = asyncio.Queue()
+
+    async def fetch_one(part: str) -> None:
+        try:
+            async with semaphore:
+                batches = catalog_agent.iter_part(tag_spec, part, fetcher, config.candidates_per_part)
+                part_deadline = loop.time() + config.part_timeout
+                try:
+                    while True:
+                        batch = await asyncio.wait_for(batches.__anext__(), timeout=part_deadline - loop.time())
+                        queue.put_nowait((part, batch))
+                except StopAsyncIteration:
+                    pass
+                finally:
+                    await batches.aclose()
+        except asyncio.TimeoutError:
+            logger.warning(f"Catalog fetch timed out for theme '{tag_spec.theme}', part '{part}'")
+        except Exception as e:
+            logger.warning(f"Catalog fetch failed for theme '{tag_spec.theme}', part '{part}': {e!r}")
+        finally:
+            queue.put_nowait(None)
+
+    tasks = [asyncio.ensure_future(fetch_one(part)) for part in dict.fromkeys(tag_spec.parts or [])]
+    running = len(tasks)
+    deadline = loop.time() + config.catalog_deadline
+    try:
+        while running:
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                entry = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                logger.warning(f"Catalog stage deadline hit for theme '{tag_spec.theme}', {running} parts incomplete")
+                break
+            if entry is None:
+                running -= 1
+                continue
+            yield entry
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def gather_candidates(
+    tag_spec: TagSpec,
+    fetcher: Optional[CatalogFetcher] = None,
+    config: PipelineConfig = DEFAULT_CONFIG
+) -> Dict[str, List[OutfitRecord]]:
+    """
+    Fetch catalog candidates for every part in the TagSpec concurrently.
+    Same limits and deadlines as iter_candidates, whose batches are merged per part.
+
+    Args:
+        tag_spec: Style specification from the stylist stage
+        fetcher: Async catalog source passed to the catalog agent
+        config: Pipeline limits and deadlines
+
+    Returns:
+        Mapping of part -> candidate items, in TagSpec part order
+    """
+    found: Dict[str, List[OutfitRecord]] = {}
+    async for part, items in iter_candidates(tag_spec, fetcher, config):
+        found.setdefault(part, []).extend(items)
+    return {part: found[part] for part in dict.fromkeys(tag_spec.parts or []) if part in found}
+
+
+def slot_candidates(
+    candidates: Dict[str, List[OutfitRecord]],
+    tag_spec: TagSpec,
+    rules: Optional[CompiledRules] = None
+) -> Dict[str, List[OutfitRecord]]:
+    """
+    Move every candidate to the outfit part whose slot its item type fills.
+
+    A search for one part can return items of other types (a "hat" search that finds
+    shirts), so candidates are regrouped by the rules' slot of `item.type`: an item
+    goes to the first part with the same slot, or with the slot's fallback (e.g. a hat
+    to "accessories" when the outfit has no hat), and is dropped if there is none.
+    Items of unknown type (e.g. fetched without asset details) stay with the part that
+    found them. Each asset is kept once per part.
+
+    Args:
+        candidates: Mapping of part -> candidate items, as fetched
+        tag_spec: Style specification whose parts are the outfit slots
+        rules: Rules defining the slots (the active rules if None)
+
+    Returns:
+        Mapping of part -> candidate items, in TagSpec part order, without empty parts
+    """
+    rules = rules or get_rules()
+    parts = list(dict.fromkeys([*(tag_spec.parts or []), *candidates]))
+    part_of_slot: Dict[str, str] = {}
+    for part in parts:
+        part_of_slot.setdefault(rules.slot(part) or part.lower(), part)
+    slotted: Dict[str, Dict[str, OutfitRecord]] = {part: {} for part in parts}
+    for part, items in candidates.items():
+        for item in items:
+            slot = rules.slot(item.type)
+            if slot is None:
+                target = part
+            else:
+                target = part_of_slot.get(slot) or part_of_slot.get(rules.slot_fallback.get(slot, ""))
+            if target is not None:
+                slotted[target].setdefault(item.assetId, item)
+    return {part: list(items.values()) for part, items in slotted.items() if items}
+
+
+def assemble(
+    candidates: Dict[str, List[OutfitRecord]],
+    tag_spec: TagSpec,
+    limit: int,
+    seed: Optional[int] = None,
+    seen: AbstractSet[str] = frozenset()
+) -> List[OutfitRecord]:
+    """
+    Rank each part's candidates and assemble an outfit.
+    Candidates are first moved to the part their item type fills (see slot_candidates),
+    then the outfit solver picks one item per part, maximizing the total ranker score
+    within TagSpec.outfit_budget (if set).
+
+    Args:
+        candidates: Mapping of part -> candidate items
+        tag_spec: Style specification used for ranking
+        limit: Maximum number of items in the outfit
+        seed: Optional seed for the ranker's jitter
+        seen: Asset IDs already shown to the user, ranked after unseen candidates
+
+    Returns:
+        Ordered list of outfit items, one per part
+    """
+    part_items = list(slot_candidates(candidates, tag_spec).values())
+    scores = ranker_agent.score_batch(
+        [(items, tag_spec) for items in part_items],
+        seed=seed,
+        seen=[seen] * len(part_items) if seen else None
+    )
+    return _assemble_scored(part_items, scores, tag_spec, limit)
+
+
+def solve_outfits(
+    candidates: Dict[str, List[OutfitRecord]],
+    tag_spec: TagSpec,
+    n: int = 3,
+    seed: Optional[int] = None,
+    seen: AbstractSet[str] = frozenset(),
+    min_diff: int = 1
+) -> List[List[OutfitRecord]]:
+    """
+    Rank each part's candidates and return the top-n alternative outfits, one item
+    per part (by item type, see slot_candidates), within TagSpec.outfit_budget (if set).
+
+    Args:
+        candidates: Mapping of part -> candidate items
+        tag_spec: Style specification used for ranking and the outfit budget
+        n: Number of alternative outfits
+        seed: Optional seed for the ranker's jitter
+        seen: Asset IDs already shown to the user, ranked after unseen candidates
+        min_diff: Minimum number of parts in which any two alternatives differ
+
+    Returns:
+        Up to n outfits, best first
+    """
+    part_items = list(slot_candidates(candidates, tag_spec).values())
+    scores = ranker_agent.score_batch(
+        [(items, tag_spec) for items in part_items],
+        seed=seed,
+        seen=[seen] * len(part_items) if seen else None
+    )
+    return _solve_scored(part_items, scores, tag_spec.outfit_budget, n, min_diff)
+
+
+def _solve_scored(
+    part_items: List[List[OutfitRecord]],
+    scores: List,
+    outfit_budget: Optional[int],
+    n: int,
+    min_diff: int = 1
+) -> List[List[OutfitRecord]]:
+    """Run the outfit solver over scored candidates and map its picks back to items."""
+    # An asset listed under several parts is only offered for the part where it scores best
+    owner: Dict[str, Tuple[float, int]] = {}
+    for slot, (items, slot_scores) in enumerate(zip(part_items, scores)):
+        for item, score in zip(items, slot_scores):
+            if item.assetId not in owner or score > owner[item.assetId][0]:
+                owner[item.assetId] = (score, slot)
+    offered = [[i for i, item in enumerate(items) if owner[item.assetId][1] == slot]
+               for slot, items in enumerate(part_items)]
+    solved = outfit_solver.solve(
+        [slot_scores[indexes] for slot_scores, indexes in zip(scores, offered)],
+        [[float("nan") if items[i].price is None else items[i].price for i in indexes]
+         for items, indexes in zip(part_items, offered)],
+        budget=outfit_budget, top_n=n, min_diff=min_diff
+    )
+    return [[part_items[slot][offered[slot][pick]] for slot, pick in enumerate(outfit.picks) if pick >= 0]
+            for outfit in solved]
+
+
+def _assemble_scored(
+    part_items: List[List[OutfitRecord]],
+    scores: List,
+    tag_spec: TagSpec,
+    limit: int
+) -> List[OutfitRecord]:
+    """Best one-item-per-part outfit within TagSpec.outfit_budget (if set), up to limit items."""
+    best = _solve_scored(part_items, scores, tag_spec.outfit_budget, 1)
+    return best[0][:limit] if best else []
+
+
+async def run_async(
+    input_data: RecommendIn,
+    fetcher: Optional[CatalogFetcher] = None,
+    limit: int = 10,
+    config: PipelineConfig = DEFAULT_CONFIG,
+    seen: AbstractSet[str] = frozenset(),
+    seed: Optional[int] = None
+) -> List[OutfitRecord]:
+    """
+    Run the async recommendation pipeline: stylist -> catalog -> ranker.
+    Returns bare outfit records rather than a RecommendOut so the caller can
+    serialize them directly without per-item model validation.
+
+    Args:
+        input_data: RecommendIn contract
+        fetcher: Async catalog source for the catalog stage (local samples if None)
+        limit: Maximum number of outfit items
+        config: Concurrency limit and per-stage deadlines
+        seen: Asset IDs already shown to the user, avoided where alternatives exist
+        seed: Seed for the ranker's jitter; the same seed and candidates give the same outfit
+
+    Returns:
+        The assembled outfit (empty if nothing was found)
+    """
+    started = stage_started = time.perf_counter()
+    tag_spec = stylist_agent.run(input_data)
+    stage_started = _observe_stage("stylist", stage_started)
+    candidates = await gather_candidates(tag_spec, fetcher, config)
+    stage_started = _observe_stage("catalog", stage_started)
+    outfit = assemble(candidates, tag_spec, limit, seed=seed, seen=seen)
+    _observe_stage("ranker", stage_started)
+    _observe_stage("pipeline", started)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"Pipeline for theme '{input_data.theme}': {len(candidates)}/{len(tag_spec.parts or [])} parts, "
+        f"{len(outfit)} items in {elapsed_ms:.1f}ms"
+    )
+
+    return outfit
+
+
+async def stream_async(
+    input_data: RecommendIn,
+    fetcher: Optional[CatalogFetcher] = None,
+    limit: int = 10,
+    config: PipelineConfig = DEFAULT_CONFIG,
+    seen: AbstractSet[str] = frozenset()
+) -> AsyncIterator[OutfitRecord]:
+    """
+    Run the recommendation pipeline, yielding outfit items as they become available.
+
+    The best item of each part is yielded as soon as candidates that fill that part
+    arrive (e.g. its first catalog page, or another part's page with items of its
+    type), so the first item does not wait for the slowest part or for later pages.
+    Like run_async, the outfit has one item per part. Closing the iterator cancels
+    outstanding catalog fetches.
+
+    Args:
+        input_data: RecommendIn contract
+        fetcher: Async catalog source for the catalog stage (local samples if None)
+        limit: Maximum number of outfit items
+        config: Concurrency limit and per-stage deadlines
+        seen: Asset IDs already shown to the user, avoided where alternatives exist
+
+    Yields:
+        Outfit items, one per part
+    """
+    started = stage_started = time.perf_counter()
+    tag_spec = stylist_agent.run(input_data)
+    stage_started = _observe_stage("stylist", stage_started)
+    rules = get_rules()
+
+    filled = set()
+    emitted = set()
+    async for part, items in iter_candidates(tag_spec, fetcher, config):
+        for slot_part, slot_items in slot_candidates({part: items}, tag_spec, rules).items():
+            if slot_part in filled:
+                continue
+            part_ranked = ranker_agent.rank_batch([(slot_items, tag_spec)], seen=[seen] if seen else None)[0]
+            for item in part_ranked:
+                if item.assetId not in emitted:
+                    filled.add(slot_part)
+                    emitted.add(item.assetId)
+                    yield item
+                    break
+            if len(emitted) >= limit:
+                return
+    _observe_stage("catalog", stage_started)
+    _observe_stage("pipeline", started)
+
+
+def _batch_key(input_data: RecommendIn) -> Tuple[str, Optional[int], Optional[int]]:
+    """Requests with the same normalized theme and budgets share catalog candidates."""
+    return (" ".join(input_data.theme.lower().split()), input_data.budget, input_data.outfit_budget)
+
+
+async def run_batch(
+    inputs: Sequence[RecommendIn],
+    fetcher: Optional[CatalogFetcher] = None,
+    limits: Optional[Sequence[int]] = None,
+    config: PipelineConfig = DEFAULT_CONFIG,
+    seen: Optional[Sequence[AbstractSet[str]]] = None
+) -> AsyncIterator[Tuple[int, List[OutfitRecord]]]:
+    """
+    Run the pipeline for many users at once, yielding results as they complete.
+
+    Requests are grouped by normalized theme (and budgets): the stylist and catalog
+    stages run once per distinct theme, all themes concurrently, and the ranker then
+    assembles a separately ranked outfit for every user of that theme.
+
+    Args:
+        inputs: RecommendIn contracts, one per user
+        fetcher: Async catalog source for the catalog stage (local samples if None)
+        limits: Maximum outfit size per input (10 for every input if None)
+        config: Concurrency limit and per-stage deadlines (applied per theme)
+        seen: Per input, asset IDs already shown to that user
+
+    Yields:
+        (input index, outfit) pairs in completion order
+    """
+    groups: Dict[Tuple[str, Optional[int], Optional[int]], List[int]] = {}
+    for index, input_data in enumerate(inputs):
+        groups.setdefault(_batch_key(input_data), []).append(index)
+
+    async def gather_group(indexes: List[int]) -> Tuple[List[int], TagSpec, Dict[str, List[OutfitRecord]]]:
+        stage_started = time.perf_counter()
+        tag_spec = stylist_agent.run(inputs[indexes[0]])
+        stage_started = _observe_stage("stylist", stage_started)
+        candidates = await gather_candidates(tag_spec, fetcher, config)
+        _observe_stage("catalog", stage_started)
+        return indexes, tag_spec, candidates
+
+    started = time.perf_counter()
+    tasks = [asyncio.ensure_future(gather_group(indexes)) for indexes in groups.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            indexes, tag_spec, candidates = await next_done
+            stage_started = time.perf_counter()
+            # One ranker call for every (user, part) pair of this theme
+            part_items = list(slot_candidates(candidates, tag_spec).values())
+            scores = ranker_agent.score_batch(
+                [(items, tag_spec) for _ in indexes for items in part_items],
+                seen=[seen[index] for index in indexes for _ in part_items] if seen else None
+            )
+            results = []
+            for position, index in enumerate(indexes):
+                user_scores = scores[position * len(part_items):(position + 1) * len(part_items)]
+                results.append((index, _assemble_scored(part_items, user_scores, tag_spec,
+                                                        limits[index] if limits else 10)))
+            _observe_stage("ranker", stage_started)
+            for result in results:
+                yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    logger.info(
+        f"Batch pipeline: {len(inputs)} requests, {len(groups)} distinct themes in "
+        f"{(time.perf_counter() - started) * 1000:.1f}ms"
+    )
 
 
 def run(input_data: Union[ChatIn, RecommendIn]) -> Union[ChatOut, RecommendOut]:
     """
     Run the orchestrator agent with the given input.
-    
+
     Args:
         input_data: Either ChatIn or RecommendIn contract
-        
+
     Returns:
         Either ChatOut or RecommendOut contract based on input type
     """
@@ -25,21 +477,16 @@ def run(input_data: Union[ChatIn, RecommendIn]) -> Union[ChatOut, RecommendOut]:
             reply="Orchestrator: Processing your request through our AI style system!"
         )
     elif isinstance(input_data, RecommendIn):
-        # Handle recommendation orchestration
-        from .contracts import CatalogItem
-        
-        # Create sample outfit items for demonstration
-        sample_outfit = [
-            CatalogItem(assetId="1234567890", type="shirt"),
-            CatalogItem(assetId="2345678901", type="pants"),
-            CatalogItem(assetId="3456789012", type="shoes")
-        ]
-        
+        # Handle recommendation orchestration synchronously with the local catalog
+        tag_spec = stylist_agent.run(input_data)
+        catalog_items = catalog_agent.run(tag_spec)
+        ranked_items = ranker_agent.run((catalog_items, tag_spec))
+
         return RecommendOut(
             success=True,
             user_id=input_data.user_id,
             message=f"Orchestrator: Your {input_data.theme} outfit has been coordinated!",
-            outfit=sample_outfit
+            outfit=ranked_items
         )
     else:
-        raise ValueError(f"Unsupported input type: {type(input_data)}")
\ No newline at end of file
+        raise ValueError(f"Unsupported input type: {type(input_data)}")
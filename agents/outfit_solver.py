@@ -0,0 +1,189 @@
+"""
+Outfit assembly: one item per slot, best total score, under a total budget.
+Each outfit part (slot) has scored, priced candidates; `solve` returns the top-N
+alternative outfits (by total ranker score) whose total price fits the budget,
+with optional diversity between alternatives.
+
+Multiple-choice knapsack is NP-hard in general, so the search is a beam search
+over slots with dominance pruning: a candidate (or a partial outfit) that is both
+pricier and lower-scoring than N others can never appear in the top N, so each
+slot and each beam step keeps only the first N Pareto layers of (cost, score).
+Those layers are computed with sorted running maxima in NumPy, which keeps
+thousands of candidates per slot in the low milliseconds; the beam width caps
+what survives when the layers are still too wide. Without a budget the prices
+don't matter: only the top N of each slot and step are kept, and the result is exact.
+"""
+
+import os
+from typing import List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+T = TypeVar("T")
+
+DEFAULT_BEAM_WIDTH = int(os.getenv("OUTFIT_BEAM_WIDTH", "256"))
+# Score of leaving a slot empty when none of its candidates fit the budget
+EMPTY_SLOT_PENALTY = 1000.0
+
+
+class SolvedOutfit(NamedTuple):
+    """One outfit found by `solve`."""
+    score: float
+    cost: float
+    picks: Tuple[int, ...]  # candidate index per slot, -1 for an empty slot
+
+
+def pareto_layers(cost, score, layers: int):
+    """
+    Indices of the points in the first `layers` Pareto layers (low cost, high score),
+    plus the layer number of each. A point outside them is dominated (no cheaper and
+    no better) by at least `layers` others.
+
+    Args:
+        cost: 1-D array of costs
+        score: 1-D array of scores
+        layers: Number of layers to keep
+
+    Returns:
+        (indices, layer) arrays
+    """
+    # Order by cost, then score descending (two stable-order argsorts are faster than lexsort)
+    by_score = np.argsort(-score)
+    remaining = by_score[np.argsort(cost[by_score], kind="stable")]
+    kept = []
+    layer_of = []
+    for layer in range(layers):
+        if remaining.shape[0] == 0:
+            break
+        s = score[remaining]
+        best_before = np.empty_like(s)
+        best_before[0] = -np.inf
+        np.maximum.accumulate(s[:-1], out=best_before[1:])
+        front = s > best_before
+        kept.append(remaining[front])
+        layer_of.append(np.full(int(front.sum()), layer, dtype=np.intp))
+        remaining = remaining[~front]
+    if not kept:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    return np.concatenate(kept), np.concatenate(layer_of)
+
+
+def _prune(cost, score, layers: int, width: int):
+    """Keep the first Pareto layers, then at most `width` states: the best layer first, by score."""
+    if cost is None:
+        # Without a budget only the scores matter: the best `layers` points are exact
+        top = min(max(layers, 1), width, score.shape[0])
+        if top == score.shape[0]:
+            return np.arange(top)
+        return np.argpartition(-score, top - 1)[:top]
+    index, layer = pareto_layers(cost, score, layers)
+    if index.shape[0] <= width:
+        return index
+    front = index[layer == 0]
+    if front.shape[0] >= width:
+        # Spread the kept states over the whole cost range of the frontier
+        return front[np.linspace(0, front.shape[0] - 1, width).astype(np.intp)]
+    order = np.lexsort((-score[index], layer))
+    return index[order[:width]]
+
+
+def solve(
+    scores: Sequence,
+    prices: Sequence,
+    budget: Optional[float] = None,
+    top_n: int = 1,
+    beam_width: int = DEFAULT_BEAM_WIDTH,
+    min_diff: int = 1,
+    empty_penalty: float = EMPTY_SLOT_PENALTY
+) -> List[SolvedOutfit]:
+    """
+    Pick one candidate per slot, maximizing the total score within the budget.
+
+    Args:
+        scores: Per slot, a 1-D array of candidate scores (higher is better)
+        prices: Per slot, a 1-D array of candidate prices (NaN counts as free)
+        budget: Maximum total price (no limit if None)
+        top_n: Number of alternative outfits to return
+        beam_width: Maximum partial outfits kept between slots
+        min_diff: Minimum number of slots in which any two returned outfits differ
+        empty_penalty: Score of leaving a slot empty, used only when nothing in it fits
+
+    Returns:
+        Up to top_n outfits, best first
+    """
+    if not scores:
+        return []
+    # Enough layers for the alternatives, plus slack for the diversity filter
+    layers = top_n if min_diff <= 1 else top_n * 4
+    # Candidates kept per slot: every state is combined with each of them, so this bounds each step
+    slot_width = max(layers * 2, beam_width // 8)
+    state_score = np.zeros(1)
+    state_cost = np.zeros(1)
+    state_picks = np.zeros((1, 0), dtype=np.intp)
+
+    for slot_scores, slot_prices in zip(scores, prices):
+        slot_score = np.asarray(slot_scores, dtype=np.float64)
+        slot_cost = np.nan_to_num(np.asarray(slot_prices, dtype=np.float64), nan=0.0)
+        slot_index = np.arange(slot_score.shape[0])
+        if budget is not None:
+            fits = slot_cost <= budget
+            slot_score, slot_cost, slot_index = slot_score[fits], slot_cost[fits], slot_index[fits]
+        if slot_index.shape[0] == 0:
+            slot_score, slot_cost, slot_index = np.array([-empty_penalty]), np.zeros(1), np.array([-1])
+        elif budget is not None:
+            # Leaving the slot empty stays possible, at a penalty, in case the rest of the budget is needed
+            slot_score = np.append(slot_score, -empty_penalty)
+            slot_cost = np.append(slot_cost, 0.0)
+            slot_index = np.append(slot_index, -1)
+        keep = _prune(slot_cost if budget is not None else None, slot_score, layers, slot_width)
+        slot_score, slot_cost, slot_index = slot_score[keep], slot_cost[keep], slot_index[keep]
+
+        # Every (state, candidate) combination, as flat arrays
+        score = (state_score[:, None] + slot_score[None, :]).ravel()
+        cost = (state_cost[:, None] + slot_cost[None, :]).ravel()
+        parent, choice = np.divmod(np.arange(score.shape[0]), slot_score.shape[0])
+        if budget is not None:
+            fits = cost <= budget
+            score, cost, parent, choice = score[fits], cost[fits], parent[fits], choice[fits]
+        keep = _prune(cost if budget is not None else None, score, layers, beam_width)
+        state_score, state_cost = score[keep], cost[keep]
+        state_picks = np.concatenate((state_picks[parent[keep]], slot_index[choice[keep]][:, None]), axis=1)
+
+    order = np.argsort(-state_score, kind="stable")
+    outfits: List[SolvedOutfit] = []
+    chosen: List = []
+    for i in order:
+        picks = state_picks[i]
+        if chosen and np.any((np.asarray(chosen) != picks).sum(axis=1) < min_diff):
+            continue
+        chosen.append(picks)
+        outfits.append(SolvedOutfit(float(state_score[i]), float(state_cost[i]), tuple(int(p) for p in picks)))
+        if len(outfits) == top_n:
+            break
+    return outfits
+
+
+def spread_by_type(items: Sequence[T]) -> List[T]:
+    """
+    Reorder items so every item type appears once before any type repeats
+    (one shirt, one pair of pants, ... then second choices), keeping the
+    relative order within each type.
+
+    Args:
+        items: Objects with a `type` attribute
+
+    Returns:
+        The reordered items
+    """
+    rounds: List[List[T]] = []
+    counts = {}
+    for item in items:
+        key = item.type.lower()
+        n = counts.get(key, 0)
+        counts[key] = n + 1
+        if n == len(rounds):
+            rounds.append([])
+        rounds[n].append(item)
+    return [item for round_items in rounds for item in round_items]
@@ -3,9 +3,167 @@ Ranker agent for scoring and ranking outfit recommendations.
 This agent evaluates and sorts outfit items based on various criteria.
 """
 
-from typing import List, Tuple, Union
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple, Union
+import hashlib
+import math
 import random
 from .contracts import CatalogItem, TagSpec, RecommendOut
+from .lazy import lazy_import
+from .rules import get_rules
+
+# NumPy is loaded on the first ranking, keeping it off the server's import path
+np = lazy_import("numpy")
+
+
+# Score weights, type priorities and theme/vibe boosts come from the shared rules (agents/rules.json)
+JITTER_RANGE = (0.9, 1.1)
+# Subtracted from items the user was already shown, so they rank after every unseen item
+SEEN_PENALTY = 100.0
+# Favorite count at which an item gets the full popularity weight (log-scaled below it)
+POPULARITY_SCALE = math.log1p(1_000_000)
+
+
+def _seeded_jitter(asset_ids: List[str], seed: int) -> "np.ndarray":
+    """
+    Jitter factors derived from (seed, asset ID) alone, so an item's score does not depend on
+    where it appears among the candidates (their order follows concurrent page arrival).
+    """
+    key = (seed & 0xFFFFFFFFFFFFFFFF).to_bytes(8, "big")
+    unit = np.asarray([
+        int.from_bytes(hashlib.blake2b(asset_id.encode(), digest_size=8, key=key).digest(), "big")
+        for asset_id in asset_ids
+    ], dtype=np.float64) / 2.0 ** 64
+    return JITTER_RANGE[0] + (JITTER_RANGE[1] - JITTER_RANGE[0]) * unit
+
+
+def score_batch(
+    requests: Sequence[Tuple[List[CatalogItem], TagSpec]],
+    seed: Optional[int] = None,
+    seen: Optional[Sequence[AbstractSet[str]]] = None
+) -> List["np.ndarray"]:
+    """
+    Score many (items, TagSpec) pairs at once with NumPy array operations.
+    
+    Item types, themes and vibes are encoded to the rules' integer ids and scores are
+    computed for every item of every request in one pass from the precomputed boost
+    matrices. Items with a known favorite count get a log-scaled popularity boost.
+    
+    Args:
+        requests: Sequence of (item list, TagSpec) pairs; items are CatalogItem or
+            OutfitRecord objects (anything with `assetId` and `type`)
+        seed: Seed for the score jitter, for reproducible scores; each item's jitter then
+            depends only on the seed and its asset ID, not on its position
+        seen: Per request, asset IDs already shown to the user; they score below every unseen item
+        
+    Returns:
+        One float64 score array per request, aligned with its items (higher is better)
+    """
+    rules = get_rules()
+    weights = rules.weights
+    
+    # Intern the lowercased item types seen in this batch
+    local_ids: Dict[str, int] = {}
+    item_types: List[int] = []
+    favorites: List[int] = []
+    asset_ids: List[str] = []
+    seen_items: List[bool] = []
+    offsets = [0]
+    for r, (catalog_items, _) in enumerate(requests):
+        for item in catalog_items:
+            item_types.append(local_ids.setdefault(item.type.lower(), len(local_ids)))
+            favorites.append(getattr(item, "favorites", None) or 0)
+            asset_ids.append(item.assetId)
+        if seen is not None and seen[r]:
+            seen_items.extend(item.assetId in seen[r] for item in catalog_items)
+        else:
+            seen_items.extend([False] * len(catalog_items))
+        offsets.append(len(item_types))
+    
+    if not item_types:
+        return [np.zeros(0) for _ in requests]
+    
+    n_requests = len(requests)
+    type_local = np.asarray(item_types, dtype=np.intp)
+    request_index = np.repeat(np.arange(n_requests), np.diff(offsets))
+    local_to_known = np.asarray(
+        [rules.type_ids.get(item_type, 0) for item_type in local_ids], dtype=np.intp
+    )
+    theme_ids = np.asarray(
+        [rules.theme_id(tag_spec.theme) for _, tag_spec in requests], dtype=np.intp
+    )
+    vibe_ids = np.asarray(
+        [rules.vibe_id(tag_spec.vibe) for _, tag_spec in requests], dtype=np.intp
+    )
+    
+    # Preferred parts as a (request, local type) boolean mask
+    preferred = np.zeros((n_requests, len(local_ids)), dtype=bool)
+    for r, (_, tag_spec) in enumerate(requests):
+        for part in tag_spec.parts or []:
+            part_id = local_ids.get(part.lower())
+            if part_id is not None:
+                preferred[r, part_id] = True
+    
+    known = local_to_known[type_local]
+    theme_boost = np.asarray(rules.theme_boost)
+    vibe_boost = np.asarray(rules.vibe_boost)
+    scores = (
+        weights["base"]
+        + weights["preferred_part"] * preferred[request_index, type_local]
+        + theme_boost[theme_ids[request_index], known]
+        + vibe_boost[vibe_ids[request_index], known]
+        + weights["popularity"] * np.minimum(np.log1p(np.asarray(favorites, dtype=np.float64)) / POPULARITY_SCALE, 1.0)
+    )
+    if seed is None:
+        scores *= np.random.default_rng().uniform(JITTER_RANGE[0], JITTER_RANGE[1], size=scores.shape[0])
+    else:
+        scores *= _seeded_jitter(asset_ids, seed)
+    if seen is not None:
+        scores -= SEEN_PENALTY * np.asarray(seen_items, dtype=bool)
+    return [scores[offsets[r]:offsets[r + 1]] for r in range(n_requests)]
+
+
+def rank_batch(
+    requests: Sequence[Tuple[List[CatalogItem], TagSpec]],
+    k: Optional[int] = None,
+    seed: Optional[int] = None,
+    seen: Optional[Sequence[AbstractSet[str]]] = None,
+    scores: Optional[Sequence["np.ndarray"]] = None
+) -> List[List[CatalogItem]]:
+    """
+    Rank many (items, TagSpec) pairs at once.
+    
+    Items are scored with score_batch and each request's best items are selected
+    with argpartition.
+    
+    Args:
+        requests: Sequence of (item list, TagSpec) pairs; items are CatalogItem or
+            OutfitRecord objects (anything with `assetId` and `type`)
+        k: Number of top items to return per request (all items if None)
+        seed: Seed for the score jitter, for reproducible rankings
+        seen: Per request, asset IDs already shown to the user; they are ranked last
+        scores: Scores from score_batch, if already computed (seed and seen are then unused)
+        
+    Returns:
+        One ranked list of the given items per request, best first
+    """
+    if scores is None:
+        scores = score_batch(requests, seed=seed, seen=seen)
+    
+    ranked: List[List[CatalogItem]] = []
+    for (catalog_items, _), segment in zip(requests, scores):
+        n = segment.shape[0]
+        top = n if k is None else min(k, n)
+        if top == 0:
+            ranked.append([])
+            continue
+        if top < n:
+            candidates = np.argpartition(-segment, top - 1)[:top]
+        else:
+            candidates = np.arange(n)
+        order = candidates[np.argsort(-segment[candidates], kind="stable")]
+        ranked.append([catalog_items[i] for i in order])
+    
+    return ranked
 
 
 def run(input_data: Union[List[CatalogItem], Tuple[List[CatalogItem], TagSpec]]) -> Union[List[CatalogItem], RecommendOut]:
@@ -23,32 +181,10 @@ def run(input_data: Union[List[CatalogItem], Tuple[List[CatalogItem], TagSpec]])
         catalog_items = input_data
         
         # Score items based on type priority and randomization
-        type_priorities = {
-            "shirt": 10,
-            "dress": 10,
-            "pants": 9,
-            "shorts": 9,
-            "shoes": 8,
-            "sneakers": 8,
-            "boots": 8,
-            "hat": 7,
-            "cap": 7,
-            "jacket": 6,
-            "cape": 6,
-            "tie": 5,
-            "bow": 5,
-            "accessory": 4,
-            "necklace": 4,
-            "bag": 3,
-            "socks": 2,
-            "hairpin": 1,
-            "wristband": 1
-        }
-        
-        # Score and sort items
+        rules = get_rules()
         scored_items = []
         for item in catalog_items:
-            base_score = type_priorities.get(item.type.lower(), 5)
+            base_score = rules.type_priority[rules.type_id(item.type)]
             random_factor = random.uniform(0.8, 1.2)  # Add some randomization
             final_score = base_score * random_factor
             scored_items.append((final_score, item))
@@ -67,50 +203,8 @@ def run(input_data: Union[List[CatalogItem], Tuple[List[CatalogItem], TagSpec]])
         if not isinstance(tag_spec, TagSpec):
             raise ValueError("Second element of tuple must be a TagSpec object")
         
-        # Enhanced scoring based on TagSpec
-        scored_items = []
-        preferred_parts = tag_spec.parts or []
-        theme = tag_spec.theme.lower()
-        vibe = tag_spec.vibe or ""
-        
-        for item in catalog_items:
-            base_score = 5.0  # Default score
-            
-            # Boost score if item type is in preferred parts
-            if item.type.lower() in [part.lower() for part in preferred_parts]:
-                base_score += 3.0
-            
-            # Theme-specific boosts
-            if theme == "formal" and item.type.lower() in ["shirt", "pants", "tie", "jacket", "shoes"]:
-                base_score += 2.0
-            elif theme == "casual" and item.type.lower() in ["shirt", "pants", "hat", "shoes"]:
-                base_score += 2.0
-            elif theme == "sporty" and item.type.lower() in ["jersey", "shorts", "sneakers", "cap"]:
-                base_score += 2.0
-            elif theme == "gothic" and item.type.lower() in ["boots", "cape", "necklace"]:
-                base_score += 2.0
-            elif theme == "kawaii" and item.type.lower() in ["dress", "bow", "bag", "hairpin"]:
-                base_score += 2.0
-            
-            # Vibe-specific adjustments
-            if vibe == "dramatic" and item.type.lower() in ["cape", "boots", "necklace"]:
-                base_score += 1.0
-            elif vibe == "playful" and item.type.lower() in ["bow", "bag", "hairpin"]:
-                base_score += 1.0
-            elif vibe == "professional" and item.type.lower() in ["tie", "jacket"]:
-                base_score += 1.0
-            
-            # Add randomization
-            random_factor = random.uniform(0.9, 1.1)
-            final_score = base_score * random_factor
-            
-            scored_items.append((final_score, item))
-        
-        # Sort by score and return items
-        scored_items.sort(key=lambda x: x[0], reverse=True)
-        ranked_items = [item for score, item in scored_items]
-        
-        return ranked_items
+        # Enhanced scoring based on TagSpec, via the vectorized batch ranker
+        return rank_batch([(catalog_items, tag_spec)])[0]
     
     else:
         raise ValueError(f"Unsupported input type: {type(input_data)}")
\ No newline at end of file
@@ -0,0 +1,371 @@
+"""
+Declarative style rules shared by all agents and the server.
+Theme, vibe and NPC knowledge lives in one JSON file (agents/rules.json by
+default, RULES_PATH to override). It is compiled once into frozen lookup tables:
+names are interned to small integer ids, per-theme attributes become tuples
+indexed by id and the ranker's boosts become precomputed float64 matrices
+(read-only buffers that NumPy views without copying, so compiling the rules
+does not import NumPy). The file's mtime is checked at most every
+RULES_RELOAD_INTERVAL seconds and a changed file is recompiled in place, so new
+themes go live without a restart; a file that fails to compile is logged and the
+previous rules stay active.
+
+Command line usage:
+    python -m agents.rules              # validate and summarize the active rules file
+    python -m agents.rules my_rules.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from array import array
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .contracts import OutfitRecord
+from .keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.getenv(
+    "RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+)
+RULES_RELOAD_INTERVAL = float(os.getenv("RULES_RELOAD_INTERVAL", "2"))
+
+# Separators between the phrases of a theme description
+_PHRASE_SPLIT_RE = re.compile(r"[,;:]|\band\b")
+
+
+def _names(values: Any, where: str) -> Tuple[str, ...]:
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise ValueError(f"{where} must be a list of strings")
+    return tuple(sys.intern(v.lower()) for v in values)
+
+
+def _section(data: Mapping[str, Any], key: str, where: str = "rules") -> Dict[str, Any]:
+    value = data.get(key, {})
+    if not isinstance(value, dict):
+        raise ValueError(f"{where}.{key} must be an object")
+    return value
+
+
+class CompiledRules:
+    """
+    Frozen lookup tables compiled from a rules document.
+    Id 0 is reserved for unknown themes, vibes and item types: its rows hold the
+    defaults (default vibe and parts, fallback samples, zero boosts).
+    """
+
+    __slots__ = (
+        "version", "source", "default_theme", "prompt_parts", "weights",
+        "themes", "theme_ids", "vibes", "vibe_ids", "type_ids",
+        "theme_vibe", "theme_parts", "theme_asset_base", "theme_samples", "theme_phrases",
+        "theme_boost", "vibe_boost", "type_priority", "slot_of", "slot_fallback",
+        "theme_matcher", "vibe_matcher", "chat_matcher", "chat_replies", "default_chat_reply",
+        "intent_matcher", "npc_responses", "default_npc_responses",
+    )
+
+    def __init__(self, data: Mapping[str, Any], source: str = "<memory>"):
+        """
+        Compile a rules document.
+
+        Args:
+            data: Parsed rules JSON (see agents/rules.json for the schema)
+            source: Where the document came from, for logs and stats
+
+        Raises:
+            ValueError: If the document is malformed
+        """
+        if not isinstance(data, dict):
+            raise ValueError("rules must be a JSON object")
+        themes = _section(data, "themes")
+        vibes = _section(data, "vibes")
+        if not themes:
+            raise ValueError("rules.themes must define at least one theme")
+
+        self.version = data.get("version")
+        self.source = source
+        self.themes: Tuple[str, ...] = tuple(sys.intern(t.lower()) for t in themes)
+        self.theme_ids: Dict[str, int] = {theme: i + 1 for i, theme in enumerate(self.themes)}
+        self.vibes: Tuple[str, ...] = tuple(sys.intern(v.lower()) for v in vibes)
+        self.vibe_ids: Dict[str, int] = {vibe: i + 1 for i, vibe in enumerate(self.vibes)}
+
+        self.default_theme = sys.intern(str(data.get("default_theme", self.themes[0])).lower())
+        if self.default_theme not in self.theme_ids:
+            raise ValueError(f"rules.default_theme '{self.default_theme}' is not a defined theme")
+        default_vibe = sys.intern(str(data.get("default_vibe", "stylish")).lower())
+        default_parts = _names(data.get("default_parts", ["shirt", "pants", "shoes", "accessories"]),
+                               "rules.default_parts")
+        self.prompt_parts: Tuple[str, ...] = tuple(
+            sys.intern(part) for part in data.get("prompt_parts", default_parts)
+        )
+
+        weights = _section(data, "weights")
+        self.weights: Dict[str, float] = {
+            name: float(weights.get(name, default))
+            for name, default in (("base", 5.0), ("preferred_part", 3.0), ("theme", 2.0), ("vibe", 1.0),
+                                  ("popularity", 1.0))
+        }
+
+        theme_specs = [themes[name] for name in themes]
+        vibe_specs = [vibes[name] for name in vibes]
+        for name, spec in list(zip(self.themes, theme_specs)) + list(zip(self.vibes, vibe_specs)):
+            if not isinstance(spec, dict):
+                raise ValueError(f"rules entry '{name}' must be an object")
+
+        # Per-theme attributes, indexed by theme id
+        self.theme_vibe: Tuple[str, ...] = (default_vibe,) + tuple(
+            sys.intern(str(spec.get("vibe", default_vibe)).lower()) for spec in theme_specs
+        )
+        self.theme_parts: Tuple[Tuple[str, ...], ...] = (default_parts,) + tuple(
+            _names(spec["parts"], f"rules.themes.{name}.parts") if "parts" in spec else default_parts
+            for name, spec in zip(self.themes, theme_specs)
+        )
+        default_base = int(data.get("default_asset_base", 1_000_000_000))
+        self.theme_asset_base: Tuple[int, ...] = (default_base,) + tuple(
+            int(spec.get("asset_base", default_base)) for spec in theme_specs
+        )
+
+        samples = [self._samples(name, spec.get("samples", [])) for name, spec in zip(self.themes, theme_specs)]
+        fallback: List[OutfitRecord] = []
+        for name, count in _section(data, "fallback_samples").items():
+            theme_id = self.theme_ids.get(name.lower())
+            if theme_id is None:
+                raise ValueError(f"rules.fallback_samples references unknown theme '{name}'")
+            fallback.extend(samples[theme_id - 1][:int(count)])
+        if not fallback:
+            fallback = list(samples[self.theme_ids[self.default_theme] - 1])
+        # Themes without samples of their own share the fallback mix with unknown themes
+        self.theme_samples: Tuple[Tuple[OutfitRecord, ...], ...] = (tuple(fallback),) + tuple(
+            s or tuple(fallback) for s in samples
+        )
+
+        # Short descriptive phrases per theme (name, keywords, description clauses) for semantic matching
+        self.theme_phrases: Tuple[Tuple[str, ...], ...] = ((),) + tuple(
+            tuple(dict.fromkeys(
+                phrase.strip().lower()
+                for phrase in [name, *spec.get("keywords", []), *_PHRASE_SPLIT_RE.split(str(spec.get("description", "")))]
+                if phrase.strip()
+            ))
+            for name, spec in zip(self.themes, theme_specs)
+        )
+
+        # Item type vocabulary: every type the rules mention
+        type_priorities = _section(data, "type_priorities")
+        type_names: List[str] = [t for t in type_priorities if t != "default"]
+        for name, spec in list(zip(self.themes, theme_specs)) + list(zip(self.vibes, vibe_specs)):
+            type_names.extend(_names(spec.get("boost_types", []), f"rules entry '{name}' boost_types"))
+        for parts in self.theme_parts:
+            type_names.extend(parts)
+        for theme_samples in samples:
+            type_names.extend(item.type for item in theme_samples)
+        self.type_ids: Dict[str, int] = {}
+        for item_type in type_names:
+            self.type_ids.setdefault(sys.intern(item_type.lower()), len(self.type_ids) + 1)
+
+        n_types = len(self.type_ids) + 1
+        priorities = array("d", [float(type_priorities.get("default", 5))]) * n_types
+        for item_type, priority in type_priorities.items():
+            if item_type != "default":
+                priorities[self.type_ids[item_type.lower()]] = float(priority)
+        self.type_priority = memoryview(priorities.tobytes()).cast("d")
+        self.theme_boost = self._boosts(self.themes, theme_specs, n_types, self.weights["theme"], "themes")
+        self.vibe_boost = self._boosts(self.vibes, vibe_specs, n_types, self.weights["vibe"], "vibes")
+
+        # Outfit slots: every part name and item type that fills a slot maps to the slot's name
+        self.slot_of: Dict[str, str] = {}
+        self.slot_fallback: Dict[str, str] = {}
+        slots = _section(data, "slots")
+        for slot, spec in slots.items():
+            if not isinstance(spec, dict):
+                raise ValueError(f"rules.slots.{slot} must be an object")
+            slot = sys.intern(slot.lower())
+            for name in (slot,) + _names(spec.get("types", []), f"rules.slots.{slot}.types"):
+                if self.slot_of.setdefault(name, slot) != slot:
+                    raise ValueError(f"rules.slots: '{name}' is listed under both '{self.slot_of[name]}' and '{slot}'")
+            if "fallback" in spec:
+                self.slot_fallback[slot] = sys.intern(str(spec["fallback"]).lower())
+        for slot, fallback in self.slot_fallback.items():
+            if fallback not in self.slot_of or self.slot_of[fallback] != fallback:
+                raise ValueError(f"rules.slots.{slot}.fallback '{fallback}' is not a defined slot")
+
+        # Keyword matchers, in the file's precedence order
+        self.theme_matcher = KeywordMatcher({
+            name: spec.get("keywords", [name]) for name, spec in zip(self.themes, theme_specs)
+        })
+        self.vibe_matcher = KeywordMatcher({
+            name: spec.get("keywords", [name]) for name, spec in zip(self.vibes, vibe_specs)
+        })
+        self.chat_replies: Dict[str, str] = {
+            name: spec["chat_reply"] for name, spec in zip(self.themes, theme_specs) if "chat_reply" in spec
+        }
+        self.chat_matcher = KeywordMatcher({
+            name: spec.get("chat_keywords", [name])
+            for name, spec in zip(self.themes, theme_specs) if name in self.chat_replies
+        })
+        chat = _section(data, "chat")
+        self.default_chat_reply: str = chat.get(
+            "default_reply", "I'm here to help you discover your perfect style! What kind of vibe are you going for?"
+        )
+
+        npc = _section(data, "npc")
+        intents = _section(npc, "intents", "rules.npc")
+        self.intent_matcher = KeywordMatcher({
+            name: spec.get("keywords", [name]) for name, spec in intents.items()
+        })
+        self.npc_responses: Dict[str, Tuple[str, ...]] = {
+            name: tuple(spec.get("responses", ())) for name, spec in intents.items()
+        }
+        self.default_npc_responses: Tuple[str, ...] = tuple(npc.get("default_responses", ()))
+        if not self.default_npc_responses or not all(self.npc_responses.values()):
+            raise ValueError("rules.npc needs default_responses and responses for every intent")
+
+    @staticmethod
+    def _samples(theme: str, values: Any) -> Tuple[OutfitRecord, ...]:
+        try:
+            return tuple(OutfitRecord(str(asset_id), sys.intern(str(item_type).lower()))
+                         for asset_id, item_type in values)
+        except (TypeError, ValueError):
+            raise ValueError(f"rules.themes.{theme}.samples must be a list of [assetId, type] pairs")
+
+    def _boosts(self, names: Sequence[str], specs: Sequence[Dict[str, Any]], n_types: int,
+                weight: float, where: str) -> memoryview:
+        boost = array("d", [0.0]) * ((len(names) + 1) * n_types)
+        for row, (name, spec) in enumerate(zip(names, specs), start=1):
+            for item_type in _names(spec.get("boost_types", []), f"rules.{where}.{name}.boost_types"):
+                boost[row * n_types + self.type_ids[item_type]] = weight
+        return memoryview(boost.tobytes()).cast("d", (len(names) + 1, n_types))
+
+    def theme_id(self, theme: Optional[str]) -> int:
+        """Id of a theme name (case-insensitive), or 0 if unknown."""
+        if not theme:
+            return 0
+        return self.theme_ids.get(theme) or self.theme_ids.get(theme.lower(), 0)
+
+    def vibe_id(self, vibe: Optional[str]) -> int:
+        """Id of a vibe name (case-insensitive), or 0 if unknown."""
+        if not vibe:
+            return 0
+        return self.vibe_ids.get(vibe) or self.vibe_ids.get(vibe.lower(), 0)
+
+    def type_id(self, item_type: str) -> int:
+        """Id of an item type (case-insensitive), or 0 if unknown."""
+        return self.type_ids.get(item_type) or self.type_ids.get(item_type.lower(), 0)
+
+    def slot(self, name: str) -> Optional[str]:
+        """Outfit slot filled by a part name or item type (case-insensitive), or None if unknown."""
+        return self.slot_of.get(name) or self.slot_of.get(name.lower())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "themes": len(self.themes),
+            "vibes": len(self.vibes),
+            "item_types": len(self.type_ids),
+        }
+
+
+def load_rules(path: str) -> CompiledRules:
+    """Read and compile a rules file; raises OSError or ValueError on failure."""
+    with open(path, "rb") as f:
+        data = json.loads(f.read())
+    return CompiledRules(data, source=path)
+
+
+class RulesLoader:
+    """Holds the active CompiledRules for a file and recompiles them when the file changes."""
+
+    def __init__(self, path: str, reload_interval: float = RULES_RELOAD_INTERVAL):
+        """
+        Args:
+            path: Rules JSON file
+            reload_interval: Minimum seconds between mtime checks (0 checks on every access)
+        """
+        self.path = path
+        self.reload_interval = reload_interval
+        self._rules: Optional[CompiledRules] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self.reloads = 0
+        self.errors = 0
+
+    def get(self) -> CompiledRules:
+        """Return the active rules, reloading them first if the file changed."""
+        now = time.monotonic()
+        if self._rules is None or now - self._checked >= self.reload_interval:
+            self._checked = now
+            self.reload()
+        return self._rules
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recompile the rules if the file changed (or always, with force).
+        A file that cannot be read or compiled keeps the previous rules active; on
+        first load the error is raised instead.
+
+        Returns:
+            True if new rules were activated
+        """
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if not force and self._rules is not None and signature == self._signature:
+                return False
+            rules = load_rules(self.path)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            if self._rules is None:
+                raise
+            logger.error(f"Failed to reload rules from {self.path}, keeping version {self._rules.version}: {e}")
+            return False
+        if self._rules is not None:
+            self.reloads += 1
+            logger.info(f"Reloaded rules from {self.path} (version {rules.version}, {len(rules.themes)} themes)")
+        self._rules = rules
+        self._signature = signature
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._rules.stats() if self._rules is not None else {}
+        stats.update(reloads=self.reloads, errors=self.errors, reload_interval=self.reload_interval)
+        return stats
+
+
+_loader = RulesLoader(DEFAULT_RULES_PATH)
+
+
+def get_rules() -> CompiledRules:
+    """Return the active rules from RULES_PATH, compiling them on first use."""
+    return _loader.get()
+
+
+def reload_rules(force: bool = False) -> bool:
+    """Check RULES_PATH now instead of waiting for the reload interval."""
+    return _loader.reload(force=force)
+
+
+def rules_stats() -> Dict[str, Any]:
+    return _loader.stats()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate a style rules file")
+    parser.add_argument("path", nargs="?", default=DEFAULT_RULES_PATH)
+    args = parser.parse_args(argv)
+    try:
+        rules = load_rules(args.path)
+    except (OSError, ValueError) as e:
+        print(f"Invalid rules file {args.path}: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(rules.stats(), indent=2))
+    print(f"themes: {', '.join(rules.themes)}")
+    print(f"vibes: {', '.join(rules.vibes)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
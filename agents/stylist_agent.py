@@ -3,45 +3,31 @@ Stylist agent for providing fashion advice and style recommendations.
 This agent specializes in understanding user preferences and translating them into style advice.
 """
 
-from typing import Union
+from typing import Optional, Union
+from . import embeddings
 from .contracts import ChatIn, ChatOut, RecommendIn, TagSpec
+from .rules import CompiledRules, get_rules
 
 
 class StylistAgent:
     """
     Stylist agent class for converting natural language prompts to TagSpec.
-    Uses deterministic keyword detection for stable frontend tests.
+    Uses deterministic keyword detection for stable frontend tests; prompts without
+    a keyword hit are matched semantically against the theme descriptions.
     """
     
-    def __init__(self):
-        """Initialize the StylistAgent with keyword mappings."""
-        # Theme keywords mapping - order matters for precedence
-        self.theme_keywords = {
-            "knight": ["knight", "armor", "medieval warrior", "chivalry"],
-            "medieval": ["medieval", "middle ages", "castle", "feudal"],
-            "futuristic": ["futuristic", "cyberpunk", "sci-fi", "space", "tech", "neon"],
-            "formal": ["formal", "professional", "business", "elegant"],
-            "casual": ["casual", "everyday", "comfortable", "relaxed"],
-            "sporty": ["sporty", "athletic", "active", "sport"],
-            "gothic": ["gothic", "dark", "alternative", "goth"],
-            "kawaii": ["kawaii", "cute", "colorful", "adorable"]
-        }
-        
-        # Vibe keywords - can be combined with themes
-        self.vibe_keywords = {
-            "futuristic": ["futuristic", "cyberpunk", "sci-fi", "space", "tech", "neon"],
-            "dramatic": ["dramatic", "gothic", "dark", "intense"],
-            "playful": ["playful", "kawaii", "cute", "fun", "colorful"],
-            "professional": ["professional", "formal", "business"],
-            "relaxed": ["relaxed", "casual", "comfortable"],
-            "active": ["active", "sporty", "athletic"]
-        }
+    def __init__(self, rules: Optional[CompiledRules] = None):
+        """
+        Initialize the StylistAgent.
         
-        # Default parts as specified in the issue
-        self.default_parts = [
-            "Head", "Face", "Torso", "Left Arm", "Right Arm", 
-            "Pants", "Shirt", "Back Accessory"
-        ]
+        Args:
+            rules: Fixed rules to use; the live, hot-reloaded rules if None
+        """
+        self._rules = rules
+    
+    @property
+    def rules(self) -> CompiledRules:
+        return self._rules if self._rules is not None else get_rules()
     
     def run(self, prompt: str) -> TagSpec:
         """
@@ -53,33 +39,25 @@ class StylistAgent:
         Returns:
             TagSpec with detected theme, optional vibe, and default parts
         """
-        prompt_lower = prompt.lower()
-        
-        # Detect theme (first match wins for deterministic behavior)
-        detected_theme = None
-        for theme, keywords in self.theme_keywords.items():
-            if any(keyword in prompt_lower for keyword in keywords):
-                detected_theme = theme
-                break
+        rules = self.rules
         
-        # Default theme if none detected
-        if not detected_theme:
-            detected_theme = "casual"
+        # Detect theme (first match in precedence order wins for deterministic behavior),
+        # then the most similar theme description, falling back to the rules' default theme
+        detected_theme = (
+            rules.theme_matcher.first(prompt)
+            or embeddings.resolve_theme(prompt, rules)
+            or rules.default_theme
+        )
         
         # Detect vibe (independent of theme detection)
-        detected_vibe = None
-        for vibe, keywords in self.vibe_keywords.items():
-            if any(keyword in prompt_lower for keyword in keywords):
-                # Special case: if theme is detected as the same as vibe, don't set vibe
-                if vibe != detected_theme:
-                    detected_vibe = vibe
-                    break
+        # Special case: if theme is detected as the same as vibe, don't set vibe
+        detected_vibe = rules.vibe_matcher.first(prompt, exclude=[detected_theme])
         
         return TagSpec(
             theme=detected_theme,
             vibe=detected_vibe,
             budget=None,  # No budget specified by default
-            parts=self.default_parts
+            parts=list(rules.prompt_parts)
         )
 
 
@@ -93,22 +71,12 @@ def run(input_data: Union[ChatIn, RecommendIn]) -> Union[ChatOut, TagSpec]:
     Returns:
         Either ChatOut for chat interactions or TagSpec for style specifications
     """
+    rules = get_rules()
+    
     if isinstance(input_data, ChatIn):
         # Handle style advice chat
-        prompt_lower = input_data.prompt.lower()
-        
-        if any(word in prompt_lower for word in ["formal", "professional", "business"]):
-            reply = "For a formal look, I'd recommend elegant pieces with clean lines and sophisticated colors!"
-        elif any(word in prompt_lower for word in ["casual", "everyday", "comfortable"]):
-            reply = "Casual style is all about comfort and versatility. Think relaxed fits and easy-to-mix pieces!"
-        elif any(word in prompt_lower for word in ["sporty", "athletic", "active"]):
-            reply = "Sporty vibes call for functional yet stylish pieces that move with you!"
-        elif any(word in prompt_lower for word in ["gothic", "dark", "alternative"]):
-            reply = "Gothic style embraces darker aesthetics with dramatic silhouettes and bold accessories!"
-        elif any(word in prompt_lower for word in ["kawaii", "cute", "colorful"]):
-            reply = "Kawaii style is all about embracing cuteness with bright colors and playful elements!"
-        else:
-            reply = "I'm here to help you discover your perfect style! What kind of vibe are you going for?"
+        style = rules.chat_matcher.first(input_data.prompt)
+        reply = rules.chat_replies[style] if style else rules.default_chat_reply
         
         return ChatOut(
             success=True,
@@ -117,35 +85,25 @@ def run(input_data: Union[ChatIn, RecommendIn]) -> Union[ChatOut, TagSpec]:
         )
     
     elif isinstance(input_data, RecommendIn):
-        # Convert theme to styling specification
-        theme = input_data.theme.lower()
-        
-        # Generate vibe and styling suggestions based on theme
-        vibe_mapping = {
-            "formal": "professional",
-            "casual": "relaxed", 
-            "sporty": "active",
-            "gothic": "dramatic",
-            "kawaii": "playful"
-        }
-        
-        parts_mapping = {
-            "formal": ["shirt", "pants", "shoes", "tie", "jacket"],
-            "casual": ["shirt", "pants", "shoes", "hat"],
-            "sporty": ["jersey", "shorts", "sneakers", "cap"],
-            "gothic": ["shirt", "pants", "boots", "cape", "accessories"],
-            "kawaii": ["dress", "bow", "shoes", "bag", "accessories"]
-        }
-        
-        vibe = vibe_mapping.get(theme, "stylish")
-        parts = parts_mapping.get(theme, ["shirt", "pants", "shoes", "accessories"])
+        # Convert theme to styling specification. Free text that isn't a theme name is resolved
+        # by keyword, then by similarity to the theme descriptions, so catalog searches use a
+        # known theme; text that resolves to nothing keeps the default vibe and parts
+        theme = input_data.theme
+        theme_id = rules.theme_id(theme)
+        prompt = None
+        if theme_id == 0:
+            resolved = rules.theme_matcher.first(theme) or embeddings.resolve_theme(theme, rules)
+            if resolved:
+                theme, prompt, theme_id = resolved, theme, rules.theme_id(resolved)
         
         return TagSpec(
-            theme=input_data.theme,
-            vibe=vibe,
-            budget=None,  # No budget specified by default
-            parts=parts
+            theme=theme,
+            vibe=rules.theme_vibe[theme_id],
+            budget=input_data.budget,
+            outfit_budget=input_data.outfit_budget,
+            parts=list(rules.theme_parts[theme_id]),
+            prompt=prompt
         )
     
     else:
-        raise ValueError(f"Unsupported input type: {type(input_data)}")
\ No newline at end of file
+        raise ValueError(f"Unsupported input type: {type(input_data)}")
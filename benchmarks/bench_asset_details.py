@@ -0,0 +1,97 @@
+"""
+Benchmark: batched asset detail lookups vs one upstream call per asset.
+
+Simulates concurrent recommendation requests that each need details for the
+candidates of several outfit parts (drawn from a shared pool, so requests
+overlap) against an upstream with a fixed delay per call. Compares one call per
+asset with `server.dataloader.BatchLoader` (bulk calls of up to 120 assets,
+per-asset TTL cache), cold and then warm, reporting upstream calls and the
+time for all requests to get their details.
+
+Usage:
+    python -m benchmarks.bench_asset_details [--requests 100] [--assets-per-request 200] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+from server.cache import TTLCache
+from server.dataloader import BatchLoader
+
+
+class SimulatedUpstream:
+    """Details endpoint stand-in: a fixed delay per call, at most `max_items` assets per call."""
+
+    def __init__(self, latency: float, max_items: int = 120):
+        self.latency = latency
+        self.max_items = max_items
+        self.calls = 0
+
+    async def details(self, asset_ids: List[str]) -> Dict[str, tuple]:
+        assert len(asset_ids) <= self.max_items
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return {asset_id: ("hat", int(asset_id) % 400, int(asset_id) % 10_000) for asset_id in asset_ids}
+
+
+async def naive(upstream: SimulatedUpstream, requests: List[List[str]], concurrency: int) -> float:
+    """One call per asset, with at most `concurrency` calls in flight per request."""
+    async def one(asset_ids: List[str]) -> None:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(asset_id: str) -> None:
+            async with semaphore:
+                await upstream.details([asset_id])
+        await asyncio.gather(*(fetch(asset_id) for asset_id in asset_ids))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(asset_ids) for asset_ids in requests))
+    return time.perf_counter() - started
+
+
+async def batched(loader: BatchLoader, requests: List[List[str]]) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(loader.load_many(asset_ids) for asset_ids in requests))
+    return time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(0)
+    pool = [str(1_000_000_000 + i) for i in range(args.pool)]
+    requests = [rng.sample(pool, args.assets_per_request) for _ in range(args.requests)]
+    lookups = args.requests * args.assets_per_request
+    print(f"{args.requests} concurrent requests x {args.assets_per_request} assets "
+          f"(pool of {args.pool}), {args.latency * 1000:.0f}ms per upstream call")
+
+    upstream = SimulatedUpstream(args.latency)
+    elapsed = await naive(upstream, requests, args.concurrency)
+    print(f"{'one call per asset':<28} {upstream.calls:>7} calls  {elapsed * 1000:>8.0f}ms")
+
+    upstream = SimulatedUpstream(args.latency)
+    loader = BatchLoader(upstream.details, max_batch=120, window=args.window,
+                         cache=TTLCache(maxsize=args.pool, ttl=3600, stale_ttl=0))
+    for label in ("batch loader, cold cache", "batch loader, warm cache"):
+        calls = upstream.calls
+        elapsed = await batched(loader, requests)
+        print(f"{label:<28} {upstream.calls - calls:>7} calls  {elapsed * 1000:>8.0f}ms")
+    stats = loader.stats()
+    print(f"{lookups} lookups: {stats['cache_hits']} cache hits, {stats['coalesced']} coalesced, "
+          f"mean batch size {stats['mean_batch_size']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100, help="Concurrent requests")
+    parser.add_argument("--assets-per-request", type=int, default=200, help="Assets needing details per request")
+    parser.add_argument("--pool", type=int, default=5000, help="Distinct assets across all requests")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per upstream call")
+    parser.add_argument("--window", type=float, default=0.005, help="Batch collection window in seconds")
+    parser.add_argument("--concurrency", type=int, default=8, help="Naive calls in flight per request")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: candidate volume vs latency of paginated, multi-category catalog search.
+
+Drives `server.catalog_pages.iter_pages` with a simulated upstream (a fixed
+delay per page, distinct items per category) and compares it with fetching
+the same pages one after another. Reports distinct candidates, time to the
+first page (when ranking can start) and time to the last page.
+
+Usage:
+    python -m benchmarks.bench_catalog_pages [--latency 0.1] [--categories 1 2 4] [--pages 1 2 3]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from agents.contracts import OutfitRecord
+from server.catalog_pages import CatalogPage, iter_pages
+
+
+def make_loader(latency: float, page_size: int, max_pages: int):
+    async def load(category: str, page: int, cursor: Optional[str]) -> CatalogPage:
+        await asyncio.sleep(latency)
+        base = hash(category) % 1000 * 10_000 + page * page_size
+        items = [OutfitRecord(str(base + i), "Asset") for i in range(page_size)]
+        return CatalogPage(items, str(page + 1) if page + 1 < max_pages else None)
+    return load
+
+
+async def sequential(load, categories: List[str], max_pages: int) -> Tuple[int, float, float]:
+    """One page at a time: every category's pages in turn."""
+    started = time.perf_counter()
+    first = None
+    seen = set()
+    for category in categories:
+        cursor = None
+        for page_number in range(max_pages):
+            page = await load(category, page_number, cursor)
+            seen.update(item.assetId for item in page.items)
+            first = first if first is not None else time.perf_counter() - started
+            cursor = page.next_cursor
+            if not cursor:
+                break
+    return len(seen), first, time.perf_counter() - started
+
+
+async def fanned_out(load, categories: List[str], max_pages: int, concurrency: int) -> Tuple[int, float, float]:
+    started = time.perf_counter()
+    first = None
+    count = 0
+    async for items in iter_pages(load, categories, max_pages, concurrency):
+        count += len(items)
+        first = first if first is not None else time.perf_counter() - started
+    return count, first, time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> None:
+    print(f"page latency {args.latency * 1000:.0f}ms, {args.page_size} items per page, "
+          f"concurrency {args.concurrency}")
+    print(f"{'categories':>10} {'pages':>5} {'items':>6} {'sequential':>12} {'fan-out':>12} {'first page':>11}")
+    for n_categories in args.categories:
+        categories = [f"category-{i}" for i in range(n_categories)]
+        for pages in args.pages:
+            load = make_loader(args.latency, args.page_size, pages)
+            items, _, seq_total = await sequential(load, categories, pages)
+            fanned_items, first, total = await fanned_out(load, categories, pages, args.concurrency)
+            assert fanned_items == items
+            print(f"{n_categories:>10} {pages:>5} {items:>6} {seq_total * 1000:>10.0f}ms "
+                  f"{total * 1000:>10.0f}ms {first * 1000:>9.0f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per upstream page")
+    parser.add_argument("--page-size", type=int, default=30, help="Items per page")
+    parser.add_argument("--categories", type=int, nargs="+", default=[1, 2, 4], help="Category filters searched")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 2, 3], help="Pages followed per category")
+    parser.add_argument("--concurrency", type=int, default=4, help="Page fetches in flight")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
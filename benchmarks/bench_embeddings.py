@@ -0,0 +1,94 @@
+"""
+Benchmark: semantic theme resolution and local asset search.
+
+Embeds a synthetic catalog into a temporary memory-mapped index, then times
+resolving free-text prompts to themes (keyword matcher first, as the stylist
+does, then the embedding ThemeIndex) and nearest-neighbour asset searches
+restricted to one item type. Prompts are unique per call, so query embeddings
+are never served from the LRU cache. Reports how many prompts that the
+keyword matcher alone would have sent upstream verbatim now resolve to a theme.
+
+Usage:
+    python -m benchmarks.bench_embeddings [--assets 100000] [--queries 5000]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+from agents import embeddings
+from agents.catalog_store import CatalogRecord
+from agents.rules import get_rules
+
+TYPES = ("shirt", "pants", "shoes", "hat", "cape", "boots", "dress", "back accessory")
+ADJECTIVES = ("red", "dark", "cute", "shiny", "royal", "tactical", "vintage", "neon", "pirate", "spooky",
+              "pastel", "armored", "cozy", "formal", "sporty", "cyber", "medieval", "striped")
+NOUNS = ("hoodie", "tee", "jacket", "vest", "cloak", "robe", "coat", "tricorn", "helmet", "crown",
+         "sneakers", "skirt", "jersey", "suit", "wings", "bow", "visor", "armor")
+PROMPTS = ("pirate captain", "astronaut", "vampire queen", "soccer player", "business meeting",
+           "bunny ears", "princess dress", "robot", "wedding guest", "halloween witch", "hello there",
+           "viking raider", "gym workout", "something pink", "tuxedo", "hacker")
+
+
+def percentiles(samples: List[float]) -> str:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"p50 {statistics.median(samples) * 1e6:7.1f}us  p99 {p99 * 1e6:7.1f}us"
+
+
+def timed(fn: Callable[[int], object], n: int) -> List[float]:
+    samples = []
+    for i in range(n):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=100_000, help="Synthetic catalog size")
+    parser.add_argument("--queries", type=int, default=5000, help="Timed queries per measurement")
+    parser.add_argument("--dim", type=int, default=embeddings.EMBEDDING_DIM, help="Embedding dimension")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    records = [
+        CatalogRecord(asset_id, f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}",
+                      rng.choice(TYPES), rng.choice(("", "casual", "gothic", "kawaii")), rng.randrange(0, 500), "")
+        for asset_id in range(1, args.assets + 1)
+    ]
+
+    with tempfile.TemporaryDirectory() as path:
+        started = time.perf_counter()
+        embeddings.build_asset_index(records, path, args.dim)
+        build = time.perf_counter() - started
+        started = time.perf_counter()
+        index = embeddings.AssetIndex(path)
+        opened = time.perf_counter() - started
+        print(f"{args.assets} assets, dim {args.dim}: built in {build:.1f}s, opened (mmap) in {opened * 1000:.2f}ms")
+
+        rules = get_rules()
+        themes = embeddings.ThemeIndex(rules, args.dim)
+        # A unique suffix per call defeats the query embedding cache
+        resolve = timed(lambda i: rules.theme_matcher.first(PROMPTS[i % len(PROMPTS)])
+                        or themes.resolve(f"{PROMPTS[i % len(PROMPTS)]} q{i}"), args.queries)
+        print(f"theme resolution (keywords, then embeddings): {percentiles(resolve)}")
+        search = timed(lambda i: index.search(f"{PROMPTS[i % len(PROMPTS)]} q{i}", TYPES[i % len(TYPES)], 10),
+                       args.queries)
+        print(f"asset search, one type (~{args.assets // len(TYPES)} rows): {percentiles(search)}")
+
+        keyword_hits = sum(1 for p in PROMPTS if rules.theme_matcher.first(p))
+        semantic_hits = sum(1 for p in PROMPTS if rules.theme_matcher.first(p) or themes.resolve(p))
+        print(f"prompts resolved to a theme: keywords only {keyword_hits}/{len(PROMPTS)}, "
+              f"with embeddings {semantic_hits}/{len(PROMPTS)}")
+        for prompt in PROMPTS:
+            print(f"    {prompt:<18} -> {themes.rank(prompt, 2)}")
+        del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: outfit assembly solver speed and solution quality.
+
+Times `outfit_solver.solve` on random slots (uniform scores, integer Robux
+prices) for growing candidate counts per slot and several top-N sizes, with and
+without a total budget, then checks the beam search against exhaustive search
+on instances small enough to enumerate: how often the returned top-N scores
+match the exact top-N, and the worst score gap of the best outfit.
+
+Usage:
+    python -m benchmarks.bench_outfit_solver [--slots 8] [--candidates 100 1000 5000] [--repeat 20]
+"""
+
+import argparse
+import itertools
+import statistics
+import time
+
+import numpy as np
+
+from agents import outfit_solver
+
+
+def random_slots(rng: np.random.Generator, slots: int, candidates: int):
+    scores = [rng.uniform(0.0, 10.0, candidates) for _ in range(slots)]
+    prices = [rng.integers(0, 400, candidates).astype(np.float64) for _ in range(slots)]
+    return scores, prices
+
+
+def exact_top(scores, prices, budget: float, n: int):
+    """Exhaustive top-n total scores within the budget."""
+    totals = []
+    for combo in itertools.product(*(range(len(s)) for s in scores)):
+        cost = sum(prices[slot][i] for slot, i in enumerate(combo))
+        if cost <= budget:
+            totals.append(sum(scores[slot][i] for slot, i in enumerate(combo)))
+    return sorted(totals, reverse=True)[:n]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slots", type=int, default=8, help="Outfit parts")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 100, 1000, 5000],
+                        help="Candidates per slot")
+    parser.add_argument("--top", type=int, nargs="+", default=[1, 5, 10], help="Alternative outfits")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed solves per configuration")
+    parser.add_argument("--beam-width", type=int, default=outfit_solver.DEFAULT_BEAM_WIDTH)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    budget = 150.0 * args.slots
+    print(f"{args.slots} slots, budget {budget:.0f} (mean item price 200), beam width {args.beam_width}")
+    print(f"{'candidates':>10} {'top':>4} {'no budget':>12} {'budget':>12}")
+    for candidates in args.candidates:
+        scores, prices = random_slots(rng, args.slots, candidates)
+        for top in args.top:
+            timings = {}
+            for label, limit in (("free", None), ("budget", budget)):
+                samples = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    outfit_solver.solve(scores, prices, limit, top_n=top, beam_width=args.beam_width)
+                    samples.append(time.perf_counter() - started)
+                timings[label] = statistics.median(samples) * 1000
+            print(f"{candidates:>10} {top:>4} {timings['free']:>10.2f}ms {timings['budget']:>10.2f}ms")
+
+    exact = 0
+    gaps = []
+    instances = 50
+    for _ in range(instances):
+        scores, prices = random_slots(rng, 4, 15)
+        expected = exact_top(scores, prices, 600.0, 5)
+        solved = outfit_solver.solve(scores, prices, 600.0, top_n=5, beam_width=args.beam_width)
+        got = [outfit.score for outfit in solved]
+        exact += np.allclose(expected, got)
+        gaps.append(expected[0] - got[0])
+    print(f"quality vs exhaustive search (4 slots x 15 candidates, top 5, {instances} instances): "
+          f"{exact}/{instances} exact, worst best-outfit gap {max(gaps):.4f}")
+
+
+if __name__ == "__main__":
+    main()
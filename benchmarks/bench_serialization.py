@@ -0,0 +1,83 @@
+"""
+Microbenchmark: cost of producing one /recommend response body.
+
+Compares the previous path (json parse of the upstream page, an OutfitItem model per
+catalog entry, RecommendResponse validation through response_model, then
+jsonable_encoder + json.dumps as FastAPI's JSONResponse does) with the fast path
+(orjson parse, OutfitRecord tuples, a plain dict encoded with orjson).
+
+Usage:
+    python -m benchmarks.bench_serialization [--items 10] [--rounds 20000]
+"""
+
+import argparse
+import json
+import logging
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from agents.contracts import OutfitRecord
+from server.main import OutfitItem, RecommendRequest, RecommendResponse, outfit_items_from_catalog, recommend_payload
+
+
+def upstream_page(n: int) -> bytes:
+    """A catalog search response body with n items, shaped like the real API."""
+    return json.dumps({
+        "data": [
+            {"id": 1000000 + i, "itemType": "Asset", "assetType": 8, "name": f"Item {i}",
+             "price": 50 + i, "creatorName": "Creator"}
+            for i in range(n)
+        ],
+        "nextPageCursor": None,
+    }).encode()
+
+
+def pydantic_path(body: bytes, request: RecommendRequest) -> bytes:
+    data = json.loads(body)
+    items = [OutfitItem(assetId=str(item["id"]), type=item.get("itemType", "")) for item in data["data"]]
+    response = RecommendResponse(
+        success=True, user_id=request.user_id, message=f"Your {request.theme} outfit is ready!", outfit=items
+    )
+    # FastAPI re-validates the returned model against response_model before encoding
+    validated = RecommendResponse.model_validate(response.model_dump())
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_path(body: bytes, request: RecommendRequest) -> bytes:
+    items = outfit_items_from_catalog(orjson.loads(body)["data"])
+    return orjson.dumps(recommend_payload(request, items))
+
+
+def measure(fn, body: bytes, request: RecommendRequest, rounds: int) -> float:
+    """Mean microseconds per call."""
+    for _ in range(min(rounds, 1000)):
+        fn(body, request)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn(body, request)
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=10, help="Items per response")
+    parser.add_argument("--rounds", type=int, default=20000, help="Responses encoded per path")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    body = upstream_page(args.items)
+    request = RecommendRequest(theme="gothic", user_id=1)
+    assert json.loads(pydantic_path(body, request)) == json.loads(fast_path(body, request)), "wire formats differ"
+
+    before = measure(pydantic_path, body, request, args.rounds)
+    after = measure(fast_path, body, request, args.rounds)
+    print(f"{args.items} items per response, {args.rounds} rounds")
+    print(f"  pydantic + json : {before:8.2f} us/response")
+    print(f"  records + orjson: {after:8.2f} us/response  ({before / after:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: memory and speed of the per-user session store.
+
+Fills a SessionStore with users that each have a full session (recent themes,
+a memoized 10-item outfit and a full seen-items window), measures the heap
+growth with tracemalloc and extrapolates it to one million users, then times
+memo lookups, seen-set reads and record calls.
+
+Usage:
+    python -m benchmarks.bench_sessions [--users 100000] [--seen 32]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from agents.contracts import OutfitRecord
+from server.sessions import SessionStore
+
+THEMES = ("casual", "formal", "sporty", "gothic", "kawaii", "medieval knight", "cyberpunk", "beach party")
+TYPES = ("shirt", "pants", "shoes", "hat", "cape", "boots", "dress", "back accessory")
+
+
+def random_outfit(rng: random.Random, size: int = 10) -> list:
+    return [OutfitRecord(str(rng.randrange(10**9, 10**11)), rng.choice(TYPES)) for _ in range(size)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000, help="Sessions to create")
+    parser.add_argument("--seen", type=int, default=32, help="Seen asset IDs kept per user")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    outfits = [random_outfit(rng) for _ in range(1000)]
+    store = SessionStore(max_users=args.users, max_seen=args.seen)
+
+    requests_per_user = max(5, args.seen // 10 + 1)
+
+    def fill(target: SessionStore) -> None:
+        # Enough requests per user to fill the theme list and the seen window
+        for user_id in range(args.users):
+            for n in range(requests_per_user):
+                target.record(user_id, (THEMES[(user_id + n) % len(THEMES)], None), outfits[(user_id + n) % len(outfits)])
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    measured = SessionStore(max_users=args.users, max_seen=args.seen)
+    fill(measured)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del measured
+    per_user = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / args.users
+
+    started = time.perf_counter()
+    fill(store)
+    record_us = (time.perf_counter() - started) / (args.users * requests_per_user) * 1e6
+
+    print(f"{args.users} users, {args.seen} seen IDs each")
+    print(f"  memory: {per_user:.0f} bytes/user, {per_user * 1_000_000 / 2**20:.0f} MiB per million users")
+    print(f"  record: {record_us:.2f} us/call")
+
+    rounds = 200_000
+    user_ids = [rng.randrange(args.users) for _ in range(rounds)]
+    for name, call in (
+        ("memo", lambda u: store.memo(u, (THEMES[u % len(THEMES)], None))),
+        ("seen", store.seen),
+    ):
+        started = time.perf_counter()
+        for user_id in user_ids:
+            call(user_id)
+        print(f"  {name}: {(time.perf_counter() - started) / rounds * 1e6:.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
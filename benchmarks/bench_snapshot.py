@@ -0,0 +1,133 @@
+"""
+Benchmark: writing and loading a catalog snapshot for a large catalog.
+
+Synthesizes cached search pages covering `--assets` distinct assets (30 per
+page, spread over themes, parts and categories) plus asset details for every
+one of them, writes them with `server.snapshot.write_snapshot`, then measures
+opening the file (mmap plus column views), restoring the newest entries that
+fit the default cache sizes into `TTLCache`s, decoding the whole snapshot, and
+the first cache hit after the restore. For comparison it also times loading the
+same data from a JSON dump.
+
+Usage:
+    python -m benchmarks.bench_snapshot [--assets 1000000] [--page-cache 1024] [--details-cache 100000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import orjson
+
+from agents.contracts import OutfitRecord
+from server.cache import TTLCache
+from server.catalog_pages import CatalogPage
+from server.snapshot import Snapshot, write_snapshot
+
+THEMES = ["casual", "formal", "sporty", "gothic", "kawaii", "pirate", "cyberpunk", "cowboy"]
+PARTS = ["", " shirt", " pants", " hat", " hair", " shoes", " accessory"]
+CATEGORIES = ["CommunityCreations", "Featured"]
+TYPES = ["Shirt", "Pants", "Hat", "Hair", "Shoes", "Accessory"]
+
+
+def synthesize(n_assets: int, page_size: int, rng: random.Random):
+    pages = []
+    details = []
+    for start in range(0, n_assets, page_size):
+        n = start // page_size
+        keyword = THEMES[n % len(THEMES)] + PARTS[n // len(THEMES) % len(PARTS)] + f" {n // 56}"
+        items = [
+            OutfitRecord(str(1_000_000_000 + i), TYPES[i % len(TYPES)], rng.randrange(0, 500), rng.randrange(0, 100_000))
+            for i in range(start, min(start + page_size, n_assets))
+        ]
+        age = rng.uniform(0, 3600)
+        pages.append((keyword, CATEGORIES[n % 2], page_size, n % 3, CatalogPage(items, f"cursor-{n}"), age))
+        details.extend((item.assetId, (item.type.lower(), item.price, item.favorites), age) for item in items)
+    return pages, details
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def restore(path: str, page_cache: TTLCache, details_cache: TTLCache, page_limit: int, details_limit: int) -> None:
+    with Snapshot(path) as snapshot:
+        for keyword, category, page_size, page_number, page, age in snapshot.pages(
+            page_cache.ttl + page_cache.stale_ttl, page_limit
+        ):
+            page_cache.restore((keyword, category, page_size, page_number), page, age)
+        for asset_id, value, age in snapshot.details(details_cache.ttl + details_cache.stale_ttl, details_limit):
+            details_cache.restore(asset_id, value, age)
+
+
+def run(args: argparse.Namespace) -> None:
+    rng = random.Random(0)
+    (pages, details), elapsed = timed(lambda: synthesize(args.assets, args.page_size, rng))
+    print(f"{args.assets} assets in {len(pages)} pages, {len(details)} details (synthesized in {elapsed:.1f}s)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog-snapshot.bin")
+        counts, elapsed = timed(lambda: write_snapshot(path, pages, details))
+        print(f"{'write snapshot':<34} {elapsed * 1000:>9.0f}ms  {counts['bytes'] / 1e6:.1f} MB")
+
+        json_path = os.path.join(directory, "catalog.json")
+        with open(json_path, "wb") as f:
+            f.write(orjson.dumps({
+                "pages": [
+                    (k, c, s, n, [(i.assetId, i.type, i.price, i.favorites) for i in p.items], p.next_cursor, a)
+                    for k, c, s, n, p, a in pages
+                ],
+                "details": details,
+            }))
+        del pages, details
+
+        def open_snapshot():
+            with Snapshot(path) as snapshot:
+                return snapshot.stats()
+        _, elapsed = timed(open_snapshot)
+        print(f"{'open (mmap + column views)':<34} {elapsed * 1000:>9.2f}ms")
+
+        def warm_start():
+            page_cache = TTLCache(maxsize=args.page_cache, ttl=300, stale_ttl=3600)
+            details_cache = TTLCache(maxsize=args.details_cache, ttl=3600, stale_ttl=0)
+            restore(path, page_cache, details_cache, args.page_cache, args.details_cache)
+            return page_cache, details_cache
+        (page_cache, details_cache), elapsed = timed(warm_start)
+        print(f"{'restore into default-size caches':<34} {elapsed * 1000:>9.0f}ms  "
+              f"{len(page_cache)} pages, {len(details_cache)} details")
+
+        key, _, _ = page_cache.entries()[-1]
+        hit, elapsed = timed(lambda: page_cache.get(key))
+        assert hit is not None
+        print(f"{'first page cache hit':<34} {elapsed * 1e6:>9.1f}us")
+
+        def decode_all():
+            with Snapshot(path) as snapshot:
+                return len(snapshot.pages(float("inf"), args.assets)), len(snapshot.details(float("inf"), args.assets))
+        (n_pages, n_details), elapsed = timed(decode_all)
+        print(f"{'decode entire snapshot':<34} {elapsed * 1000:>9.0f}ms  {n_pages} pages, {n_details} details")
+
+        def load_json():
+            with open(json_path, "rb") as f:
+                data = orjson.loads(f.read())
+            return [CatalogPage([OutfitRecord(*i) for i in p[4]], p[5]) for p in data["pages"]], data["details"]
+        _, elapsed = timed(load_json)
+        print(f"{'load entire JSON dump':<34} {elapsed * 1000:>9.0f}ms  {os.path.getsize(json_path) / 1e6:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=1_000_000, help="Distinct assets in the snapshot")
+    parser.add_argument("--page-size", type=int, default=30, help="Items per cached page")
+    parser.add_argument("--page-cache", type=int, default=1024, help="Catalog page cache size (CATALOG_CACHE_SIZE)")
+    parser.add_argument("--details-cache", type=int, default=100_000,
+                        help="Asset details cache size (ASSET_DETAILS_CACHE_SIZE)")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark: cold-start time of the server.
+
+Reports where `import server.main` spends its time (parsed from
+`python -X importtime`, per direct import and per top-level package), then
+starts fresh server processes and measures the time from spawn to the first
+answered GET / and to the first /chat and /recommend responses. The catalog
+upstream points at a closed port, so /recommend measures the agent pipeline
+and the sample-data fallback rather than the network. Every figure is the median
+of --runs repetitions.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--top 12]
+    python -m benchmarks.bench_startup --gunicorn 4          # multi-worker production mode
+    python -m benchmarks.bench_startup --gunicorn 4 --no-preload
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.loadgen import REPO_ROOT, git_commit
+
+SERVER_ENV = {
+    "INGEST_ENABLED": "0",
+    "CATALOG_STORE_ENABLED": "0",
+    "CATALOG_MAX_ATTEMPTS": "1",
+    "ROBLOX_CATALOG_URL": "http://127.0.0.1:9",
+}
+
+
+def import_profile() -> Tuple[float, Dict[str, float], Dict[str, float]]:
+    """
+    Import server.main once in a fresh interpreter with -X importtime.
+
+    Returns:
+        (total seconds, cumulative seconds per direct import of server.main,
+         self seconds per top-level package)
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server.main"],
+        cwd=REPO_ROOT, env={**os.environ, **SERVER_ENV}, capture_output=True, text=True, check=True
+    ).stderr
+    total = 0.0
+    direct: Dict[str, float] = {}
+    packages: Dict[str, float] = defaultdict(float)
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        module = name.strip()
+        packages[module.split(".")[0]] += int(self_us) / 1e6
+        if module == "server.main":
+            total = int(cumulative_us) / 1e6
+        elif depth == 1:
+            direct[module] = int(cumulative_us) / 1e6
+    return total, direct, dict(packages)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_requests(command: List[str], port: int, env: Dict[str, str], timeout: float = 60.0) -> Dict[str, object]:
+    """Spawn a server and time its first responses, measured from spawn."""
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env={**os.environ, **SERVER_ENV, **env},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=5.0) as client:
+            while True:
+                try:
+                    client.get(f"{base}/").raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    if time.perf_counter() - started > timeout or process.poll() is not None:
+                        raise RuntimeError(f"Server did not start: {' '.join(command)}")
+                    time.sleep(0.01)
+            ready = time.perf_counter() - started
+            client.post(f"{base}/chat", json={"prompt": "hello", "user_id": 1}).raise_for_status()
+            chat = time.perf_counter() - started
+            client.post(f"{base}/recommend", json={"theme": "gothic", "user_id": 1}).raise_for_status()
+            recommend = time.perf_counter() - started
+            report = client.get(f"{base}/stats").json().get("startup")
+    finally:
+        process.terminate()
+        process.wait()
+    return {"ready": ready, "first_chat": chat, "first_recommend": recommend, "server_report": report}
+
+
+def median(values: List[float]) -> float:
+    return statistics.median(values) if values else 0.0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions per measurement")
+    parser.add_argument("--top", type=int, default=12, help="Direct imports and packages to list")
+    parser.add_argument("--gunicorn", type=int, metavar="WORKERS", help="Start gunicorn with this many workers")
+    parser.add_argument("--no-preload", action="store_true", help="With --gunicorn, import the app in each worker")
+    parser.add_argument("--output", help="Also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    total = median([p[0] for p in profiles])
+    direct = {m: median([p[1].get(m, 0.0) for p in profiles]) for m in profiles[0][1]}
+    packages = {m: median([p[2].get(m, 0.0) for p in profiles]) for m in profiles[0][2]}
+
+    print(f"import server.main: {total * 1000:.0f} ms (median of {args.runs})")
+    print("  slowest direct imports (cumulative):")
+    for module, seconds in sorted(direct.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"    {module:<32} {seconds * 1000:8.1f} ms")
+    print("  import time by top-level package (self):")
+    for package, seconds in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"    {package:<32} {seconds * 1000:8.1f} ms")
+
+    runs = []
+    for _ in range(args.runs):
+        port = free_port()
+        if args.gunicorn:
+            command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "server.main:app"]
+            env = {"PORT": str(port), "WEB_CONCURRENCY": str(args.gunicorn),
+                   "PRELOAD_APP": "0" if args.no_preload else "1"}
+        else:
+            command = [sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(port),
+                       "--log-level", "warning"]
+            env = {}
+        runs.append(first_requests(command, port, env))
+
+    mode = f"gunicorn, {args.gunicorn} workers{', no preload' if args.no_preload else ''}" if args.gunicorn else "uvicorn"
+    print(f"cold start ({mode}, median of {args.runs}, from spawn):")
+    summary = {key: median([run[key] for run in runs]) for key in ("ready", "first_chat", "first_recommend")}
+    for key, seconds in summary.items():
+        print(f"    {key:<32} {seconds * 1000:8.1f} ms")
+    if runs[-1]["server_report"]:
+        print(f"  server report (last run): {json.dumps(runs[-1]['server_report'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**git_commit(), "mode": mode, "import_seconds": total, "direct_imports": direct,
+                       "packages": packages, "cold_start": summary, "runs": runs}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
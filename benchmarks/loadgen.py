@@ -0,0 +1,325 @@
+"""
+Load generator and benchmark report for the outfit server and the agents.
+
+Drives /chat and /recommend at fixed concurrency levels (each level is a pool of
+workers sending requests back to back) and times the agents' `run` functions
+in-process. Every scenario reports throughput, mean and p50/p95/p99 latency, and
+the whole run is written as JSON (tagged with the git commit) so runs on
+different commits can be compared.
+
+By default the mock catalog (benchmarks/mock_catalog.py) and the server are
+started as subprocesses, with the server pointed at the mock upstream.
+
+Usage:
+    python -m benchmarks.loadgen
+    python -m benchmarks.loadgen --scenarios recommend --concurrency 1 16 64 --requests 2000 --cold
+    python -m benchmarks.loadgen --target http://127.0.0.1:8000 --scenarios chat recommend
+    python -m benchmarks.loadgen --compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+HTTP_SCENARIOS = ("chat", "recommend")
+AGENT_SCENARIOS = ("stylist", "catalog", "ranker", "orchestrator")
+
+THEMES = ("casual", "formal", "sporty", "gothic", "kawaii", "medieval knight", "cyberpunk street", "beach party")
+PROMPTS = (
+    "hello there!",
+    "can you recommend a gothic outfit?",
+    "I want something cute and pastel",
+    "what should I wear to a formal party",
+    "show me some sporty clothes",
+)
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending sequence (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(scenario: str, concurrency: int, latencies: List[float], errors: int, elapsed: float) -> dict:
+    """Throughput and latency summary (milliseconds) for one scenario run."""
+    ordered = sorted(latencies)
+    completed = len(ordered)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": completed + errors,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(ordered) / completed * 1000, 3) if completed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def http_request_factory(scenario: str, cold: bool) -> Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]:
+    """Return a coroutine function sending one request of the scenario."""
+    rng = random.Random(0)
+
+    if scenario == "chat":
+        async def send(client: httpx.AsyncClient, n: int) -> httpx.Response:
+            return await client.post("/chat", json={"prompt": rng.choice(PROMPTS), "user_id": n})
+    elif scenario == "recommend":
+        async def send(client: httpx.AsyncClient, n: int) -> httpx.Response:
+            # Cold runs use a unique theme per request so every request misses the caches
+            theme = f"{rng.choice(THEMES)} {n}" if cold else rng.choice(THEMES)
+            return await client.post("/recommend", json={"theme": theme, "user_id": n})
+    else:
+        raise ValueError(f"Unknown HTTP scenario: {scenario}")
+    return send
+
+
+async def run_http_scenario(
+    target: str,
+    scenario: str,
+    concurrency: int,
+    requests: int,
+    warmup: int = 20,
+    cold: bool = False,
+    timeout: float = 30.0,
+) -> dict:
+    """
+    Send `requests` requests from `concurrency` workers and summarize the latencies.
+    Non-2xx responses and transport errors count as errors.
+    """
+    send = http_request_factory(scenario, cold)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=timeout) as client:
+        for n in range(warmup):
+            await send(client, -1 - n)
+
+        latencies: List[float] = []
+        errors = 0
+        counter = iter(range(requests))
+
+        async def worker() -> None:
+            nonlocal errors
+            for n in counter:
+                started = time.perf_counter()
+                try:
+                    response = await send(client, n)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(scenario, concurrency, latencies, errors, elapsed)
+
+
+def agent_callable(scenario: str) -> Callable[[int], object]:
+    """Return a function running one in-process call of an agent."""
+    from agents import catalog_agent, orchestrator, ranker_agent, stylist_agent
+    from agents.contracts import RecommendIn, TagSpec
+
+    rng = random.Random(0)
+    if scenario == "stylist":
+        return lambda n: stylist_agent.run(RecommendIn(theme=rng.choice(THEMES), user_id=n))
+    if scenario == "catalog":
+        return lambda n: catalog_agent.run(TagSpec(theme=rng.choice(THEMES), parts=["shirt", "pants", "shoes", "hat"]))
+    if scenario == "ranker":
+        specs = [stylist_agent.run(RecommendIn(theme=theme, user_id=0)) for theme in THEMES]
+        items = [catalog_agent.run(spec) for spec in specs]
+        return lambda n: ranker_agent.run((items[n % len(items)], specs[n % len(specs)]))
+    if scenario == "orchestrator":
+        return lambda n: orchestrator.run(RecommendIn(theme=rng.choice(THEMES), user_id=n))
+    raise ValueError(f"Unknown agent scenario: {scenario}")
+
+
+def run_agent_scenario(scenario: str, requests: int, warmup: int = 100) -> dict:
+    """Time sequential in-process agent runs (concurrency is always 1)."""
+    call = agent_callable(scenario)
+    for n in range(warmup):
+        call(n)
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for n in range(requests):
+        call_started = time.perf_counter()
+        try:
+            call(n)
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(scenario, 1, latencies, errors, time.perf_counter() - started)
+
+
+def git_commit() -> Dict[str, object]:
+    """Current commit hash and whether the working tree has uncommitted changes."""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                             cwd=REPO_ROOT, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def wait_for_http(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def spawn(command: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        command, cwd=REPO_ROOT, env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def mock_stats(mock_url: Optional[str]) -> Optional[dict]:
+    if not mock_url:
+        return None
+    try:
+        return httpx.get(f"{mock_url}/stats", timeout=2.0).json()
+    except httpx.HTTPError:
+        return None
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print per-scenario throughput and latency changes between two result files."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    baseline = {(r["scenario"], r["concurrency"]): r for r in before["results"]}
+
+    def delta(old: float, new: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    print(f"{'scenario':<14}{'conc':>5}{'rps':>12}{'Δrps':>9}{'p50 ms':>10}{'Δp50':>9}{'p99 ms':>10}{'Δp99':>9}")
+    for result in after["results"]:
+        old = baseline.get((result["scenario"], result["concurrency"]))
+        if old is None:
+            continue
+        print(
+            f"{result['scenario']:<14}{result['concurrency']:>5}"
+            f"{result['throughput_rps']:>12.1f}{delta(old['throughput_rps'], result['throughput_rps']):>9}"
+            f"{result['p50_ms']:>10.2f}{delta(old['p50_ms'], result['p50_ms']):>9}"
+            f"{result['p99_ms']:>10.2f}{delta(old['p99_ms'], result['p99_ms']):>9}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark /chat, /recommend and the agents")
+    parser.add_argument("--target", help="Benchmark a running server instead of spawning one")
+    parser.add_argument("--scenarios", nargs="+", default=list(HTTP_SCENARIOS + AGENT_SCENARIOS),
+                        choices=HTTP_SCENARIOS + AGENT_SCENARIOS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per HTTP scenario and level")
+    parser.add_argument("--agent-requests", type=int, default=5000, help="Calls per agent scenario")
+    parser.add_argument("--cold", action="store_true", help="Unique /recommend themes and no catalog cache")
+    parser.add_argument("--server-port", type=int, default=8765)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--mock-latency", type=float, default=0.05)
+    parser.add_argument("--mock-jitter", type=float, default=0.02)
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    http_scenarios = [s for s in args.scenarios if s in HTTP_SCENARIOS]
+    agent_scenarios = [s for s in args.scenarios if s in AGENT_SCENARIOS]
+    processes: List[subprocess.Popen] = []
+    target = args.target
+    mock_url = None
+    results: List[dict] = []
+
+    try:
+        if http_scenarios and not target:
+            mock_url = f"http://127.0.0.1:{args.mock_port}"
+            processes.append(spawn([
+                sys.executable, "-m", "benchmarks.mock_catalog", "--port", str(args.mock_port),
+                "--latency", str(args.mock_latency), "--jitter", str(args.mock_jitter),
+                "--error-rate", str(args.mock_error_rate)
+            ]))
+            wait_for_http(f"{mock_url}/stats")
+            server_env = {
+                "ROBLOX_CATALOG_URL": mock_url,
+                "INGEST_ENABLED": "0",
+                "CATALOG_STORE_ENABLED": "0",
+            }
+            if args.cold:
+                server_env.update(CATALOG_CACHE_TTL="0", CATALOG_CACHE_STALE_TTL="0")
+            target = f"http://127.0.0.1:{args.server_port}"
+            processes.append(spawn([
+                sys.executable, "-m", "uvicorn", "server.main:app", "--port", str(args.server_port),
+                "--log-level", "warning", "--no-access-log"
+            ], server_env))
+            wait_for_http(f"{target}/")
+
+        for scenario in http_scenarios:
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_http_scenario(target, scenario, concurrency, args.requests, cold=args.cold))
+                results.append(result)
+                print(json.dumps(result))
+        for scenario in agent_scenarios:
+            result = run_agent_scenario(scenario, args.agent_requests)
+            results.append(result)
+            print(json.dumps(result))
+        upstream = mock_stats(mock_url)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    report = {
+        **git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "upstream": upstream,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit'] or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
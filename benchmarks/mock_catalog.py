@@ -0,0 +1,148 @@
+"""
+Local stand-in for catalog.roblox.com used by the benchmark suite.
+Serves the /v2/search/items/details endpoint with deterministic, keyword-derived
+results and the bulk /v1/catalog/items/details endpoint (up to 120 assets, behind
+an X-CSRF-TOKEN handshake like the real one), with configurable response latency
+and a configurable error rate, and counts the requests it receives so runs can
+report upstream traffic.
+
+Usage:
+    python -m benchmarks.mock_catalog --port 9100 --latency 0.05 --jitter 0.02 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import random
+import zlib
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+# Asset types cycled through the results (hat, shirt, pants, hair/back/waist accessories, shoes, dress)
+ASSET_TYPES = (8, 11, 12, 41, 46, 47, 70, 72)
+# Most assets per bulk details call, and the token the details endpoint hands out
+DETAILS_MAX_ITEMS = 120
+CSRF_TOKEN = "mock-csrf-token"
+
+
+class MockCatalogConfig:
+    """Latency and failure behaviour of the mock upstream."""
+
+    __slots__ = ("latency", "jitter", "error_rate", "pages", "seed")
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0, pages: int = 3,
+                 seed: int = 0):
+        """
+        Args:
+            latency: Mean response delay in seconds
+            jitter: Maximum extra uniform random delay in seconds
+            error_rate: Fraction of requests answered with HTTP 503
+            pages: Number of result pages per keyword (cursor pagination)
+            seed: Random seed for delays and errors
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.pages = pages
+        self.seed = seed
+
+
+def search_results(keyword: str, limit: int, page: int, category: str = "") -> list:
+    """Deterministic catalog search results for a keyword page (distinct per category filter)."""
+    base = zlib.crc32(f"{keyword}|{category}".encode()) % 100_000 * 1_000 + 1_000_000_000
+    return [
+        {
+            "id": base + page * limit + i,
+            "itemType": "Asset",
+            "assetType": ASSET_TYPES[(page * limit + i) % len(ASSET_TYPES)],
+            "name": f"{keyword.title()} Item {page * limit + i}",
+            "price": (page * limit + i) * 5 % 400,
+            "favoriteCount": zlib.crc32(str(base + page * limit + i).encode()) % 100_000,
+            "creatorName": "MockCreator",
+        }
+        for i in range(limit)
+    ]
+
+
+def asset_details(asset_id: int) -> dict:
+    """Deterministic details for an asset ID (consistent with search_results)."""
+    return {
+        "id": asset_id,
+        "itemType": "Asset",
+        "assetType": ASSET_TYPES[asset_id % len(ASSET_TYPES)],
+        "name": f"Item {asset_id}",
+        "price": asset_id * 5 % 400,
+        "favoriteCount": zlib.crc32(str(asset_id).encode()) % 100_000,
+        "creatorName": "MockCreator",
+    }
+
+
+def create_app(config: MockCatalogConfig) -> FastAPI:
+    app = FastAPI(title="Mock Roblox Catalog")
+    rng = random.Random(config.seed)
+    counters = {"requests": 0, "errors": 0, "details_requests": 0, "details_items": 0}
+
+    @app.get("/v2/search/items/details")
+    async def search(request: Request):
+        counters["requests"] += 1
+        delay = config.latency + (rng.uniform(0, config.jitter) if config.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if config.error_rate and rng.random() < config.error_rate:
+            counters["errors"] += 1
+            raise HTTPException(status_code=503, detail="Mock upstream error")
+
+        keyword = request.query_params.get("keyword", "")
+        limit = min(int(request.query_params.get("limit", "10")), 120)
+        cursor = request.query_params.get("cursor")
+        page = int(cursor) if cursor and cursor.isdigit() else 0
+        return {
+            "data": search_results(keyword, limit, page, request.query_params.get("categoryFilter", "")),
+            "nextPageCursor": str(page + 1) if page + 1 < config.pages else None,
+        }
+
+    @app.post("/v1/catalog/items/details")
+    async def details(request: Request):
+        if request.headers.get("x-csrf-token") != CSRF_TOKEN:
+            return JSONResponse({"errors": [{"code": 0, "message": "Token Validation Failed"}]},
+                                status_code=403, headers={"x-csrf-token": CSRF_TOKEN})
+        counters["details_requests"] += 1
+        items = (await request.json()).get("items") or []
+        if len(items) > DETAILS_MAX_ITEMS:
+            raise HTTPException(status_code=400, detail="Too many items")
+        counters["details_items"] += len(items)
+        delay = config.latency + (rng.uniform(0, config.jitter) if config.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return {"data": [asset_details(int(item["id"])) for item in items]}
+
+    @app.get("/stats")
+    async def stats():
+        return dict(counters)
+
+    @app.post("/stats/reset")
+    async def reset():
+        counters.update(requests=0, errors=0, details_requests=0, details_items=0)
+        return dict(counters)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the mock catalog upstream")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 503")
+    parser.add_argument("--pages", type=int, default=3, help="Result pages per keyword")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockCatalogConfig(args.latency, args.jitter, args.error_rate, args.pages, args.seed)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
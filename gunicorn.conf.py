@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration for the multi-worker production server.
+
+Runs one uvicorn worker per available core (uvloop and httptools are used
+automatically when installed, as with uvicorn[standard]), recycles workers
+after a jittered number of requests, and points every worker at the same
+shared catalog cache and ingestion lock so adding workers does not multiply
+upstream catalog calls. The app is imported once in the master and workers are
+forked from it, so a cold start pays the import once instead of once per worker.
+
+Usage:
+    gunicorn -c gunicorn.conf.py server.main:app
+"""
+
+import os
+import tempfile
+
+
+def _available_cores() -> int:
+    # Respect CPU affinity (containers, taskset) where the platform exposes it
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(_available_cores())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Graceful worker recycling: restart each worker after max_requests (+ jitter so
+# workers don't restart together), giving in-flight requests graceful_timeout to finish
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Import the app (and warm up the agent pipeline) once in the master; workers fork from it,
+# share the loaded modules copy-on-write and respawn quickly after max_requests
+preload_app = os.getenv("PRELOAD_APP", "1").lower() in ("1", "true", "yes")
+
+accesslog = "-" if os.getenv("ACCESS_LOG", "0").lower() in ("1", "true", "yes") else None
+errorlog = "-"
+
+# Workers inherit these from the master: one catalog cache and one crawler for all of them
+_runtime_dir = os.getenv("RUNTIME_DIR", os.path.join(tempfile.gettempdir(), "outfit-backend"))
+os.makedirs(_runtime_dir, exist_ok=True)
+os.environ.setdefault("CATALOG_SHARED_CACHE_PATH", os.path.join(_runtime_dir, "catalog-cache.sqlite3"))
+os.environ.setdefault("INGEST_LOCK_PATH", os.path.join(_runtime_dir, "ingest.lock"))
+
+
+def when_ready(server):
+    # Runs in the master before workers are forked: with preload_app, load the lazily
+    # imported agent pipeline here so every worker inherits it instead of loading its own
+    if preload_app:
+        from server.main import warm_up_agents
+        warm_up_agents()
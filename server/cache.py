@@ -0,0 +1,299 @@
+"""
+In-process TTL/LRU cache for catalog search results.
+Entries are fresh for `ttl` seconds, then served stale for up to `stale_ttl`
+more seconds while a single background refresh replaces them. An optional
+shared backend (server/shared_cache.py) acts as a second level visible to
+every worker process.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from server.shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """A cached value together with the time it was stored."""
+
+    __slots__ = ("value", "stored_at")
+
+    def __init__(self, value: Any, stored_at: float):
+        self.value = value
+        self.stored_at = stored_at
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with time-based freshness and stale-while-revalidate.
+    Not thread-safe; it is meant to be used from a single event loop.
+
+    With a `shared` backend, local misses and stale entries are looked up there
+    first, stored values are written through, and only the process holding the
+    backend's fill lease calls the loader for a missing key; the others poll the
+    backend for up to `lease_wait` seconds before loading it themselves.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        stale_ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+        shared: Optional["SharedCache"] = None,
+        lease_wait: float = 2.0,
+        lease_poll: float = 0.02,
+        fresh_for: Optional[Callable[[Any], float]] = None,
+    ):
+        """
+        Args:
+            maxsize: Maximum number of entries before least-recently-used eviction
+            ttl: Seconds an entry is served as fresh
+            stale_ttl: Extra seconds an expired entry may be served while it is refreshed
+            clock: Monotonic time source (overridable for tests and benchmarks)
+            shared: Cross-process second-level backend
+            lease_wait: Seconds to wait for another process filling a missing key
+            lease_poll: Seconds between backend polls while waiting
+            fresh_for: Seconds a value is fresh when that should be less than ttl (e.g. for
+                partial results); such entries are stored backdated so they turn stale sooner
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self.shared = shared
+        self.lease_wait = lease_wait
+        self.lease_poll = lease_poll
+        self.fresh_for = fresh_for
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.shared_hits = 0
+        self.shared_waits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the entry for key (fresh or stale), dropping it if fully expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._clock() - entry.stored_at > self.ttl + self.stale_ttl:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _lookup_shared(self, key: Hashable, newer_than: Optional[CacheEntry] = None) -> Optional[CacheEntry]:
+        """Load key from the shared backend into the local cache if it is usable (and newer)."""
+        if self.shared is None:
+            return None
+        found = self.shared.get(key)
+        if found is None:
+            return None
+        value, age = found
+        stored_at = self._clock() - age
+        if age > self.ttl + self.stale_ttl or (newer_than is not None and stored_at <= newer_than.stored_at):
+            return None
+        self.shared_hits += 1
+        self._store(key, value, stored_at)
+        return self._entries[key]
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """Whether an entry is still within its TTL."""
+        return self._clock() - entry.stored_at <= self.ttl
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh value for key, or None. Does not count stale entries as hits."""
+        entry = self._lookup(key)
+        if entry is None or not self.is_fresh(entry):
+            entry = self._lookup_shared(key, entry) or entry
+        if entry is None or not self.is_fresh(entry):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None) -> None:
+        """Store value under key (and in the shared backend), evicting least-recently-used entries when full."""
+        now = self._clock()
+        if stored_at is None:
+            stored_at = now
+            if self.fresh_for is not None:
+                stored_at -= max(0.0, self.ttl - self.fresh_for(value))
+        self._store(key, value, stored_at)
+        if self.shared is not None:
+            self.shared.set(key, value, age=max(0.0, now - stored_at))
+
+    def _store(self, key: Hashable, value: Any, stored_at: float) -> None:
+        self._entries[key] = CacheEntry(value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def restore(self, key: Hashable, value: Any, age: float) -> bool:
+        """
+        Store an entry loaded from elsewhere (e.g. a snapshot) with its age, without
+        writing it to the shared backend. Entries past ttl + stale_ttl or older than
+        the local entry for key are skipped.
+
+        Returns:
+            Whether the entry was stored
+        """
+        if age > self.ttl + self.stale_ttl:
+            return False
+        stored_at = self._clock() - max(0.0, age)
+        existing = self._entries.get(key)
+        if existing is not None and existing.stored_at >= stored_at:
+            return False
+        self._store(key, value, stored_at)
+        return True
+
+    def entries(self) -> List[Tuple[Hashable, Any, float]]:
+        """(key, value, age in seconds) of every usable local entry, least recently used first."""
+        now = self._clock()
+        limit = self.ttl + self.stale_ttl
+        return [
+            (key, entry.value, now - entry.stored_at)
+            for key, entry in self._entries.items()
+            if now - entry.stored_at <= limit
+        ]
+
+    def delete(self, key: Hashable) -> None:
+        """Remove key from the local cache if present."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every local entry (counters are kept)."""
+        self._entries.clear()
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+    ) -> Optional[Any]:
+        """
+        Return the cached value for key, loading it on a miss.
+
+        Fresh entries are returned directly. Stale entries are returned immediately
+        while one background task refreshes them. On a miss the loader is awaited;
+        a None result means "nothing to cache" (e.g. upstream failure) and is returned as-is.
+        With a shared backend, its entries count as local ones and a miss that
+        another process is already filling waits for that process's result.
+
+        Args:
+            key: Cache key
+            loader: Coroutine factory producing the value, or None on failure
+
+        Returns:
+            The cached or freshly loaded value, or None if the loader failed
+        """
+        entry = self._lookup(key)
+        if entry is None or not self.is_fresh(entry):
+            entry = self._lookup_shared(key, entry) or entry
+        if entry is not None:
+            if self.is_fresh(entry):
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._schedule_refresh(key, loader)
+            return entry.value
+
+        self.misses += 1
+        if self.shared is not None and not self.shared.try_lease(key):
+            entry = await self._wait_for_shared(key)
+            if entry is not None:
+                return entry.value
+        try:
+            value = await loader()
+        except BaseException:
+            if self.shared is not None:
+                self.shared.release(key)
+            raise
+        if value is not None:
+            self.set(key, value)
+        elif self.shared is not None:
+            self.shared.release(key)
+        return value
+
+    async def _wait_for_shared(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Poll the shared backend while another process fills key.
+        Returns None (the caller loads the key itself) once the wait times out or
+        the lease is released without a value, e.g. after an upstream failure.
+        """
+        self.shared_waits += 1
+        deadline = self._clock() + self.lease_wait
+        while self._clock() < deadline:
+            await asyncio.sleep(self.lease_poll)
+            entry = self._lookup_shared(key)
+            if entry is not None:
+                return entry
+            if not self.shared.is_leased(key):
+                return None
+        return None
+
+    def _schedule_refresh(self, key: Hashable, loader: Callable[[], Awaitable[Optional[Any]]]) -> None:
+        """Start a background refresh for key unless one is already running (here or in another process)."""
+        if key in self._refreshing:
+            return
+        if self.shared is not None and not self.shared.try_lease(key):
+            return
+        self._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(self._refresh(key, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Optional[Any]]]) -> None:
+        try:
+            value = await loader()
+            if value is not None:
+                self.set(key, value)
+                self.refreshes += 1
+            else:
+                self.refresh_failures += 1
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.warning(f"Background refresh failed for cache key {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+            if self.shared is not None:
+                self.shared.release(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and sizing information for monitoring."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": len(self._refreshing),
+            "shared_hits": self.shared_hits,
+            "shared_waits": self.shared_waits,
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
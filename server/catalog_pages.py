@@ -0,0 +1,114 @@
+"""
+Paginated, multi-category catalog search.
+One search is spread over several category filters. Each category is a chain
+of pages linked by the API's cursor, so its pages are fetched in order (each
+one is requested as soon as the previous page arrives), while the categories
+run concurrently under a semaphore. Items are yielded page by page as they
+arrive, deduplicated by asset ID, so a consumer can start ranking the first
+page while later pages are still in flight.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogPage(NamedTuple):
+    """
+    One page of search results and the cursor of the page after it. `partial` marks a
+    page whose items could not be completed (e.g. asset details were unavailable).
+    """
+    items: List[Any]
+    next_cursor: Optional[str] = None
+    partial: bool = False
+
+
+# (category, page number, cursor) -> the page, or None if it could not be fetched
+PageLoader = Callable[[str, int, Optional[str]], Awaitable[Optional[CatalogPage]]]
+
+
+async def iter_pages(
+    load: PageLoader,
+    categories: Sequence[str],
+    max_pages: int,
+    concurrency: int = 4,
+    limit: Optional[int] = None
+) -> AsyncIterator[List[Any]]:
+    """
+    Fetch up to `max_pages` pages of every category concurrently, yielding new items per page.
+
+    A category stops at its last page, at the first page that fails (None or an
+    exception) or after `max_pages`. With a `limit`, a next page is only requested
+    while the items received plus those expected from pages in flight fall short
+    of it, so first pages of other categories are not raced by follow-up pages
+    that would be cancelled. Closing the iterator, or reaching `limit`, cancels
+    the fetches still in flight.
+
+    Args:
+        load: Fetches one page of one category
+        categories: Category filters to search
+        max_pages: Maximum pages followed per category
+        concurrency: Maximum page fetches in flight
+        limit: Stop after this many distinct items (no limit if None)
+
+    Yields:
+        Lists of items (objects with an `assetId`) not yielded before, in page arrival order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # Pages as they arrive; None marks a category as finished
+    queue: "asyncio.Queue[Optional[List[Any]]]" = asyncio.Queue()
+    received = 0
+    in_flight = 0
+
+    async def crawl(category: str) -> None:
+        nonlocal received, in_flight
+        cursor: Optional[str] = None
+        try:
+            for page_number in range(max_pages):
+                async with semaphore:
+                    in_flight += 1
+                    try:
+                        page = await load(category, page_number, cursor)
+                    finally:
+                        in_flight -= 1
+                if page is None:
+                    break
+                received += len(page.items)
+                queue.put_nowait(page.items)
+                cursor = page.next_cursor
+                if not cursor:
+                    break
+                if limit is not None and received + in_flight * len(page.items) >= limit:
+                    break
+        except Exception as e:
+            logger.warning(f"Catalog page fetch failed for category '{category}': {e!r}")
+        finally:
+            queue.put_nowait(None)
+
+    tasks = [asyncio.ensure_future(crawl(category)) for category in dict.fromkeys(categories)]
+    running = len(tasks)
+    seen = set()
+    count = 0
+    try:
+        while running:
+            items = await queue.get()
+            if items is None:
+                running -= 1
+                continue
+            new = []
+            for item in items:
+                if item.assetId not in seen:
+                    seen.add(item.assetId)
+                    new.append(item)
+            if limit is not None:
+                new = new[:limit - count]
+            if new:
+                count += len(new)
+                yield new
+            if limit is not None and count >= limit:
+                return
+    finally:
+        for task in tasks:
+            task.cancel()
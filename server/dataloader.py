@@ -0,0 +1,158 @@
+"""
+DataLoader-style batching of per-key lookups.
+Keys requested within a short window, by any number of concurrent requests,
+are collected and loaded with one bulk call per batch of up to `max_batch`
+keys; loaded values are cached per key with a TTL, and a key that is already
+pending is not requested twice.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence
+
+from server.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Bulk loader: keys -> values found (missing keys are absent from the result)
+BatchFunction = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class BatchLoader:
+    """
+    Coalesce `load` calls into bulk calls.
+    Not thread-safe; it is meant to be used from a single event loop. The first key
+    that is not cached or pending starts a `window` timer; when it fires (or as soon
+    as `max_batch` keys are queued) the queued keys are loaded in batches of at most
+    `max_batch`, concurrently. A failed batch resolves its keys to None and they are
+    not cached, so the next request for them tries again.
+    """
+
+    def __init__(
+        self,
+        batch_fn: BatchFunction,
+        max_batch: int = 100,
+        window: float = 0.005,
+        cache: Optional[TTLCache] = None,
+        name: str = "loader",
+    ):
+        """
+        Args:
+            batch_fn: Bulk loader called with up to max_batch keys
+            max_batch: Maximum keys per bulk call
+            window: Seconds to collect keys before a bulk call
+            cache: Per-key cache of loaded values (no caching if None)
+            name: Name used in log messages
+        """
+        self._batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.window = window
+        self.cache = cache
+        self.name = name
+        self._queue: Dict[Hashable, asyncio.Future] = {}
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        self.requested = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.batched_keys = 0
+        self.failures = 0
+
+    async def load(self, key: Hashable) -> Optional[Any]:
+        """Load one key (None if the bulk call failed or did not return it)."""
+        return (await self.load_many([key]))[0]
+
+    async def load_many(self, keys: Sequence[Hashable]) -> List[Optional[Any]]:
+        """
+        Load many keys, batched with every other caller's keys in the same window.
+
+        Args:
+            keys: Keys to load (duplicates are allowed)
+
+        Returns:
+            Values aligned with keys, None where nothing was loaded
+        """
+        values: Dict[Hashable, Any] = {}
+        waiting: Dict[Hashable, asyncio.Future] = {}
+        for key in keys:
+            if key in values or key in waiting:
+                continue
+            self.requested += 1
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                self.cache_hits += 1
+                values[key] = cached
+            else:
+                waiting[key] = self._enqueue(key)
+        if waiting:
+            # asyncio.wait never cancels the futures, so a caller giving up leaves the batch to the others
+            await asyncio.wait(set(waiting.values()))
+            values.update((key, future.result()) for key, future in waiting.items())
+        return [values.get(key) for key in keys]
+
+    def _enqueue(self, key: Hashable) -> asyncio.Future:
+        future = self._pending.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return future
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[key] = future
+        self._queue[key] = future
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        """Start bulk calls for everything queued."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        queued, self._queue = self._queue, {}
+        keys = list(queued)
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(keys), self.max_batch):
+            batch = {key: queued[key] for key in keys[start:start + self.max_batch]}
+            task = loop.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: Dict[Hashable, asyncio.Future]) -> None:
+        self.batches += 1
+        self.batched_keys += len(batch)
+        found: Dict[Hashable, Any] = {}
+        try:
+            found = await self._batch_fn(list(batch))
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Batch load of {len(batch)} keys failed for {self.name}: {e!r}")
+        finally:
+            # Also runs when the batch is cancelled, so no caller is left waiting
+            for key, future in batch.items():
+                self._pending.pop(key, None)
+                value = found.get(key)
+                if value is not None and self.cache is not None:
+                    self.cache.set(key, value)
+                if not future.done():
+                    future.set_result(value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring how well lookups are being batched."""
+        return {
+            "requested": self.requested,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "batched_keys": self.batched_keys,
+            "mean_batch_size": round(self.batched_keys / self.batches, 2) if self.batches else 0.0,
+            "failures": self.failures,
+            "pending": len(self._pending),
+            "max_batch": self.max_batch,
+            "window": self.window,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
@@ -0,0 +1,130 @@
+"""
+Shared HTTP client for talking to the Roblox catalog API.
+A single pooled httpx.AsyncClient is created for the lifetime of the application
+so catalog fetches reuse keep-alive connections instead of paying a fresh
+TCP+TLS handshake on every request.
+"""
+
+import logging
+import os
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Base URL of the catalog API; override to point at a local stand-in server
+CATALOG_BASE_URL = os.getenv("ROBLOX_CATALOG_URL", "https://catalog.roblox.com")
+
+# Connection pool configuration
+MAX_CONNECTIONS = int(os.getenv("CATALOG_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("CATALOG_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("CATALOG_KEEPALIVE_EXPIRY", "30.0"))
+REQUEST_TIMEOUT = float(os.getenv("CATALOG_TIMEOUT", "10.0"))
+HTTP2_ENABLED = os.getenv("CATALOG_HTTP2", "1").lower() in ("1", "true", "yes")
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 support in httpx needs the optional 'h2' package."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_catalog_client() -> httpx.AsyncClient:
+    """
+    Build a pooled AsyncClient for the catalog API.
+
+    Returns:
+        AsyncClient configured with pool limits, keep-alive and (if available) HTTP/2
+    """
+    http2 = HTTP2_ENABLED and _http2_available()
+    if HTTP2_ENABLED and not http2:
+        logger.warning("CATALOG_HTTP2 is enabled but 'h2' is not installed, falling back to HTTP/1.1")
+
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    logger.info(
+        f"Creating catalog HTTP client for {CATALOG_BASE_URL} "
+        f"(max_connections={MAX_CONNECTIONS}, keepalive={MAX_KEEPALIVE_CONNECTIONS}, http2={http2})"
+    )
+    return httpx.AsyncClient(
+        base_url=CATALOG_BASE_URL,
+        timeout=REQUEST_TIMEOUT,
+        limits=limits,
+        http2=http2,
+    )
+
+
+async def start_catalog_client() -> httpx.AsyncClient:
+    """Create the shared client. Called from the application lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_catalog_client()
+    return _client
+
+
+async def close_catalog_client() -> None:
+    """Close the shared client and release pooled connections."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Closed catalog HTTP client")
+    _client = None
+
+
+def get_catalog_client() -> httpx.AsyncClient:
+    """
+    Return the shared catalog client.
+    Creates it lazily when used outside the application lifespan (scripts, direct calls).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_catalog_client()
+    return _client
+
+
+def pool_stats() -> dict:
+    """
+    Report connection pool usage for the shared client.
+    Reads httpcore's pool state, which is not part of httpx's public API,
+    so missing attributes simply report zero.
+    """
+    stats = {
+        "base_url": CATALOG_BASE_URL,
+        "started": _client is not None and not _client.is_closed,
+        "http2": False,
+        "max_connections": MAX_CONNECTIONS,
+        "max_keepalive_connections": MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": KEEPALIVE_EXPIRY,
+        "connections": 0,
+        "active": 0,
+        "idle": 0,
+        "http2_connections": 0,
+    }
+    if not stats["started"]:
+        return stats
+
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    stats["http2"] = bool(getattr(pool, "_http2", False))
+    connections = list(getattr(pool, "connections", []) or [])
+    stats["connections"] = len(connections)
+    for connection in connections:
+        try:
+            if connection.is_idle():
+                stats["idle"] += 1
+            elif not connection.is_closed():
+                stats["active"] += 1
+        except Exception:
+            continue
+        inner = getattr(connection, "_connection", None)
+        if type(inner).__name__ == "AsyncHTTP2Connection":
+            stats["http2_connections"] += 1
+    return stats
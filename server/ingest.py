@@ -0,0 +1,330 @@
+"""
+Background catalog ingestion worker.
+Periodically crawls the catalog search endpoint for popular themes (and each
+theme's outfit parts) in every category filter, following pagination cursors at
+a bounded request rate,
+and upserts the results into the local catalog store and the catalog cache so
+requests for hot themes never wait on the upstream.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+import orjson
+
+from agents.catalog_store import CatalogRecord, CatalogStore
+from server.ratelimit import TokenBucketLimiter
+from server.resilience import CircuitBreaker
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process leader election
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Roblox AssetType ids mapped to the lowercase part names used by the agents
+ROBLOX_ASSET_TYPES = {
+    2: "t-shirt",
+    8: "hat",
+    11: "shirt",
+    12: "pants",
+    17: "head",
+    18: "face",
+    19: "gear",
+    27: "torso",
+    28: "right arm",
+    29: "left arm",
+    30: "left leg",
+    31: "right leg",
+    41: "hair accessory",
+    42: "face accessory",
+    43: "neck accessory",
+    44: "shoulder accessory",
+    45: "front accessory",
+    46: "back accessory",
+    47: "waist accessory",
+    64: "t-shirt",
+    65: "shirt",
+    66: "pants",
+    67: "jacket",
+    68: "sweater",
+    69: "shorts",
+    70: "shoes",
+    71: "shoes",
+    72: "dress",
+}
+
+
+def asset_type_name(item: dict) -> str:
+    """Part-style type name for a catalog search result."""
+    asset_type = item.get("assetType")
+    if isinstance(asset_type, int):
+        return ROBLOX_ASSET_TYPES.get(asset_type, "accessory")
+    if isinstance(asset_type, str) and asset_type:
+        return asset_type.lower()
+    return (item.get("itemType") or "accessory").lower()
+
+
+class RateLimiter:
+    """Paces calls to at most `rate` per second (no bursts)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+class CatalogIngestor:
+    """
+    Crawl popular themes on a fixed interval.
+    Every search keyword is a theme or "<theme> <part>" and is searched in each of the
+    `category_filters`; all pages are upserted into the store tagged with the theme, and
+    every page is handed to `on_page` with its category, page number and the cursor of the
+    next page, so the caller can prewarm the pages its live searches read.
+
+    Requests go through the same `breaker` and global `upstream_limiter` as live catalog
+    fetches: a keyword is skipped while the breaker rejects calls or the limiter is out of
+    tokens, and every response is recorded on the breaker.
+
+    With a `lock_path`, only the worker process holding an exclusive lock on that
+    file crawls; the others retry the lock every interval and take over when the
+    leader exits (e.g. when it is recycled).
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], httpx.AsyncClient],
+        search_path: str,
+        keywords_for_theme: Callable[[str], List[str]],
+        themes: Sequence[str],
+        store: Optional[CatalogStore] = None,
+        on_page: Optional[Callable[[str, str, int, List[dict], Optional[str]], Awaitable[None]]] = None,
+        category_filters: Sequence[str] = ("CommunityCreations",),
+        page_size: int = 30,
+        max_pages: int = 3,
+        rate: float = 2.0,
+        interval: float = 240.0,
+        lock_path: Optional[str] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        upstream_limiter: Optional[TokenBucketLimiter] = None,
+    ):
+        """
+        Args:
+            client_factory: Returns the shared catalog HTTP client
+            search_path: Catalog search endpoint path
+            keywords_for_theme: Search keywords to crawl for a theme
+            themes: Popular themes to crawl
+            store: Local catalog store to upsert into
+            on_page: Coroutine function receiving (keyword, category, page number, raw items, next cursor)
+                for every crawled page
+            category_filters: Catalog category filters searched for every keyword
+            page_size: Items per page requested from the API
+            max_pages: Maximum pages followed per keyword and category
+            rate: Maximum upstream requests per second
+            interval: Seconds between crawl cycles
+            lock_path: Lock file electing one crawling process among workers
+            breaker: Circuit breaker shared with live catalog fetches
+            upstream_limiter: Global rate limiter for catalog API calls
+        """
+        self._client_factory = client_factory
+        self.search_path = search_path
+        self._keywords_for_theme = keywords_for_theme
+        self.themes = list(themes)
+        self.store = store
+        self._on_page = on_page
+        self.category_filters = list(category_filters)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.interval = interval
+        self.lock_path = lock_path
+        self._lock_file = None
+        self._limiter = RateLimiter(rate)
+        self.breaker = breaker
+        self.upstream_limiter = upstream_limiter
+        self._task: Optional[asyncio.Task] = None
+
+        self.cycles = 0
+        self.requests = 0
+        self.errors = 0
+        self.skipped = 0
+        self.items_ingested = 0
+        self.last_cycle_seconds: Optional[float] = None
+        self._theme_last_success: Dict[str, float] = {}
+        self._theme_items: Dict[str, int] = {}
+
+    def start(self) -> None:
+        """Start the crawl loop as a background task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        """Cancel the crawl loop and wait for it to finish."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def is_leader(self) -> bool:
+        """Whether this process should crawl, taking the lock file if it is free."""
+        if self.lock_path is None or fcntl is None:
+            return True
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info(f"Process {os.getpid()} is the catalog ingestion leader")
+        return True
+
+    async def run_forever(self) -> None:
+        logger.info(f"Catalog ingestion started for themes {self.themes} every {self.interval}s")
+        while True:
+            try:
+                if self.is_leader():
+                    await self.run_cycle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Catalog ingestion cycle failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_cycle(self) -> None:
+        """Crawl every configured theme once."""
+        started = time.perf_counter()
+        for theme in self.themes:
+            count = 0
+            ok = True
+            for keyword in self._keywords_for_theme(theme):
+                for category in self.category_filters:
+                    crawled = await self.crawl_keyword(theme, keyword, category)
+                    if crawled is None:
+                        ok = False
+                    else:
+                        count += crawled
+            if ok:
+                self._theme_last_success[theme] = time.time()
+            self._theme_items[theme] = count
+        self.cycles += 1
+        self.last_cycle_seconds = time.perf_counter() - started
+        logger.info(f"Catalog ingestion cycle {self.cycles} done in {self.last_cycle_seconds:.1f}s")
+
+    async def crawl_keyword(self, theme: str, keyword: str, category: Optional[str] = None) -> Optional[int]:
+        """
+        Crawl up to max_pages of results for one keyword in one category
+        (the first category filter if None).
+
+        Returns:
+            Number of items ingested, or None if a request failed or was skipped
+        """
+        category = category or self.category_filters[0]
+        client = self._client_factory()
+        cursor: Optional[str] = None
+        total = 0
+        for page in range(self.max_pages):
+            params = {"categoryFilter": category, "limit": self.page_size, "keyword": keyword}
+            if cursor:
+                params["cursor"] = cursor
+
+            await self._limiter.wait()
+            if self.breaker is not None and not self.breaker.allow_request():
+                self.skipped += 1
+                logger.warning(f"Catalog circuit breaker is open, skipping ingestion of keyword '{keyword}'")
+                return None
+            if self.upstream_limiter is not None and self.upstream_limiter.try_acquire():
+                # Leave the upstream quota to live requests
+                if self.breaker is not None:
+                    self.breaker.release()
+                self.skipped += 1
+                logger.warning(f"Catalog upstream rate limit reached, skipping ingestion of keyword '{keyword}'")
+                return None
+            self.requests += 1
+            try:
+                response = await client.get(self.search_path, params=params)
+                response.raise_for_status()
+                data = orjson.loads(response.content)
+            except asyncio.CancelledError:
+                if self.breaker is not None:
+                    self.breaker.release()
+                raise
+            except Exception as e:
+                self.errors += 1
+                if self.breaker is not None:
+                    status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                    if status is not None and status < 500 and status != 429:
+                        # Client errors say nothing about upstream health
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.record_failure()
+                logger.warning(f"Catalog ingestion failed for keyword '{keyword}' page {page + 1}: {e}")
+                return None
+            if self.breaker is not None:
+                self.breaker.record_success()
+
+            items = [item for item in data.get("data") or [] if item.get("id")]
+            if self._on_page is not None:
+                await self._on_page(keyword, category, page, items, data.get("nextPageCursor") or None)
+            if self.store is not None and items:
+                records = [
+                    CatalogRecord(
+                        asset_id=int(item["id"]),
+                        name=item.get("name") or "",
+                        type=asset_type_name(item),
+                        themes=theme,
+                        price=item.get("price") if isinstance(item.get("price"), int) else None,
+                        creator=item.get("creatorName") or "",
+                        favorites=item.get("favoriteCount") if isinstance(item.get("favoriteCount"), int) else None,
+                    )
+                    for item in items
+                ]
+                # SQLite writes block, so they run in a worker thread
+                await asyncio.to_thread(self.store.upsert_many, records)
+            total += len(items)
+            self.items_ingested += len(items)
+
+            cursor = data.get("nextPageCursor")
+            if not cursor:
+                break
+        return total
+
+    def stats(self) -> dict:
+        """Crawl progress, ingestion lag per theme and item counts."""
+        now = time.time()
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self.lock_path is None or fcntl is None or self._lock_file is not None,
+            "themes": self.themes,
+            "interval": self.interval,
+            "cycles": self.cycles,
+            "requests": self.requests,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "items_ingested": self.items_ingested,
+            "last_cycle_seconds": round(self.last_cycle_seconds, 3) if self.last_cycle_seconds is not None else None,
+            "theme_lag_seconds": {
+                theme: round(now - self._theme_last_success[theme], 1) if theme in self._theme_last_success else None
+                for theme in self.themes
+            },
+            "theme_items": dict(self._theme_items),
+        }
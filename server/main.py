@@ -1,19 +1,432 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 import httpx
+import orjson
 import random
-from typing import List, Optional
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
 import logging
+import os
+import time
+
+from agents import catalog_store, embeddings, orchestrator, outfit_solver, stylist_agent
+from agents.contracts import OutfitRecord, RecommendIn
+from agents.lazy import ensure_loaded, lazy_import
+from agents.rules import get_rules, rules_stats
+from server.cache import TTLCache
+from server.catalog_pages import CatalogPage, iter_pages
+from server.dataloader import BatchLoader
+from server.sessions import SessionStore
+from server.shared_cache import SharedCache
+from server.ratelimit import KeyedRateLimiter, TokenBucketLimiter, retry_after_header
+from server.resilience import CircuitBreaker, RetryBudget, RetryPolicy
+from server.singleflight import SingleFlight
+from server.snapshot import DetailEntry, PageEntry, Snapshot, SnapshotWriter
+from server.startup import StartupReport
+from server.ingest import ROBLOX_ASSET_TYPES, CatalogIngestor
+from server.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, Registry
+from server.http_client import (
+    start_catalog_client,
+    close_catalog_client,
+    get_catalog_client,
+    pool_stats,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Cold-start milestones, reported on /stats and logged after the first response
+startup_report = StartupReport()
+
+CATALOG_SEARCH_PATH = "/v2/search/items/details"
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "100"))
+# Category filters searched concurrently for every keyword; results are merged by asset ID
+CATALOG_CATEGORY_FILTERS = [
+    c.strip() for c in os.getenv("CATALOG_CATEGORY_FILTERS", "CommunityCreations,Featured").split(",") if c.strip()
+] or ["CommunityCreations"]
+CATALOG_CATEGORY_FILTER = CATALOG_CATEGORY_FILTERS[0]  # Default for single-page fetches
+# Items per page (the API accepts 10, 28, 30, 50, 60, 100 or 120) and pages followed per category
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "30"))
+CATALOG_MAX_PAGES = int(os.getenv("CATALOG_MAX_PAGES", "2"))
+# Page fetches in flight per search
+CATALOG_FETCH_CONCURRENCY = int(os.getenv("CATALOG_FETCH_CONCURRENCY", "4"))
+INGEST_PAGE_SIZE = int(os.getenv("INGEST_PAGE_SIZE", "30"))
+
+# Optional cross-process second cache level so all workers share fetched catalog pages
+CATALOG_SHARED_CACHE_PATH = os.getenv("CATALOG_SHARED_CACHE_PATH", "")
+
+def encode_catalog_page(page: CatalogPage) -> bytes:
+    return orjson.dumps({
+        "items": [(item.assetId, item.type, item.price, item.favorites) for item in page.items],
+        "next": page.next_cursor,
+        "partial": page.partial,
+    })
+
+def decode_catalog_page(data: bytes) -> CatalogPage:
+    value = orjson.loads(data)
+    if isinstance(value, list):
+        # Entries written before pagination are bare item lists ([assetId, type] pairs before prices were cached)
+        return CatalogPage([OutfitRecord(*fields) for fields in value])
+    return CatalogPage(
+        [OutfitRecord(*fields) for fields in value["items"]], value.get("next"), value.get("partial", False)
+    )
+
+# Seconds a page without asset details (the details lookup failed) is fresh before it is refetched
+CATALOG_PARTIAL_PAGE_TTL = float(os.getenv("CATALOG_PARTIAL_PAGE_TTL", "30"))
+
+# Cache of catalog search result pages per keyword, category and page (stale entries are served while refreshing)
+catalog_cache = TTLCache(
+    maxsize=int(os.getenv("CATALOG_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "300")),
+    stale_ttl=float(os.getenv("CATALOG_CACHE_STALE_TTL", "3600")),
+    shared=SharedCache(
+        CATALOG_SHARED_CACHE_PATH,
+        encode=encode_catalog_page,
+        decode=decode_catalog_page,
+        max_age=float(os.getenv("CATALOG_CACHE_TTL", "300")) + float(os.getenv("CATALOG_CACHE_STALE_TTL", "3600")),
+    ) if CATALOG_SHARED_CACHE_PATH else None,
+    fresh_for=lambda page: CATALOG_PARTIAL_PAGE_TTL if page.partial else float("inf"),
+)
+
+# Coalesces concurrent upstream fetches of the same page into one request
+catalog_flights = SingleFlight()
+
+# Search results only carry IDs and item types: asset details (part type, price, favorites) are
+# fetched in bulk for every search page, batching the asset IDs of all concurrent requests
+ASSET_DETAILS_ENABLED = os.getenv("ASSET_DETAILS_ENABLED", "1").lower() in ("1", "true", "yes")
+ASSET_DETAILS_PATH = "/v1/catalog/items/details"
+ASSET_DETAILS_MAX_BATCH = 120  # Items per bulk details call accepted by the API
+asset_details_loader = BatchLoader(
+    lambda asset_ids: fetch_asset_details(asset_ids),
+    max_batch=min(ASSET_DETAILS_MAX_BATCH, int(os.getenv("ASSET_DETAILS_BATCH_SIZE", "120"))),
+    window=float(os.getenv("ASSET_DETAILS_WINDOW", "0.005")),
+    cache=TTLCache(
+        maxsize=int(os.getenv("ASSET_DETAILS_CACHE_SIZE", "100000")),
+        ttl=float(os.getenv("ASSET_DETAILS_TTL", "3600")),
+        stale_ttl=0,
+    ),
+    name="asset details",
+)
+# CSRF token required by the details endpoint, taken from its 403 responses
+catalog_csrf_token: Optional[str] = None
+
+# Retry, retry budget and circuit breaker configuration for the catalog upstream.
+# Live fetches run inside the pipeline's per-part timeout, which cancels them when it expires, so the
+# catalog deadline defaults to PIPELINE_PART_TIMEOUT and one attempt to 40% of it: a slow first attempt
+# times out early enough to be retried. Keep CATALOG_ATTEMPT_TIMEOUT < CATALOG_DEADLINE <= PIPELINE_PART_TIMEOUT.
+catalog_retry_policy = RetryPolicy(
+    max_attempts=int(os.getenv("CATALOG_MAX_ATTEMPTS", "3")),
+    attempt_timeout=float(os.getenv("CATALOG_ATTEMPT_TIMEOUT") or 0.4 * orchestrator.DEFAULT_CONFIG.part_timeout),
+    deadline=float(os.getenv("CATALOG_DEADLINE") or orchestrator.DEFAULT_CONFIG.part_timeout),
+    backoff_base=float(os.getenv("CATALOG_BACKOFF_BASE", "0.1")),
+    backoff_cap=float(os.getenv("CATALOG_BACKOFF_CAP", "1.0")),
+)
+if catalog_retry_policy.attempt_timeout >= orchestrator.DEFAULT_CONFIG.part_timeout:
+    logger.warning(
+        f"CATALOG_ATTEMPT_TIMEOUT ({catalog_retry_policy.attempt_timeout}s) is not below PIPELINE_PART_TIMEOUT "
+        f"({orchestrator.DEFAULT_CONFIG.part_timeout}s): slow catalog fetches are cancelled before they can be retried"
+    )
+catalog_retry_budget = RetryBudget(
+    ratio=float(os.getenv("CATALOG_RETRY_BUDGET_RATIO", "0.2")),
+    max_tokens=float(os.getenv("CATALOG_RETRY_BUDGET_MAX", "10")),
+)
+catalog_breaker = CircuitBreaker(
+    "catalog",
+    failure_threshold=int(os.getenv("CATALOG_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("CATALOG_BREAKER_RESET", "30")),
+    half_open_max_calls=int(os.getenv("CATALOG_BREAKER_HALF_OPEN_CALLS", "1")),
+)
+
+# Token-bucket rate limits: per user at the API edge, and globally for catalog API calls
+user_rate_limiter = KeyedRateLimiter(
+    rate=float(os.getenv("RATE_LIMIT_USER_RATE", "2")),
+    burst=float(os.getenv("RATE_LIMIT_USER_BURST", "10")),
+    max_keys=int(os.getenv("RATE_LIMIT_MAX_USERS", "100000")),
+)
+# A cold theme costs one search per (part, category filter) plus a details call per 120 items:
+# about 20 calls for 8 parts and 2 filters, so the burst covers a lobby with ~6 cold themes
+catalog_upstream_limiter = TokenBucketLimiter(
+    rate=float(os.getenv("CATALOG_UPSTREAM_RATE", "40")),
+    burst=float(os.getenv("CATALOG_UPSTREAM_BURST", "120")),
+)
+
+# Per-user sessions: repeat requests are answered from memory and shown items are not repeated
+user_sessions = SessionStore(
+    max_users=int(os.getenv("SESSION_MAX_USERS", "100000")),
+    ttl=float(os.getenv("SESSION_TTL", "1800")),
+    memo_ttl=float(os.getenv("RECOMMEND_MEMO_TTL", "30")),
+    max_seen=int(os.getenv("SESSION_SEEN_ITEMS", "32")),
+)
+
+# Deterministic recommendations: the outfit is seeded from (theme, budgets, user_id, time bucket),
+# so repeats within a bucket are byte-identical and can be cached over HTTP with ETags.
+# GET /recommend is always deterministic; this switches POST /recommend to it as well.
+RECOMMEND_DETERMINISTIC = os.getenv("RECOMMEND_DETERMINISTIC", "0").lower() in ("1", "true", "yes")
+RECOMMEND_BUCKET_SECONDS = max(1, int(os.getenv("RECOMMEND_BUCKET_SECONDS", "300")))
+
+# Rendered deterministic responses and their ETags per (theme, budgets, user_id, bucket), so
+# conditional requests are answered with 304 without re-running the pipeline
+recommend_responses = TTLCache(
+    maxsize=int(os.getenv("RECOMMEND_RESPONSE_CACHE_SIZE", "10000")),
+    ttl=RECOMMEND_BUCKET_SECONDS,
+    stale_ttl=0,
+)
+
+# Background crawler that prewarms the local store and the catalog cache for popular themes
+INGEST_ENABLED = os.getenv("INGEST_ENABLED", "1").lower() in ("1", "true", "yes")
+
+def prewarm_keywords(theme: str) -> List[str]:
+    """Search keywords crawled for a theme: the theme itself and each of its outfit parts."""
+    parts = stylist_agent.run(RecommendIn(theme=theme, user_id=0)).parts or []
+    return [catalog_keyword(theme)] + [catalog_keyword(theme, part) for part in parts]
+
+async def prewarm_cache(keyword: str, category: str, page_number: int, items: List[dict],
+                        next_cursor: Optional[str]) -> None:
+    """
+    Store a crawled page in the catalog cache under the key live requests use, enriched with
+    asset details like pages fetched by live requests. Only pages live searches read (the first
+    CATALOG_MAX_PAGES of each category filter) are stored.
+    """
+    if category not in CATALOG_CATEGORY_FILTERS or page_number >= CATALOG_MAX_PAGES:
+        return
+    # The crawler's pages and cursors only line up with ours if both use the same page size
+    same_size = INGEST_PAGE_SIZE == CATALOG_PAGE_SIZE
+    if page_number and not same_size:
+        return
+    outfit_items = outfit_items_from_catalog(items[:CATALOG_PAGE_SIZE])
+    if outfit_items:
+        page = await enrich_page(CatalogPage(outfit_items, next_cursor if same_size else None))
+        catalog_cache.set(page_cache_key(keyword, category, page_number), page)
+
+catalog_ingestor = CatalogIngestor(
+    client_factory=lambda: get_catalog_client(),
+    search_path=CATALOG_SEARCH_PATH,
+    keywords_for_theme=lambda theme: prewarm_keywords(theme),
+    themes=[t.strip() for t in os.getenv("INGEST_THEMES", "casual,formal,sporty,gothic,kawaii").split(",") if t.strip()],
+    on_page=lambda keyword, category, page_number, items, next_cursor: prewarm_cache(
+        keyword, category, page_number, items, next_cursor
+    ),
+    category_filters=CATALOG_CATEGORY_FILTERS,
+    page_size=INGEST_PAGE_SIZE,
+    max_pages=int(os.getenv("INGEST_MAX_PAGES", "3")),
+    rate=float(os.getenv("INGEST_RATE", "2")),
+    interval=float(os.getenv("INGEST_INTERVAL", "240")),
+    lock_path=os.getenv("INGEST_LOCK_PATH") or None,
+    breaker=catalog_breaker,
+    upstream_limiter=catalog_upstream_limiter,
+)
+
+# On-disk snapshot of the catalog page and asset details caches: written periodically and on
+# shutdown, restored at startup so a fresh instance serves hot themes from cache (empty path disables)
+CATALOG_SNAPSHOT_PATH = os.getenv(
+    "CATALOG_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "catalog-snapshot.bin")
+)
+CATALOG_SNAPSHOT_INTERVAL = float(os.getenv("CATALOG_SNAPSHOT_INTERVAL", "300"))
+# Outcome of the startup restore, reported on /stats
+snapshot_restore: Dict[str, Any] = {}
+
+def snapshot_entries() -> Tuple[List[PageEntry], List[DetailEntry]]:
+    """Catalog pages and asset details currently cached, in snapshot form."""
+    pages = [
+        (key[0], key[1], key[2], key[3] if len(key) > 3 else 0, value, age)
+        for key, value, age in catalog_cache.entries()
+    ]
+    return pages, asset_details_loader.cache.entries()
+
+def read_snapshot() -> Optional[Tuple[List[PageEntry], List[DetailEntry], float]]:
+    """
+    Decode the newest snapshot entries that fit the catalog page and asset details caches.
+    Only reads the file (and imports NumPy), so it can run in a thread.
+
+    Returns:
+        (pages, details, snapshot age in seconds), or None if there is no usable snapshot
+    """
+    try:
+        with Snapshot(CATALOG_SNAPSHOT_PATH) as snapshot:
+            pages = snapshot.pages(catalog_cache.ttl + catalog_cache.stale_ttl, catalog_cache.maxsize)
+            details_cache = asset_details_loader.cache
+            details = snapshot.details(details_cache.ttl + details_cache.stale_ttl, details_cache.maxsize)
+            return pages, details, time.time() - snapshot.created_at
+    except FileNotFoundError:
+        logger.info(f"No catalog snapshot at {CATALOG_SNAPSHOT_PATH}; starting with empty caches")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable catalog snapshot {CATALOG_SNAPSHOT_PATH}: {e}")
+        snapshot_restore["error"] = str(e)
+    return None
+
+async def restore_snapshot() -> None:
+    """
+    Fill the catalog page and asset details caches from the snapshot, then start the
+    periodic snapshot writes. Runs after startup: the file is decoded in a thread and
+    entries live requests have cached meanwhile are kept.
+    """
+    started = time.perf_counter()
+    loaded = await asyncio.to_thread(read_snapshot)
+    if loaded is not None:
+        pages, details, snapshot_age = loaded
+        details_cache = asset_details_loader.cache
+        # Pages cached under another page size would never be looked up
+        restored_pages = sum(
+            catalog_cache.restore(page_cache_key(keyword, category, page_number), page, age)
+            for keyword, category, page_size, page_number, page, age in pages
+            if page_size == CATALOG_PAGE_SIZE
+        )
+        restored_details = sum(details_cache.restore(asset_id, value, age) for asset_id, value, age in details)
+        snapshot_restore.update({
+            "pages": restored_pages,
+            "details": restored_details,
+            "snapshot_age_seconds": round(snapshot_age, 1),
+            "seconds": round(time.perf_counter() - started, 4),
+        })
+        logger.info(f"Restored {restored_pages} catalog pages and {restored_details} asset details "
+                    f"from {CATALOG_SNAPSHOT_PATH} in {snapshot_restore['seconds'] * 1000:.0f}ms")
+    startup_report.mark("snapshot_restored")
+    # Writing only after the restore keeps a snapshot from being replaced by emptier caches
+    catalog_snapshots.start()
+
+catalog_snapshots = SnapshotWriter(CATALOG_SNAPSHOT_PATH, snapshot_entries, CATALOG_SNAPSHOT_INTERVAL)
+
+# Prometheus metrics exported on /metrics
+metrics = Registry(prefix="outfit_")
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request handling time", ("path", "method", "status")
+)
+catalog_upstream_seconds = metrics.histogram(
+    "catalog_upstream_request_duration_seconds", "Catalog API request time per attempt", ("outcome",)
+)
+agent_stage_seconds = metrics.histogram(
+    "agent_stage_duration_seconds", "Recommendation pipeline stage time", ("stage",)
+)
+catalog_fallback_total = metrics.counter(
+    "catalog_fallback_total", "Responses served from sample outfit data", ("reason",)
+)
+rate_limit_rejections_total = metrics.counter(
+    "rate_limit_rejections_total", "Requests rejected by a rate limiter", ("scope",)
+)
+user_rate_limit_rejections = rate_limit_rejections_total.labels("user")
+upstream_rate_limit_rejections = rate_limit_rejections_total.labels("upstream")
+metrics.callback(
+    "catalog_cache_events_total", "Catalog cache lookups and maintenance events", "counter",
+    lambda: [({"event": event}, catalog_cache.stats()[event])
+             for event in ("hits", "stale_hits", "misses", "evictions", "expirations", "refreshes", "refresh_failures",
+                           "shared_hits", "shared_waits")]
+)
+metrics.callback(
+    "catalog_cache_entries", "Entries in the catalog cache", "gauge",
+    lambda: [({}, len(catalog_cache))]
+)
+metrics.callback(
+    "catalog_singleflight_calls_total", "Catalog fetches that led or joined a shared upstream call", "counter",
+    lambda: [({"role": "leader"}, catalog_flights.leaders), ({"role": "coalesced"}, catalog_flights.coalesced)]
+)
+metrics.callback(
+    "asset_details_lookups_total", "Asset detail lookups by how they were served", "counter",
+    lambda: [({"result": "cache_hit"}, asset_details_loader.cache_hits),
+             ({"result": "coalesced"}, asset_details_loader.coalesced),
+             ({"result": "batched"}, asset_details_loader.batched_keys)]
+)
+metrics.callback(
+    "asset_details_batches_total", "Bulk asset details calls", "counter",
+    lambda: [({}, asset_details_loader.batches)]
+)
+metrics.callback(
+    "session_users", "User sessions held in memory", "gauge",
+    lambda: [({}, len(user_sessions))]
+)
+metrics.callback(
+    "session_memo_lookups_total", "Recommendation memo lookups by result", "counter",
+    lambda: [({"result": "hit"}, user_sessions.memo_hits), ({"result": "miss"}, user_sessions.memo_misses)]
+)
+recommend_deterministic_total = metrics.counter(
+    "recommend_deterministic_responses_total",
+    "Deterministic /recommend responses by outcome (not_modified, cached, computed)", ("result",)
+)
+metrics.callback(
+    "rate_limit_buckets", "Per-user rate limit buckets held in memory", "gauge",
+    lambda: [({}, len(user_rate_limiter))]
+)
+metrics.callback(
+    "catalog_retries_total", "Catalog retries by retry budget outcome", "counter",
+    lambda: [({"result": "allowed"}, catalog_retry_budget.retries),
+             ({"result": "exhausted"}, catalog_retry_budget.exhausted)]
+)
+metrics.callback(
+    "catalog_breaker_state", "Catalog circuit breaker state (1 for the current state)", "gauge",
+    lambda: [({"state": state}, float(catalog_breaker.state == state))
+             for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN)]
+)
+metrics.callback(
+    "catalog_breaker_trips_total", "Times the catalog circuit breaker opened", "counter",
+    lambda: [({}, catalog_breaker.trips)]
+)
+metrics.callback(
+    "ingest_items_total", "Catalog items ingested by the background crawler", "counter",
+    lambda: [({}, catalog_ingestor.items_ingested)]
+)
+metrics.callback(
+    "ingest_lag_seconds", "Seconds since each popular theme was last crawled successfully", "gauge",
+    lambda: [({"theme": theme}, lag) for theme, lag in catalog_ingestor.stats()["theme_lag_seconds"].items()
+             if lag is not None]
+)
+orchestrator.STAGE_OBSERVERS.append(lambda stage, seconds: agent_stage_seconds.labels(stage).observe(seconds))
+
+# Load the lazily imported parts of the agent pipeline in the background once serving
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1").lower() in ("1", "true", "yes")
+
+def warm_up_agents() -> None:
+    """Load NumPy and the embedding indexes and run one local recommendation, so the first real request pays no import costs."""
+    startup_report.warm_up((
+        ("rules", get_rules),
+        ("numpy", lambda: ensure_loaded(lazy_import("numpy"))),
+        ("embeddings", lambda: (embeddings.theme_index(), embeddings.get_asset_index())),
+        ("pipeline", lambda: orchestrator.run(RecommendIn(theme=get_rules().default_theme, user_id=0))),
+    ))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own application-lifetime resources such as the pooled catalog HTTP client."""
+    # Compile the style rules up front so a broken rules file fails startup, not a request
+    get_rules()
+    await start_catalog_client()
+    # Restored while requests are already being served, so startup does not wait on NumPy or the file
+    restore = asyncio.create_task(restore_snapshot()) if CATALOG_SNAPSHOT_PATH else None
+    if INGEST_ENABLED:
+        catalog_ingestor.store = catalog_store.get_store()
+        catalog_ingestor.start()
+    startup_report.mark("ready")
+    # Runs in a thread while requests are already being served; the task is kept referenced until shutdown
+    warmup = asyncio.create_task(asyncio.to_thread(warm_up_agents)) if STARTUP_WARMUP else None
+    try:
+        yield
+    finally:
+        await catalog_ingestor.stop()
+        if restore is not None:
+            if restore.done():
+                await catalog_snapshots.stop()
+            else:
+                # The caches were never filled from the snapshot, so don't overwrite it
+                restore.cancel()
+        await close_catalog_client()
+
 app = FastAPI(
     title="Roblox Outfit Marketplace Backend",
     description="Backend service for Roblox AI Style Assistant game",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Time every request by route
+app.add_middleware(
+    MetricsMiddleware,
+    histogram=http_request_seconds,
+    known_paths=lambda: [route.path for route in app.routes],
+    on_first_request=startup_report.first_response
 )
 
 # Add CORS middleware
@@ -30,6 +443,9 @@ class ChatRequest(BaseModel):
     prompt: str = Field(..., description="User prompt to the NPC")
     user_id: int = Field(..., description="User ID")
 
+class ChatStreamRequest(ChatRequest):
+    outfit: bool = Field(False, description="Also stream outfit items for the theme detected in the prompt")
+
 class ChatResponse(BaseModel):
     success: bool = Field(..., description="Whether the request was successful")
     user_id: int = Field(..., description="User ID")
@@ -38,7 +454,28 @@ class ChatResponse(BaseModel):
 class RecommendRequest(BaseModel):
     theme: str = Field(..., description="Theme for outfit recommendations")
     user_id: int = Field(..., description="User ID")
+    budget: Optional[int] = Field(None, ge=0, description="Maximum price in Robux per outfit item")
+    outfit_budget: Optional[int] = Field(
+        None, ge=0, description="Maximum total price in Robux; the outfit is then one item per part"
+    )
+
+    def pipeline_input(self) -> RecommendIn:
+        return RecommendIn(theme=self.theme, user_id=self.user_id, budget=self.budget, outfit_budget=self.outfit_budget)
 
+    def memo_key(self) -> tuple:
+        return recommend_memo_key(self.theme, self.budget, self.outfit_budget)
+
+def recommend_memo_key(theme: str, budget: Optional[int] = None, outfit_budget: Optional[int] = None) -> tuple:
+    """Session memo key: requests with the same normalized theme and budgets get the same outfit."""
+    return (normalize_theme(theme), budget, outfit_budget)
+
+class BatchRecommendRequest(BaseModel):
+    requests: List[RecommendRequest] = Field(
+        ..., min_length=1, max_length=BATCH_MAX_REQUESTS, description="One recommendation request per player"
+    )
+
+# Response models document the wire format in OpenAPI; the recommend endpoints build
+# the same JSON directly from OutfitRecords and encode it with orjson
 class OutfitItem(BaseModel):
     assetId: str = Field(..., description="Roblox asset ID as string")
     type: str = Field(..., description="Type of outfit item")
@@ -49,161 +486,335 @@ class RecommendResponse(BaseModel):
     message: str = Field(..., description="Outfit ready message")
     outfit: List[OutfitItem] = Field(..., description="List of recommended outfit items")
 
-# NPC chat responses based on common themes
-NPC_RESPONSES = {
-    "greeting": [
-        "Welcome to the Roblox Outfit Marketplace! I'm here to help you find the perfect style!",
-        "Hey there! Ready to discover some amazing outfits? I've got tons of recommendations!",
-        "Hello! I'm your AI Style Assistant. What kind of look are you going for today?"
-    ],
-    "recommendation": [
-        "Based on your style preferences, I think you'll love these outfit suggestions!",
-        "I've found some fantastic pieces that would look amazing on you!",
-        "These items are trending right now and would be perfect for your style!"
-    ],
-    "default": [
-        "That's interesting! I'm here to help you with outfit recommendations. What style are you looking for?",
-        "I love talking about fashion! What kind of outfits are you interested in?",
-        "Style is all about expressing yourself! What theme speaks to you today?"
-    ]
-}
-
-# Sample outfit data since we can't access real Roblox API without authentication
-SAMPLE_OUTFITS = {
-    "casual": [
-        {"assetId": 1234567890, "type": "shirt"},
-        {"assetId": 2345678901, "type": "pants"},
-        {"assetId": 3456789012, "type": "hat"},
-        {"assetId": 4567890123, "type": "shoes"},
-        {"assetId": 5678901234, "type": "accessory"},
-        {"assetId": 6789012345, "type": "hair"}
-    ],
-    "formal": [
-        {"assetId": 7890123456, "type": "shirt"},
-        {"assetId": 8901234567, "type": "pants"},
-        {"assetId": 9012345678, "type": "tie"},
-        {"assetId": 1023456789, "type": "shoes"},
-        {"assetId": 1134567890, "type": "jacket"},
-        {"assetId": 1245678901, "type": "watch"}
-    ],
-    "sporty": [
-        {"assetId": 1356789012, "type": "jersey"},
-        {"assetId": 1467890123, "type": "shorts"},
-        {"assetId": 1578901234, "type": "sneakers"},
-        {"assetId": 1689012345, "type": "cap"},
-        {"assetId": 1790123456, "type": "socks"},
-        {"assetId": 1801234567, "type": "wristband"}
-    ],
-    "gothic": [
-        {"assetId": 1912345678, "type": "shirt"},
-        {"assetId": 2023456789, "type": "pants"},
-        {"assetId": 2134567890, "type": "boots"},
-        {"assetId": 2245678901, "type": "cape"},
-        {"assetId": 2356789012, "type": "necklace"},
-        {"assetId": 2467890123, "type": "mask"}
-    ],
-    "kawaii": [
-        {"assetId": 2578901234, "type": "dress"},
-        {"assetId": 2689012345, "type": "bow"},
-        {"assetId": 2790123456, "type": "shoes"},
-        {"assetId": 2801234567, "type": "bag"},
-        {"assetId": 2912345678, "type": "hairpin"},
-        {"assetId": 3023456789, "type": "socks"}
-    ]
-}
+class BatchRecommendResponse(BaseModel):
+    success: bool = Field(..., description="Whether every recommendation found items")
+    results: List[RecommendResponse] = Field(..., description="Recommendations in request order")
+
+# Detects the outfit theme of a free-text chat prompt for /chat/stream
+prompt_stylist = stylist_agent.StylistAgent()
 
 def get_npc_response(prompt: str) -> str:
-    """Generate an appropriate NPC response based on the user's prompt."""
-    prompt_lower = prompt.lower()
+    """Generate an appropriate NPC response based on the user's prompt (intents come from the rules file)."""
+    rules = get_rules()
+    intent = rules.intent_matcher.first(prompt)
+    return random.choice(rules.npc_responses[intent] if intent else rules.default_npc_responses)
+
+def normalize_theme(theme: str) -> str:
+    """Normalize a theme for cache keys and upstream queries (case and whitespace)."""
+    return " ".join(theme.lower().split())
+
+def catalog_keyword(theme: str, part: Optional[str] = None) -> str:
+    """Upstream search keyword for a theme, optionally narrowed to one outfit part."""
+    return normalize_theme(f"{theme} {part}" if part else theme)
+
+def page_cache_key(keyword: str, category: str, page: int) -> tuple:
+    """
+    Cache key for one page of a catalog search: (normalized keyword, category filter, page size),
+    followed by the page number for pages after the first.
+    """
+    key = (keyword, category, CATALOG_PAGE_SIZE)
+    return key + (page,) if page else key
+
+async def iter_catalog_items(theme: str, part: Optional[str] = None, limit: int = 10) -> AsyncIterator[List[OutfitRecord]]:
+    """
+    Search Roblox catalog API v2 for a theme, optionally for a single outfit part, yielding
+    items page by page as they arrive.
+    Every category in CATALOG_CATEGORY_FILTERS is searched concurrently, following the API's
+    cursor for up to CATALOG_MAX_PAGES pages each; items are deduplicated by asset ID and
+    iteration stops after `limit` items, cancelling fetches still in flight. Each page is
+    cached per normalized keyword and concurrent misses for the same page share a single
+    upstream request. Falls back to sample data if no page could be fetched.
+    """
+    keyword = catalog_keyword(theme, part)
+    fetched = False
     
-    if any(word in prompt_lower for word in ["hello", "hi", "hey", "greetings"]):
-        return random.choice(NPC_RESPONSES["greeting"])
-    elif any(word in prompt_lower for word in ["recommend", "suggestion", "outfit", "style", "clothes"]):
-        return random.choice(NPC_RESPONSES["recommendation"])
-    else:
-        return random.choice(NPC_RESPONSES["default"])
+    async def load_page(category: str, page: int, cursor: Optional[str]) -> Optional[CatalogPage]:
+        nonlocal fetched
+        key = page_cache_key(keyword, category, page)
+        result = await catalog_cache.get_or_fetch(
+            key, lambda: catalog_flights.do(key, lambda: fetch_detailed_page(keyword, category, cursor))
+        )
+        fetched = fetched or result is not None
+        return result
+    
+    async for items in iter_pages(load_page, CATALOG_CATEGORY_FILTERS, CATALOG_MAX_PAGES,
+                                  CATALOG_FETCH_CONCURRENCY, limit):
+        yield items
+    
+    if not fetched:
+        # Fallback to sample data if API is unavailable
+        logger.warning(f"Roblox API unavailable, using sample data for theme '{theme}'")
+        catalog_fallback_total.labels("upstream_unavailable").inc()
+        yield get_sample_outfit_items(theme, limit, part)
+
+async def fetch_roblox_catalog_items(theme: str, limit: int = 10, part: Optional[str] = None) -> List[OutfitRecord]:
+    """
+    Fetch up to `limit` outfit items from Roblox catalog API v2, optionally for a single
+    outfit part (all pages of `iter_catalog_items` collected into one list).
+    """
+    items: List[OutfitRecord] = []
+    async for page in iter_catalog_items(theme, part, limit):
+        items.extend(page)
+    return items
+
+def fetch_part_items(theme: str, part: str, limit: int) -> AsyncIterator[List[OutfitRecord]]:
+    """Catalog fetcher for the orchestrator pipeline: pages of candidates for one outfit part."""
+    return iter_catalog_items(theme, part, limit)
+
+async def fetch_detailed_page(keyword: str, category: str, cursor: Optional[str]) -> Optional[CatalogPage]:
+    """A catalog search page with asset details merged into its items (see enrich_page)."""
+    page = await fetch_catalog_page(keyword, category, cursor)
+    if page is None:
+        return page
+    return await enrich_page(page)
+
+async def enrich_page(page: CatalogPage) -> CatalogPage:
+    """
+    Fill in the part type, price and favorite count of a page's items from their asset details.
+    Details are cached per asset; items whose details are unavailable are kept unchanged. A page
+    for which no details could be loaded at all (rate limit, breaker open, upstream error) is
+    marked partial, so it is only cached for CATALOG_PARTIAL_PAGE_TTL seconds.
+    """
+    if not ASSET_DETAILS_ENABLED or not page.items:
+        return page
+    details = await asset_details_loader.load_many([item.assetId for item in page.items])
+    enriched = []
+    for item, detail in zip(page.items, details):
+        if detail is None:
+            enriched.append(item)
+            continue
+        part, price, favorites = detail
+        enriched.append(OutfitRecord(
+            item.assetId, part or item.type, price if price is not None else item.price, favorites
+        ))
+    return CatalogPage(enriched, page.next_cursor, partial=all(detail is None for detail in details))
+
+async def fetch_asset_details(asset_ids: List[str]) -> Dict[str, Tuple[Optional[str], Optional[int], Optional[int]]]:
+    """
+    Fetch details for up to 120 assets with one bulk call to the catalog items/details endpoint.
+    The endpoint requires an X-CSRF-TOKEN header: the token is taken from its 403 response and
+    reused. Each call takes one token from the global upstream rate limiter and goes through the
+    catalog circuit breaker like search requests: nothing is fetched while it is open, and every
+    outcome is recorded on it. Raises on failure.
+    
+    Returns:
+        Mapping of asset ID -> (part type, price, favorite count), each None if unknown
+    """
+    global catalog_csrf_token
+    # The breaker goes first, so calls it rejects don't spend upstream quota
+    if not catalog_breaker.allow_request():
+        raise RuntimeError("Catalog circuit breaker is open")
+    if catalog_upstream_limiter.try_acquire():
+        catalog_breaker.release()
+        upstream_rate_limit_rejections.inc()
+        raise RuntimeError("Catalog upstream rate limit reached")
+    
+    client = get_catalog_client()
+    body = orjson.dumps({"items": [{"itemType": "Asset", "id": int(asset_id)}
+                                   for asset_id in asset_ids if asset_id.isdigit()]})
+    try:
+        for _ in range(2):
+            sent_token = catalog_csrf_token
+            headers = {"Content-Type": "application/json"}
+            if sent_token:
+                headers["X-CSRF-TOKEN"] = sent_token
+            response = await client.post(ASSET_DETAILS_PATH, content=body, headers=headers,
+                                         timeout=catalog_retry_policy.attempt_timeout)
+            token = response.headers.get("x-csrf-token")
+            if response.status_code != 403 or not token or token == sent_token:
+                break
+            catalog_csrf_token = token
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+    except httpx.HTTPStatusError as e:
+        # Outcomes are recorded on the breaker as in fetch_catalog_page
+        status = e.response.status_code
+        if status < 500 and status != 429:
+            catalog_breaker.record_success()
+        else:
+            catalog_breaker.record_failure()
+        raise
+    except asyncio.CancelledError:
+        catalog_breaker.release()
+        raise
+    except Exception:
+        catalog_breaker.record_failure()
+        raise
+    catalog_breaker.record_success()
+    
+    details = {}
+    for item in data.get("data") or []:
+        if not item.get("id"):
+            continue
+        asset_type = item.get("assetType")
+        price = item.get("price") if isinstance(item.get("price"), int) else item.get("lowestPrice")
+        favorites = item.get("favoriteCount")
+        details[str(item["id"])] = (
+            ROBLOX_ASSET_TYPES.get(asset_type) if isinstance(asset_type, int) else None,
+            price if isinstance(price, int) else None,
+            favorites if isinstance(favorites, int) else None,
+        )
+    logger.info(f"Fetched details for {len(details)}/{len(asset_ids)} assets")
+    return details
+
+def outfit_items_from_catalog(data: List[dict]) -> List[OutfitRecord]:
+    """Convert raw catalog search results to OutfitRecords, skipping items without IDs."""
+    items = []
+    for item in data:
+        # Extract assetId, type and price (bundles only have a lowest price) from the item
+        asset_id = str(item.get("id", ""))
+        item_type = item.get("itemType", "") or item.get("assetType", "Accessory")
+        price = item.get("price")
+        if not isinstance(price, int):
+            price = item.get("lowestPrice") if isinstance(item.get("lowestPrice"), int) else None
+        
+        if asset_id:  # Only add items with valid IDs
+            items.append(OutfitRecord(asset_id, item_type, price))
+    return items
 
-async def fetch_roblox_catalog_items(theme: str, limit: int = 10) -> List[OutfitItem]:
+async def fetch_catalog_page(
+    keyword: str,
+    category: str = CATALOG_CATEGORY_FILTER,
+    cursor: Optional[str] = None
+) -> Optional[CatalogPage]:
     """
-    Fetch outfit items from Roblox catalog API v2.
-    Uses the search/items/details endpoint with retry logic.
-    Falls back to sample data if API is unavailable.
+    Fetch one page of search results from the catalog API, with the cursor of the next page.
+    Uses the search/items/details endpoint over the shared, pooled HTTP client with
+    per-attempt and overall deadlines, jittered exponential backoff, a global retry
+    budget and a circuit breaker; every attempt takes a token from the global upstream
+    rate limiter. Returns None if the API is unavailable or the rate limit is reached.
     """
-    url = "https://catalog.roblox.com/v2/search/items/details"
+    # The breaker goes first, so fetches it rejects don't spend upstream quota
+    if not catalog_breaker.allow_request():
+        logger.warning(f"Catalog circuit breaker is open, skipping upstream fetch for theme '{keyword}'")
+        return None
+    if catalog_upstream_limiter.try_acquire():
+        # Protect the upstream quota: serve cached or sample data instead of queueing
+        catalog_breaker.release()
+        upstream_rate_limit_rejections.inc()
+        logger.warning(f"Catalog upstream rate limit reached, skipping fetch for theme '{keyword}'")
+        return None
+    
+    client = get_catalog_client()
     params = {
-        "categoryFilter": "CommunityCreations",
-        "limit": min(limit, 10),  # Cap at 10 as per requirements
-        "keyword": theme
+        "categoryFilter": category,
+        "limit": CATALOG_PAGE_SIZE,
+        "keyword": keyword
     }
+    if cursor:
+        params["cursor"] = cursor
     
-    # Retry configuration
-    max_retries = 3
-    timeout = 10.0
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + catalog_retry_policy.deadline
+    catalog_retry_budget.record_request()
     
-    for attempt in range(max_retries):
+    for attempt in range(catalog_retry_policy.max_attempts):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            logger.warning(f"Catalog deadline exceeded for theme '{keyword}' after {attempt} attempts")
+            break
+        
+        attempt_started = time.perf_counter()
+        outcome = "error"
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                logger.info(f"Fetching Roblox catalog items for theme '{theme}', attempt {attempt + 1}")
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                # Validate response structure
-                if "data" not in data or not isinstance(data["data"], list):
-                    logger.warning(f"Invalid response structure from Roblox API: {data}")
-                    raise ValueError("Invalid response structure")
-                
-                items = []
-                for item in data["data"]:
-                    # Extract assetId and type from the item
-                    asset_id = str(item.get("id", ""))
-                    item_type = item.get("itemType", "") or item.get("assetType", "Accessory")
-                    
-                    if asset_id:  # Only add items with valid IDs
-                        items.append(OutfitItem(assetId=asset_id, type=item_type))
-                
-                logger.info(f"Successfully fetched {len(items)} items for theme '{theme}'")
-                return items[:limit]  # Ensure we don't exceed the limit
-                
+            logger.info(f"Fetching Roblox catalog items for theme '{keyword}' ({category}), attempt {attempt + 1}")
+            response = await client.get(
+                CATALOG_SEARCH_PATH,
+                params=params,
+                timeout=min(catalog_retry_policy.attempt_timeout, remaining)
+            )
+            response.raise_for_status()
+            
+            data = orjson.loads(response.content)
+            
+            # Validate response structure
+            if not isinstance(data, dict) or not isinstance(data.get("data"), list):
+                logger.warning(f"Invalid response structure from Roblox API: {data}")
+                raise ValueError("Invalid response structure")
+            
+            items = outfit_items_from_catalog(data["data"])
+            outcome = "success"
+            catalog_breaker.record_success()
+            logger.info(f"Successfully fetched {len(items)} items for theme '{keyword}' ({category})")
+            return CatalogPage(items, data.get("nextPageCursor") or None)
+            
         except httpx.HTTPStatusError as e:
-            logger.warning(f"HTTP error on attempt {attempt + 1}: {e.response.status_code}")
-            if attempt == max_retries - 1:
-                break
+            outcome = "http_error"
+            status = e.response.status_code
+            logger.warning(f"HTTP error on attempt {attempt + 1}: {status}")
+            if status < 500 and status != 429:
+                # Client errors won't succeed on retry and say nothing about upstream health
+                catalog_breaker.record_success()
+                return None
+            catalog_breaker.record_failure()
         except httpx.TimeoutException:
+            outcome = "timeout"
             logger.warning(f"Timeout on attempt {attempt + 1}")
-            if attempt == max_retries - 1:
-                break
+            catalog_breaker.record_failure()
+        except asyncio.CancelledError:
+            # Cut off by a caller's deadline or disconnect: no outcome, but a half-open
+            # probe slot must be given back or the breaker could never close again
+            outcome = "cancelled"
+            catalog_breaker.release()
+            raise
         except Exception as e:
             logger.warning(f"Error on attempt {attempt + 1}: {e}")
-            if attempt == max_retries - 1:
-                break
+            catalog_breaker.record_failure()
+        finally:
+            catalog_upstream_seconds.labels(outcome).observe(time.perf_counter() - attempt_started)
+        
+        if attempt == catalog_retry_policy.max_attempts - 1:
+            break
+        if catalog_breaker.state != CircuitBreaker.CLOSED:
+            break
+        delay = catalog_retry_policy.backoff(attempt)
+        if loop.time() + delay >= deadline:
+            break
+        if not catalog_retry_budget.try_spend():
+            logger.warning(f"Catalog retry budget exhausted, not retrying theme '{keyword}'")
+            break
+        if catalog_upstream_limiter.try_acquire():
+            upstream_rate_limit_rejections.inc()
+            logger.warning(f"Catalog upstream rate limit reached, not retrying theme '{keyword}'")
+            break
+        await asyncio.sleep(delay)
     
-    # Fallback to sample data if API is unavailable
-    logger.warning(f"Roblox API unavailable, using sample data for theme '{theme}'")
-    return get_sample_outfit_items(theme, limit)
+    return None
 
 
-def get_sample_outfit_items(theme: str, limit: int) -> List[OutfitItem]:
+def get_sample_outfit_items(theme: str, limit: int, part: Optional[str] = None) -> List[OutfitRecord]:
     """
-    Get sample outfit items when the real API is unavailable.
-    Converts sample data to match the new string-based assetId format.
+    Get sample outfit items (from the rules file) when the real API is unavailable.
+    When a part is given, items of that type are listed first.
     """
-    theme_lower = theme.lower()
+    # Samples of the theme, or the rules' fallback mix of other themes for unknown ones
+    rules = get_rules()
+    outfit_items = list(rules.theme_samples[rules.theme_id(theme)])
     
-    # Find matching theme or use a default
-    if theme_lower in SAMPLE_OUTFITS:
-        outfit_items = SAMPLE_OUTFITS[theme_lower]
+    # Shuffle (seeded, so deterministic /recommend responses stay stable when falling back) and limit
+    random.Random(f"{rules.theme_id(theme)}|{part}").shuffle(outfit_items)
+    if part:
+        part_lower = part.lower()
+        outfit_items.sort(key=lambda item: item.type != part_lower)
     else:
-        # Use casual as default and mix with other themes for variety
-        outfit_items = SAMPLE_OUTFITS["casual"][:4] + SAMPLE_OUTFITS["formal"][:2]
-    
-    # Shuffle and limit results
-    random.shuffle(outfit_items)
-    selected_items = outfit_items[:min(limit, len(outfit_items))]
-    
-    # Convert to OutfitItem objects with string assetIds
-    return [OutfitItem(assetId=str(item["assetId"]), type=item["type"]) for item in selected_items]
+        # A whole outfit: one item of each type before any type repeats
+        outfit_items = outfit_solver.spread_by_type(outfit_items)
+    return outfit_items[:min(limit, len(outfit_items))]
+
+def enforce_user_rate_limit(*user_ids: int) -> None:
+    """
+    Take one token per user, raising 429 with Retry-After if any user is over their limit.
+    Tokens are only taken when every user is within their limit, so a rejected batch costs nobody quota.
+    """
+    wait = user_rate_limiter.try_acquire_all(user_ids)
+    if wait:
+        user_rate_limit_rejections.inc()
+        logger.warning(f"Rate limit exceeded for users {list(user_ids)[:5]}, retry in {wait:.2f}s")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests. Please slow down.",
+            headers=retry_after_header(wait)
+        )
 
 @app.get("/")
 async def root():
@@ -213,11 +824,46 @@ async def root():
         "description": "AI Style Assistant backend for Roblox game",
         "endpoints": {
             "/chat": "Chat with NPC for style advice",
-            "/recommend": "Get outfit recommendations by theme"
+            "/chat/stream": "Chat with NPC, streamed as Server-Sent Events with optional outfit items",
+            "/recommend": "Get outfit recommendations by theme (GET: deterministic and HTTP-cacheable with ETags)",
+            "/recommend/batch": "Get outfit recommendations for many players at once",
+            "/stats": "Runtime statistics for upstream connections, caches and the circuit breaker",
+            "/metrics": "Prometheus metrics"
         },
         "version": "1.0.0"
     }
 
+@app.get("/stats")
+async def stats():
+    """Runtime statistics for the catalog HTTP client, cache, retry budget, circuit breaker, local store and snapshots."""
+    store = catalog_store.get_store()
+    return {
+        "catalog_http": pool_stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "catalog_singleflight": catalog_flights.stats(),
+        "asset_details": asset_details_loader.stats(),
+        "catalog_retry_budget": catalog_retry_budget.stats(),
+        "catalog_breaker": catalog_breaker.stats(),
+        "catalog_store": store.stats() if store is not None else None,
+        "catalog_ingest": catalog_ingestor.stats(),
+        "sessions": user_sessions.stats(),
+        "recommend_responses": recommend_responses.stats(),
+        "rate_limit_users": user_rate_limiter.stats(),
+        "rate_limit_catalog_upstream": catalog_upstream_limiter.stats(),
+        "rules": rules_stats(),
+        "embeddings": embeddings.stats(),
+        "snapshot": {
+            "restored": snapshot_restore,
+            "writer": catalog_snapshots.stats() if CATALOG_SNAPSHOT_PATH else None,
+        },
+        "startup": startup_report.stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Latency histograms and counters in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
@@ -226,6 +872,7 @@ async def chat(request: ChatRequest):
     try:
         if not request.prompt.strip():
             raise HTTPException(status_code=400, detail="Prompt cannot be empty")
+        enforce_user_rate_limit(request.user_id)
         
         npc_reply = get_npc_response(request.prompt)
         
@@ -243,37 +890,170 @@ async def chat(request: ChatRequest):
         logger.error(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.post("/recommend", response_model=RecommendResponse)
-async def recommend(request: RecommendRequest):
+def reply_chunks(reply: str) -> List[str]:
+    """Split a reply into word-sized chunks (each keeps its trailing whitespace)."""
+    chunks = reply.split(" ")
+    return [chunk + " " for chunk in chunks[:-1]] + chunks[-1:]
+
+def sse_event(event: str, data: dict) -> bytes:
+    """Encode one Server-Sent Event with a JSON data payload."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatStreamRequest):
     """
-    Recommend endpoint that fetches 6-10 outfit items from Roblox catalog API by theme.
-    Returns JSON with assetId and type, plus success message.
+    Streaming chat endpoint (Server-Sent Events).
+    Emits the NPC reply as "reply" events carrying text chunks; with "outfit": true it then
+    streams "item" events with outfit items for the prompt's theme as each outfit part is
+    ranked, followed by a final "done" event. Events are produced only as fast as the client
+    reads them, and a client disconnect cancels the pipeline and its catalog fetches.
     """
+    if not request.prompt.strip():
+        raise HTTPException(status_code=400, detail="Prompt cannot be empty")
+    enforce_user_rate_limit(request.user_id)
+    
+    npc_reply = get_npc_response(request.prompt)
+    
+    async def events():
+        for chunk in reply_chunks(npc_reply):
+            yield sse_event("reply", {"text": chunk})
+        
+        outfit: List[OutfitRecord] = []
+        theme = None
+        if request.outfit:
+            theme = prompt_stylist.run(request.prompt).theme
+            try:
+                async for item in orchestrator.stream_async(
+                    RecommendIn(theme=theme, user_id=request.user_id),
+                    fetcher=fetch_part_items,
+                    limit=random.randint(6, 10),
+                    seen=user_sessions.seen(request.user_id)
+                ):
+                    outfit.append(item)
+                    yield sse_event("item", item.as_dict())
+            except Exception as e:
+                logger.error(f"Error streaming outfit for user {request.user_id}: {e}")
+            if outfit:
+                user_sessions.record(request.user_id, recommend_memo_key(theme), outfit)
+        
+        logger.info(f"Streamed chat reply to user {request.user_id}" + (f" with {len(outfit)} '{theme}' items" if theme else ""))
+        yield sse_event("done", {
+            "success": True,
+            "user_id": request.user_id,
+            "reply": npc_reply,
+            "theme": theme,
+            "items": len(outfit)
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def recommend_payload(request: RecommendRequest, outfit: List[OutfitRecord]) -> dict:
+    """Build the RecommendResponse JSON body for one user from a pipeline outfit."""
+    if not outfit:
+        # Return error response as per requirements
+        return {
+            "success": False,
+            "user_id": request.user_id,
+            "message": f"No items found for theme '{request.theme}'. Try a different theme.",
+            "outfit": []
+        }
+    
+    logger.info(f"Recommendation request from user {request.user_id} for theme '{request.theme}' -> {len(outfit)} items")
+    
+    return {
+        "success": True,
+        "user_id": request.user_id,
+        "message": f"Your {request.theme} outfit is ready!",
+        "outfit": [item.as_dict() for item in outfit]
+    }
+
+def recommend_bucket(now: Optional[float] = None) -> Tuple[int, int]:
+    """Current deterministic time bucket and the whole seconds until it ends (at least 1)."""
+    now = time.time() if now is None else now
+    bucket = int(now // RECOMMEND_BUCKET_SECONDS)
+    return bucket, max(1, int((bucket + 1) * RECOMMEND_BUCKET_SECONDS - now))
+
+def recommend_seed(key: tuple) -> int:
+    """Stable 64-bit seed for a (theme, budgets, user_id, bucket) key, identical in every worker."""
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), "big")
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+async def deterministic_recommend(request: RecommendRequest, if_none_match: Optional[str]) -> Response:
+    """
+    Deterministic, HTTP-cacheable recommendation.
+    The outfit size and ranking are seeded from (theme, budgets, user_id, time bucket) and
+    items already shown to the user are not demoted, so every repeat within the bucket gets
+    the same bytes. The rendered body and its strong ETag are cached for the bucket; a
+    matching If-None-Match is answered with 304 without running the pipeline.
+    """
+    bucket, remaining = recommend_bucket()
+    key = (*request.memo_key(), request.user_id, bucket)
+    cached = recommend_responses.get(key)
+    if cached is None:
+        seed = recommend_seed(key)
+        outfit = await orchestrator.run_async(
+            request.pipeline_input(),
+            fetcher=fetch_part_items,
+            limit=random.Random(seed).randint(6, 10),
+            seed=seed
+        )
+        body = orjson.dumps(recommend_payload(request, outfit))
+        if not outfit:
+            return Response(body, media_type="application/json", headers={"Cache-Control": "no-store"})
+        user_sessions.record(request.user_id, request.memo_key(), outfit)
+        cached = (body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+        recommend_responses.set(key, cached)
+        result = "computed"
+    else:
+        result = "cached"
+    
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={remaining}"}
+    if etag_matches(if_none_match, etag):
+        recommend_deterministic_total.labels("not_modified").inc()
+        return Response(status_code=304, headers=headers)
+    recommend_deterministic_total.labels(result).inc()
+    return Response(body, media_type="application/json", headers=headers)
+
+async def recommend_response(
+    request: RecommendRequest,
+    if_none_match: Optional[str] = None,
+    deterministic: bool = False
+) -> Response:
+    """Shared body of POST and GET /recommend: validation, rate limiting, pipeline and fallback."""
     try:
         if not request.theme.strip():
             raise HTTPException(status_code=400, detail="Theme cannot be empty")
+        enforce_user_rate_limit(request.user_id)
         
-        # Fetch outfit items (6-10 items)
-        limit = random.randint(6, 10)
-        outfit_items = await fetch_roblox_catalog_items(request.theme, limit=limit)
+        if deterministic:
+            return await deterministic_recommend(request, if_none_match)
         
-        if not outfit_items:
-            # Return error response as per requirements
-            return RecommendResponse(
-                success=False,
-                user_id=request.user_id,
-                message=f"No items found for theme '{request.theme}'. Try a different theme.",
-                outfit=[]
+        memo_key = request.memo_key()
+        outfit = user_sessions.memo(request.user_id, memo_key)
+        if outfit is None:
+            # One item per outfit part, at most 6-10 items
+            limit = random.randint(6, 10)
+            outfit = await orchestrator.run_async(
+                request.pipeline_input(),
+                fetcher=fetch_part_items,
+                limit=limit,
+                seen=user_sessions.seen(request.user_id)
             )
-        
-        logger.info(f"Recommendation request from user {request.user_id} for theme '{request.theme}' -> {len(outfit_items)} items")
-        
-        return RecommendResponse(
-            success=True,
-            user_id=request.user_id,
-            message=f"Your {request.theme} outfit is ready!",
-            outfit=outfit_items
-        )
+            if outfit:
+                user_sessions.record(request.user_id, memo_key, outfit)
+        return ORJSONResponse(recommend_payload(request, outfit))
         
     except HTTPException:
         raise
@@ -282,13 +1062,9 @@ async def recommend(request: RecommendRequest):
         # For unexpected errors, still try to return a fallback response
         try:
             fallback_items = get_sample_outfit_items(request.theme, random.randint(6, 10))
+            catalog_fallback_total.labels("endpoint_error").inc()
             logger.info(f"Using fallback data for user {request.user_id}, theme '{request.theme}'")
-            return RecommendResponse(
-                success=True,
-                user_id=request.user_id,
-                message=f"Your {request.theme} outfit is ready!",
-                outfit=fallback_items
-            )
+            return ORJSONResponse(recommend_payload(request, fallback_items), headers={"Cache-Control": "no-store"})
         except Exception:
             # If even fallback fails, return 502 as per requirements
             raise HTTPException(
@@ -296,6 +1072,91 @@ async def recommend(request: RecommendRequest):
                 detail="Failed to fetch outfit recommendations. Please try again later."
             )
 
+@app.post("/recommend", response_model=RecommendResponse)
+async def recommend(request: RecommendRequest, if_none_match: Optional[str] = Header(None)):
+    """
+    Recommend endpoint that assembles an outfit (one item per part, at most 6-10 items) from the Roblox catalog API by theme.
+    Runs the stylist -> catalog -> ranker pipeline, fetching each outfit part concurrently.
+    A repeat of the user's previous request within RECOMMEND_MEMO_TTL gets the same outfit
+    from their session; otherwise items already shown to the user are ranked last.
+    With RECOMMEND_DETERMINISTIC set, responses are deterministic per time bucket and carry
+    ETag and Cache-Control headers (see GET /recommend).
+    Returns JSON with assetId and type, plus success message, encoded with orjson
+    (response_model only documents the schema).
+    """
+    return await recommend_response(request, if_none_match, deterministic=RECOMMEND_DETERMINISTIC)
+
+@app.get("/recommend", response_model=RecommendResponse)
+async def recommend_cacheable(
+    theme: str = Query(..., description="Theme for outfit recommendations"),
+    user_id: int = Query(..., description="User ID"),
+    budget: Optional[int] = Query(None, ge=0, description="Maximum price in Robux per outfit item"),
+    outfit_budget: Optional[int] = Query(None, ge=0, description="Maximum total price in Robux for the outfit"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Cacheable recommend endpoint for CDNs and HTTP caches.
+    The outfit is deterministic for (theme, budgets, user_id) within each
+    RECOMMEND_BUCKET_SECONDS window; responses carry a strong ETag and
+    Cache-Control max-age up to the end of the window, and If-None-Match
+    revalidations are answered with 304 Not Modified.
+    """
+    return await recommend_response(
+        RecommendRequest(theme=theme, user_id=user_id, budget=budget, outfit_budget=outfit_budget),
+        if_none_match, deterministic=True
+    )
+
+@app.post("/recommend/batch", response_model=BatchRecommendResponse)
+async def recommend_batch(batch: BatchRecommendRequest, stream: bool = False):
+    """
+    Batch recommend endpoint for multi-player lobbies.
+    Each distinct theme is fetched once (all themes concurrently) and ranked per user.
+    With ?stream=true the results are streamed as NDJSON lines, each a RecommendResponse
+    plus its "index" in the request list, in completion order.
+    """
+    if any(not request.theme.strip() for request in batch.requests):
+        raise HTTPException(status_code=400, detail="Theme cannot be empty")
+    enforce_user_rate_limit(*dict.fromkeys(request.user_id for request in batch.requests))
+    
+    inputs = [request.pipeline_input() for request in batch.requests]
+    limits = [random.randint(6, 10) for _ in batch.requests]
+    seen = [user_sessions.seen(request.user_id) for request in batch.requests]
+    results = orchestrator.run_batch(inputs, fetcher=fetch_part_items, limits=limits, seen=seen)
+    
+    def remember(index: int, outfit: List[OutfitRecord]) -> List[OutfitRecord]:
+        request = batch.requests[index]
+        if outfit:
+            user_sessions.record(request.user_id, request.memo_key(), outfit)
+        return outfit
+    
+    if stream:
+        async def ndjson_lines():
+            async for index, outfit in results:
+                remember(index, outfit)
+                yield orjson.dumps({"index": index, **recommend_payload(batch.requests[index], outfit)}) + b"\n"
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    
+    try:
+        ordered: List[Optional[dict]] = [None] * len(inputs)
+        async for index, outfit in results:
+            remember(index, outfit)
+            ordered[index] = recommend_payload(batch.requests[index], outfit)
+    except Exception as e:
+        logger.error(f"Error in batch recommend endpoint: {e}")
+        raise HTTPException(
+            status_code=502,
+            detail="Failed to fetch outfit recommendations. Please try again later."
+        )
+    
+    logger.info(f"Batch recommendation for {len(inputs)} users, {len({normalize_theme(i.theme) for i in inputs})} themes")
+    return ORJSONResponse({
+        "success": all(response["success"] for response in ordered),
+        "results": ordered
+    })
+
+startup_report.mark("app_imported")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+In-memory token-bucket rate limiting.
+Buckets refill continuously at `rate` tokens per second up to `burst`; a check
+is O(1) and never sleeps, returning how long the caller should wait instead.
+Keyed limiters keep one bucket per key in LRU order and drop buckets that have
+been idle long enough to be full again, so memory is bounded by active keys.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+
+class TokenBucket:
+    """Token count and last refill time of one bucket."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+    def refill(self, now: float, rate: float, burst: float) -> None:
+        """Add the tokens accrued since the last refill, up to burst."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def take(self, now: float, rate: float, burst: float, cost: float = 1.0) -> float:
+        """
+        Refill, then take `cost` tokens if available.
+
+        Returns:
+            0.0 if the tokens were taken, otherwise seconds until they would be available
+        """
+        self.refill(now, rate, burst)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / rate
+
+
+class TokenBucketLimiter:
+    """A single shared bucket, e.g. for calls to an upstream API."""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate: Tokens added per second (0 disables limiting)
+            burst: Bucket capacity
+            clock: Monotonic time source
+        """
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._bucket = TokenBucket(burst, clock())
+        self.allowed = 0
+        self.rejected = 0
+
+    def try_acquire(self, cost: float = 1.0) -> float:
+        """Take `cost` tokens; returns 0.0 on success or the seconds to wait."""
+        if self.rate <= 0:
+            return 0.0
+        wait = self._bucket.take(self._clock(), self.rate, self.burst, cost)
+        if wait:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(min(self.burst, self._bucket.tokens + (self._clock() - self._bucket.updated) * self.rate), 2)
+            if self.rate > 0 else None,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+class KeyedRateLimiter:
+    """
+    One token bucket per key (e.g. per user).
+    A bucket idle for burst / rate seconds is full again, so it is evicted without
+    changing any outcome; `max_keys` additionally caps memory under key floods by
+    evicting the least recently used buckets.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            rate: Tokens added per second per key (0 disables limiting)
+            burst: Bucket capacity per key
+            max_keys: Maximum buckets kept in memory
+            clock: Monotonic time source
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._idle_ttl = burst / rate if rate > 0 else 0.0
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def try_acquire(self, key: Hashable, cost: float = 1.0) -> float:
+        """
+        Take `cost` tokens from key's bucket.
+
+        Returns:
+            0.0 if allowed, otherwise seconds until the request would be allowed
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = self._clock()
+        wait = self._bucket(key, now).take(now, self.rate, self.burst, cost)
+        if wait:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def try_acquire_all(self, keys: Iterable[Hashable], cost: float = 1.0) -> float:
+        """
+        Take `cost` tokens from every key's bucket, or from none of them if any is short.
+
+        Returns:
+            0.0 if allowed, otherwise seconds until every key would be allowed
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = self._clock()
+        buckets = [self._bucket(key, now) for key in dict.fromkeys(keys)]
+        for bucket in buckets:
+            bucket.refill(now, self.rate, self.burst)
+        wait = max(((cost - bucket.tokens) / self.rate for bucket in buckets if bucket.tokens < cost), default=0.0)
+        if wait:
+            self.rejected += len(buckets)
+            return wait
+        for bucket in buckets:
+            bucket.tokens -= cost
+        self.allowed += len(buckets)
+        return 0.0
+
+    def _bucket(self, key: Hashable, now: float) -> TokenBucket:
+        """Key's bucket as most recently used, created full if missing."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.burst, now)
+            self._evict(now)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _evict(self, now: float) -> None:
+        # Least recently used buckets are at the front; stop at the first one still refilling
+        buckets = self._buckets
+        while buckets:
+            key, oldest = next(iter(buckets.items()))
+            if len(buckets) <= self.max_keys and now - oldest.updated < self._idle_ttl:
+                break
+            del buckets[key]
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "keys": len(self._buckets),
+            "max_keys": self.max_keys,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+
+def retry_after_header(wait: float) -> Dict[str, str]:
+    """Retry-After header (whole seconds, at least 1) for a limiter wait time."""
+    return {"Retry-After": str(max(1, math.ceil(wait)))}
@@ -0,0 +1,203 @@
+"""
+Resilience primitives for calls to the Roblox catalog upstream.
+Provides exponential backoff with jitter, a global retry budget and a circuit
+breaker, so a degraded upstream fails fast instead of holding requests and
+multiplying the load on it.
+"""
+
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """Attempt limits, deadlines and backoff parameters for one upstream call."""
+
+    __slots__ = ("max_attempts", "attempt_timeout", "deadline", "backoff_base", "backoff_cap")
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        attempt_timeout: float = 2.0,
+        deadline: float = 5.0,
+        backoff_base: float = 0.1,
+        backoff_cap: float = 1.0,
+    ):
+        """
+        Args:
+            max_attempts: Maximum attempts including the first one
+            attempt_timeout: Timeout in seconds for a single attempt
+            deadline: Overall time budget in seconds across all attempts and backoff sleeps
+            backoff_base: Backoff before the first retry is drawn from [0, backoff_base]
+            backoff_cap: Upper bound for any single backoff sleep
+        """
+        self.max_attempts = max_attempts
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def backoff(self, retry: int, rng: Optional[random.Random] = None) -> float:
+        """
+        Exponential backoff with full jitter.
+
+        Args:
+            retry: Zero-based retry number (0 for the sleep before the first retry)
+            rng: Optional random source
+
+        Returns:
+            Seconds to sleep, uniformly drawn from [0, min(cap, base * 2**retry)]
+        """
+        ceiling = min(self.backoff_cap, self.backoff_base * (2 ** retry))
+        return (rng or random).uniform(0.0, ceiling)
+
+
+class RetryBudget:
+    """
+    Global token budget limiting retries to a fraction of overall traffic.
+    Every first attempt deposits `ratio` tokens and every retry withdraws one,
+    so under a full outage retries add at most `ratio` extra load (plus a small burst).
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        """
+        Args:
+            ratio: Retries allowed per original request
+            max_tokens: Maximum saved-up tokens (the retry burst size)
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        """Account for a first attempt."""
+        self.requests += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Withdraw one token for a retry. Returns False if the budget is exhausted."""
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            self.retries += 1
+            return True
+        self.exhausted += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ratio": self.ratio,
+            "tokens": round(self._tokens, 3),
+            "max_tokens": self.max_tokens,
+            "requests": self.requests,
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probing.
+
+    closed    -> requests flow; `failure_threshold` consecutive failures trip it open
+    open      -> requests are rejected until `reset_timeout` has elapsed
+    half_open -> up to `half_open_max_calls` probes are let through; a success closes
+                 the breaker, a failure re-opens it, and a probe that ends without an
+                 outcome (cancelled) must `release` its slot
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+        self.trips = 0
+        self.rejected = 0
+        self.successes = 0
+        self.failures = 0
+
+    @property
+    def state(self) -> str:
+        """Current state; an open breaker becomes half-open once the reset timeout elapses."""
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            logger.info(f"Circuit breaker '{self.name}' half-open, probing upstream")
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a call may go upstream now. Rejections are counted."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def release(self) -> None:
+        """
+        Give back a half-open probe slot taken by `allow_request` when the call ends
+        without an outcome (e.g. it was cancelled), so the next call can probe instead.
+        """
+        if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        self.successes += 1
+        self._consecutive_failures = 0
+        if self._state != self.CLOSED:
+            logger.info(f"Circuit breaker '{self.name}' closed")
+        self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._consecutive_failures += 1
+        if self._state == self.HALF_OPEN or (
+            self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold
+        ):
+            self._trip()
+
+    def _trip(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self.trips += 1
+        logger.warning(
+            f"Circuit breaker '{self.name}' opened after {self._consecutive_failures} consecutive failures"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "successes": self.successes,
+            "failures": self.failures,
+        }
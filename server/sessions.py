@@ -0,0 +1,177 @@
+"""
+Per-user session state for recommendations.
+Remembers each user's recent themes, the last outfit served (so an identical
+repeat request within `memo_ttl` is answered from memory) and the asset IDs
+recently shown (so the ranker can avoid repeating them). Sessions are kept in
+LRU order with an idle TTL and a hard user cap; asset IDs are packed into
+int64 arrays and type/theme strings are interned to keep each session small.
+"""
+
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from agents.contracts import OutfitRecord
+
+
+def _pack_ids(outfit: List[OutfitRecord]) -> Optional[array]:
+    """Pack numeric asset IDs into an int64 array, or None if any ID is not numeric."""
+    try:
+        return array("q", (int(item.assetId) for item in outfit))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class UserSession:
+    """Compact session of one user."""
+
+    __slots__ = ("updated", "themes", "memo_key", "memo_at", "memo_ids", "memo_types", "seen")
+
+    def __init__(self, now: float):
+        self.updated = now
+        self.themes: Tuple[str, ...] = ()
+        self.memo_key: Optional[Hashable] = None
+        self.memo_at = 0.0
+        self.memo_ids: Optional[array] = None
+        self.memo_types: Tuple[str, ...] = ()
+        self.seen = array("q")
+
+
+class SessionStore:
+    """
+    Bounded LRU store of UserSessions keyed by user ID.
+    Not thread-safe; it is meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_users: int = 100_000,
+        ttl: float = 1800.0,
+        memo_ttl: float = 30.0,
+        max_themes: int = 5,
+        max_seen: int = 32,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            max_users: Maximum sessions kept (least recently active are evicted first)
+            ttl: Seconds of inactivity after which a session is dropped
+            memo_ttl: Seconds a served outfit answers identical repeat requests (0 disables)
+            max_themes: Recent themes remembered per user
+            max_seen: Recently shown asset IDs remembered per user
+            clock: Monotonic time source
+        """
+        self.max_users = max_users
+        self.ttl = ttl
+        self.memo_ttl = memo_ttl
+        self.max_themes = max_themes
+        self.max_seen = max_seen
+        self._clock = clock
+        self._sessions: "OrderedDict[int, UserSession]" = OrderedDict()
+
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _get(self, user_id: int, now: float) -> Optional[UserSession]:
+        session = self._sessions.get(user_id)
+        if session is None:
+            return None
+        if now - session.updated > self.ttl:
+            del self._sessions[user_id]
+            self.expirations += 1
+            return None
+        return session
+
+    def memo(self, user_id: int, key: Hashable) -> Optional[List[OutfitRecord]]:
+        """Return the outfit last served to user_id for `key` if it is within memo_ttl."""
+        now = self._clock()
+        session = self._get(user_id, now)
+        if (
+            session is None
+            or session.memo_key != key
+            or session.memo_ids is None
+            or now - session.memo_at > self.memo_ttl
+        ):
+            self.memo_misses += 1
+            return None
+        self.memo_hits += 1
+        return [OutfitRecord(str(asset_id), item_type)
+                for asset_id, item_type in zip(session.memo_ids, session.memo_types)]
+
+    def seen(self, user_id: int) -> FrozenSet[str]:
+        """Asset IDs recently shown to user_id."""
+        session = self._get(user_id, self._clock())
+        if session is None or not session.seen:
+            return frozenset()
+        return frozenset(str(asset_id) for asset_id in session.seen)
+
+    def recent_themes(self, user_id: int) -> Tuple[str, ...]:
+        """User's recent themes, most recent first."""
+        session = self._get(user_id, self._clock())
+        return session.themes if session is not None else ()
+
+    def record(self, user_id: int, key: Tuple[str, Any], outfit: List[OutfitRecord]) -> None:
+        """
+        Remember an outfit served to user_id.
+
+        Args:
+            user_id: User the outfit was served to
+            key: Memo key of the request; key[0] is the normalized theme
+            outfit: Served items
+        """
+        now = self._clock()
+        session = self._get(user_id, now)
+        if session is None:
+            session = self._sessions[user_id] = UserSession(now)
+            self._evict(now)
+        else:
+            self._sessions.move_to_end(user_id)
+        session.updated = now
+
+        theme = sys.intern(key[0])
+        session.themes = (theme,) + tuple(t for t in session.themes if t != theme)[:self.max_themes - 1]
+
+        ids = _pack_ids(outfit)
+        session.memo_key = key
+        session.memo_at = now
+        session.memo_ids = ids
+        session.memo_types = tuple(sys.intern(item.type) for item in outfit)
+        if ids is not None:
+            seen = session.seen
+            seen.extend(ids)
+            if len(seen) > self.max_seen:
+                del seen[:len(seen) - self.max_seen]
+
+    def _evict(self, now: float) -> None:
+        # Least recently active sessions are at the front; stop at the first live one
+        sessions = self._sessions
+        while sessions:
+            user_id, oldest = next(iter(sessions.items()))
+            if len(sessions) > self.max_users:
+                self.evictions += 1
+            elif now - oldest.updated > self.ttl:
+                self.expirations += 1
+            else:
+                break
+            del sessions[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memo_hits + self.memo_misses
+        return {
+            "users": len(self._sessions),
+            "max_users": self.max_users,
+            "ttl": self.ttl,
+            "memo_ttl": self.memo_ttl,
+            "memo_hits": self.memo_hits,
+            "memo_misses": self.memo_misses,
+            "memo_hit_ratio": round(self.memo_hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
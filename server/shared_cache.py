@@ -0,0 +1,206 @@
+"""
+Cross-process cache backend shared by all server workers.
+A small SQLite database (WAL mode) holds encoded values with their wall-clock
+store time, so a catalog page fetched by one worker is visible to every worker
+on the host. Fill leases let one process fetch a missing key while the others
+wait for its result instead of calling the upstream too.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SharedCache:
+    """
+    SQLite-backed key/value store used as the second cache level behind TTLCache.
+    Keys are hashable tuples of JSON-serializable parts; values are converted to
+    bytes with `encode` and back with `decode`. Entries older than `max_age` are
+    treated as missing and purged periodically.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        encode: Callable[[Any], bytes],
+        decode: Callable[[bytes], Any],
+        max_age: float = 3900.0,
+        lease_timeout: float = 5.0,
+        purge_interval: float = 60.0,
+    ):
+        """
+        Args:
+            path: SQLite database file shared by the worker processes
+            encode: Converts a cached value to bytes
+            decode: Converts stored bytes back to a value
+            max_age: Seconds after which an entry is no longer returned
+            lease_timeout: Seconds a fill lease is held before others may take it over
+            purge_interval: Minimum seconds between purges of expired rows
+        """
+        self.path = path
+        self._encode = encode
+        self._decode = decode
+        self.max_age = max_age
+        self.lease_timeout = lease_timeout
+        self.purge_interval = purge_interval
+        self._pid = os.getpid()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_purge = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self.leases_won = 0
+        self.leases_lost = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared across fork(), so each process opens its own
+        if self._conn is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return orjson.dumps(key).decode()
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        Return (value, age in seconds) for key, or None if missing or too old.
+        Backend errors are logged and reported as a miss.
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT value, stored_at FROM cache WHERE key = ?", (self._key(key),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared cache read failed: {e}")
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        age = max(0.0, time.time() - row[1])
+        if age > self.max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._decode(row[0]), age
+
+    def set(self, key: Hashable, value: Any, age: float = 0.0) -> None:
+        """Store value for every worker and release this process's fill lease on the key."""
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (self._key(key), self._encode(value), now - age)
+            )
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (self._key(key), self._pid))
+            self.writes += 1
+            if now - self._last_purge > self.purge_interval:
+                self._last_purge = now
+                conn.execute("DELETE FROM cache WHERE stored_at < ?", (now - self.max_age,))
+                conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def try_lease(self, key: Hashable) -> bool:
+        """
+        Try to become the process that fills key.
+        Returns True if the lease was taken (or the backend failed, so the caller
+        fetches anyway), False if another live process holds it.
+        """
+        now = time.time()
+        try:
+            conn = self._connection()
+            cursor = conn.execute(
+                "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET owner=excluded.owner, expires_at=excluded.expires_at "
+                "WHERE leases.expires_at < ? OR leases.owner = excluded.owner",
+                (self._key(key), self._pid, now + self.lease_timeout, now)
+            )
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared cache lease failed: {e}")
+            return True
+        if cursor.rowcount > 0:
+            self.leases_won += 1
+            return True
+        self.leases_lost += 1
+        return False
+
+    def is_leased(self, key: Hashable) -> bool:
+        """Whether some process currently holds an unexpired fill lease on key."""
+        try:
+            row = self._connection().execute(
+                "SELECT 1 FROM leases WHERE key = ? AND expires_at >= ?", (self._key(key), time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared cache lease check failed: {e}")
+            return False
+        return row is not None
+
+    def release(self, key: Hashable) -> None:
+        """Give up this process's fill lease on key (e.g. after a failed fetch)."""
+        try:
+            self._connection().execute(
+                "DELETE FROM leases WHERE key = ? AND owner = ?", (self._key(key), self._pid)
+            )
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared cache lease release failed: {e}")
+
+    def clear(self) -> None:
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM cache")
+            conn.execute("DELETE FROM leases")
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for this process plus the shared entry count."""
+        try:
+            entries = self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_age": self.max_age,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+            "leases_won": self.leases_won,
+            "leases_lost": self.leases_lost,
+        }
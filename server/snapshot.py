@@ -0,0 +1,430 @@
+"""
+Catalog snapshot: a compact on-disk copy of the catalog page cache and the
+asset details cache, written periodically and loaded at startup so a freshly
+deployed instance serves hot themes from cache instead of stampeding the
+upstream.
+
+File layout (little-endian): an 8-byte magic, a uint32 format version, a
+uint32 header length, a JSON header listing every column (dtype, offset,
+length), then the columns, each 8-byte aligned. Assets are stored once as
+columns (ID, type, price, favorite count); cached search pages refer to them by
+row; strings (types, keywords, categories, cursors) are interned into tables;
+fetch times are Unix timestamps. Reading memory-maps the file and wraps the
+columns as zero-copy NumPy views, so opening costs the same for any snapshot
+size, and only the newest rows that fit the caches are turned into objects.
+Snapshots are written to a temporary file and renamed into place, so readers
+never see a partial one.
+
+Usage:
+    python -m server.snapshot info data/catalog-snapshot.bin
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from agents.contracts import OutfitRecord
+from agents.lazy import lazy_import
+from server.catalog_pages import CatalogPage
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"OUTFSNAP"
+SNAPSHOT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGN = 8
+# Stand-ins for None in integer columns
+_NO_CODE = 0xFFFF
+_UNKNOWN = -1
+
+# (keyword, category filter, page size, page number, page, age in seconds)
+PageEntry = Tuple[str, str, int, int, CatalogPage, float]
+# (asset ID, (part type, price, favorite count), age in seconds)
+DetailEntry = Tuple[str, Tuple[Optional[str], Optional[int], Optional[int]], float]
+
+
+class _Interner:
+    """Assigns consecutive codes to strings and encodes the table as a blob plus offsets."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        return self.codes.setdefault(value, len(self.codes))
+
+    def columns(self, name: str) -> Dict[str, Any]:
+        encoded = [value.encode() for value in self.codes]
+        offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return {f"{name}_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8), f"{name}_offsets": offsets}
+
+
+def _decode_strings(blob, offsets, codes) -> Dict[int, str]:
+    """Decode only the strings with the given codes from a string table."""
+    codes = np.unique(codes)
+    return {
+        code: blob[start:end].tobytes().decode()
+        for code, start, end in zip(codes.tolist(), offsets[codes].tolist(), offsets[codes + 1].tolist())
+    }
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGN) * _ALIGN
+
+
+def _int_or_unknown(value: Optional[int]) -> int:
+    return _UNKNOWN if value is None else value
+
+
+def write_snapshot(
+    path: str,
+    pages: Iterable[PageEntry],
+    details: Iterable[DetailEntry],
+    now: Optional[float] = None
+) -> Dict[str, int]:
+    """
+    Write cached catalog pages and asset details to a snapshot file (atomically).
+    Items and details with non-numeric asset IDs are skipped.
+
+    Args:
+        path: Snapshot file to create or replace
+        pages: Cached search pages with their cache key fields and ages
+        details: Cached asset details with their ages
+        now: Unix time the ages are relative to (current time if None)
+
+    Returns:
+        Counts of pages, distinct assets and details written, and the file size in bytes
+    """
+    now = time.time() if now is None else now
+    types, keywords, categories, cursors = _Interner(), _Interner(), _Interner(), _Interner()
+
+    # Distinct item records, referenced by row from the pages
+    asset_rows: Dict[Tuple[str, str, Optional[int], Optional[int]], int] = {}
+    asset_ids: List[int] = []
+    asset_types: List[int] = []
+    asset_prices: List[int] = []
+    asset_favorites: List[int] = []
+    page_columns: Dict[str, List] = {name: [] for name in (
+        "page_keyword", "page_category", "page_size", "page_number", "page_fetched_at", "page_cursor", "page_length"
+    )}
+    page_items: List[int] = []
+    for keyword, category, page_size, page_number, page, age in pages:
+        length = 0
+        for item in page.items:
+            if not item.assetId.isdigit():
+                continue
+            record = (item.assetId, item.type, item.price, item.favorites)
+            row = asset_rows.get(record)
+            if row is None:
+                row = asset_rows[record] = len(asset_ids)
+                asset_ids.append(int(item.assetId))
+                asset_types.append(types.code(item.type))
+                asset_prices.append(_int_or_unknown(item.price))
+                asset_favorites.append(_int_or_unknown(item.favorites))
+            page_items.append(row)
+            length += 1
+        page_columns["page_keyword"].append(keywords.code(keyword))
+        page_columns["page_category"].append(categories.code(category))
+        page_columns["page_size"].append(page_size)
+        page_columns["page_number"].append(page_number)
+        page_columns["page_fetched_at"].append(now - age)
+        page_columns["page_cursor"].append(_UNKNOWN if page.next_cursor is None else cursors.code(page.next_cursor))
+        page_columns["page_length"].append(length)
+
+    detail_ids: List[int] = []
+    detail_parts: List[int] = []
+    detail_prices: List[int] = []
+    detail_favorites: List[int] = []
+    detail_fetched_at: List[float] = []
+    for asset_id, (part, price, favorites), age in details:
+        if not asset_id.isdigit():
+            continue
+        detail_ids.append(int(asset_id))
+        detail_parts.append(_NO_CODE if part is None else types.code(part))
+        detail_prices.append(_int_or_unknown(price))
+        detail_favorites.append(_int_or_unknown(favorites))
+        detail_fetched_at.append(now - age)
+
+    page_offsets = np.zeros(len(page_columns["page_length"]) + 1, dtype="<u8")
+    np.cumsum(page_columns.pop("page_length"), out=page_offsets[1:])
+    columns = {
+        "asset_id": np.asarray(asset_ids, dtype="<u8"),
+        "asset_type": np.asarray(asset_types, dtype="<u2"),
+        "asset_price": np.asarray(asset_prices, dtype="<i4"),
+        "asset_favorites": np.asarray(asset_favorites, dtype="<i4"),
+        "page_keyword": np.asarray(page_columns["page_keyword"], dtype="<u4"),
+        "page_category": np.asarray(page_columns["page_category"], dtype="<u4"),
+        "page_size": np.asarray(page_columns["page_size"], dtype="<u2"),
+        "page_number": np.asarray(page_columns["page_number"], dtype="<u2"),
+        "page_fetched_at": np.asarray(page_columns["page_fetched_at"], dtype="<f8"),
+        "page_cursor": np.asarray(page_columns["page_cursor"], dtype="<i4"),
+        "page_offsets": page_offsets,
+        "page_items": np.asarray(page_items, dtype="<u4"),
+        "detail_id": np.asarray(detail_ids, dtype="<u8"),
+        "detail_part": np.asarray(detail_parts, dtype="<u2"),
+        "detail_price": np.asarray(detail_prices, dtype="<i4"),
+        "detail_favorites": np.asarray(detail_favorites, dtype="<i4"),
+        "detail_fetched_at": np.asarray(detail_fetched_at, dtype="<f8"),
+        **types.columns("types"),
+        **keywords.columns("keywords"),
+        **categories.columns("categories"),
+        **cursors.columns("cursors"),
+    }
+
+    # Column offsets are relative to the data section, which starts 8-byte aligned after the header
+    layout = {}
+    offset = 0
+    for name, column in columns.items():
+        layout[name] = [column.dtype.str, offset, int(column.shape[0])]
+        offset += _aligned(column.nbytes)
+    encoded = json.dumps({"version": SNAPSHOT_VERSION, "created_at": now, "columns": layout}).encode()
+    encoded += b" " * (_aligned(_PREAMBLE.size + len(encoded)) - _PREAMBLE.size - len(encoded))
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, column in columns.items():
+            data = column.tobytes()
+            f.write(data)
+            f.write(b"\0" * (-len(data) % _ALIGN))
+    os.replace(tmp_path, path)
+    return {
+        "pages": len(page_columns["page_keyword"]),
+        "assets": len(asset_ids),
+        "details": len(detail_ids),
+        "bytes": os.path.getsize(path),
+    }
+
+
+class Snapshot:
+    """A memory-mapped snapshot file; columns are read-only NumPy views over the mapping."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Snapshot file
+
+        Raises:
+            ValueError: If the file is not a snapshot or has an unsupported version
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < _PREAMBLE.size or self._mmap[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a catalog snapshot")
+            _, version, header_length = _PREAMBLE.unpack_from(self._mmap, 0)
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"{path} has snapshot version {version}, expected {SNAPSHOT_VERSION}")
+            header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_length])
+            self.created_at: float = header["created_at"]
+            data_start = _PREAMBLE.size + header_length
+            # frombuffer raises ValueError if a truncated file ends inside a column
+            self.columns = {
+                name: np.frombuffer(self._mmap, dtype=np.dtype(dtype), count=length, offset=data_start + offset)
+                for name, (dtype, offset, length) in header["columns"].items()
+            }
+        except Exception:
+            self.columns = {}
+            self._mmap.close()
+            raise
+
+    def close(self) -> None:
+        """Drop the column views and unmap the file."""
+        self.columns = {}
+        self._mmap.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _newest(self, fetched_at, max_age: float, limit: int, now: float):
+        """Rows fetched within max_age, at most the newest `limit`, oldest first."""
+        rows = np.flatnonzero(fetched_at >= now - max_age)
+        if limit <= 0:
+            return rows[:0]
+        if limit < rows.shape[0]:
+            newest = rows.shape[0] - limit
+            rows = rows[np.argpartition(fetched_at[rows], newest)[newest:]]
+        return rows[np.argsort(fetched_at[rows], kind="stable")]
+
+    def pages(self, max_age: float, limit: int, now: Optional[float] = None) -> List[PageEntry]:
+        """
+        Cached pages no older than max_age, at most the newest `limit`, oldest first
+        (so inserting them in order leaves the newest most recently used).
+        """
+        now = time.time() if now is None else now
+        c = self.columns
+        rows = self._newest(c["page_fetched_at"], max_age, limit, now)
+        if rows.shape[0] == 0:
+            return []
+        keywords = _decode_strings(c["keywords_blob"], c["keywords_offsets"], c["page_keyword"][rows])
+        categories = _decode_strings(c["categories_blob"], c["categories_offsets"], c["page_category"][rows])
+        cursor_codes = c["page_cursor"][rows]
+        cursors = _decode_strings(c["cursors_blob"], c["cursors_offsets"], cursor_codes[cursor_codes != _UNKNOWN])
+
+        # Build each asset the selected pages refer to once, shared across pages
+        starts = c["page_offsets"][rows].tolist()
+        ends = c["page_offsets"][rows + 1].tolist()
+        page_items = [c["page_items"][start:end] for start, end in zip(starts, ends)]
+        asset_rows = np.unique(np.concatenate(page_items))
+        types = _decode_strings(c["types_blob"], c["types_offsets"], c["asset_type"][asset_rows])
+        records = dict(zip(asset_rows.tolist(), (
+            OutfitRecord(
+                str(asset_id), types[type_code],
+                None if price == _UNKNOWN else price, None if favorites == _UNKNOWN else favorites
+            )
+            for asset_id, type_code, price, favorites in zip(
+                c["asset_id"][asset_rows].tolist(), c["asset_type"][asset_rows].tolist(),
+                c["asset_price"][asset_rows].tolist(), c["asset_favorites"][asset_rows].tolist()
+            )
+        )))
+
+        entries = []
+        for items, keyword, category, page_size, page_number, cursor, fetched_at in zip(
+            page_items, c["page_keyword"][rows].tolist(), c["page_category"][rows].tolist(),
+            c["page_size"][rows].tolist(), c["page_number"][rows].tolist(), c["page_cursor"][rows].tolist(),
+            c["page_fetched_at"][rows].tolist()
+        ):
+            page = CatalogPage(
+                [records[row] for row in items.tolist()],
+                None if cursor == _UNKNOWN else cursors[cursor]
+            )
+            entries.append((keywords[keyword], categories[category], page_size, page_number, page, now - fetched_at))
+        return entries
+
+    def details(self, max_age: float, limit: int, now: Optional[float] = None) -> List[DetailEntry]:
+        """Cached asset details no older than max_age, at most the newest `limit`, oldest first."""
+        now = time.time() if now is None else now
+        c = self.columns
+        rows = self._newest(c["detail_fetched_at"], max_age, limit, now)
+        if rows.shape[0] == 0:
+            return []
+        part_codes = c["detail_part"][rows]
+        types = _decode_strings(c["types_blob"], c["types_offsets"], part_codes[part_codes != _NO_CODE])
+        types[_NO_CODE] = None
+        return [
+            (str(asset_id), (types[part], None if price == _UNKNOWN else price,
+                             None if favorites == _UNKNOWN else favorites), now - fetched_at)
+            for asset_id, part, price, favorites, fetched_at in zip(
+                c["detail_id"][rows].tolist(), part_codes.tolist(), c["detail_price"][rows].tolist(),
+                c["detail_favorites"][rows].tolist(), c["detail_fetched_at"][rows].tolist()
+            )
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        c = self.columns
+        return {
+            "path": self.path,
+            "version": SNAPSHOT_VERSION,
+            "created_at": self.created_at,
+            "age_seconds": round(time.time() - self.created_at, 1),
+            "pages": int(c["page_keyword"].shape[0]),
+            "assets": int(c["asset_id"].shape[0]),
+            "details": int(c["detail_id"].shape[0]),
+            "bytes": len(self._mmap),
+        }
+
+
+class SnapshotWriter:
+    """
+    Write a snapshot every `interval` seconds, and once more when stopped.
+    Entries are collected on the event loop; encoding and writing run in a thread.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        collect: Callable[[], Tuple[List[PageEntry], List[DetailEntry]]],
+        interval: float = 300.0
+    ):
+        """
+        Args:
+            path: Snapshot file
+            collect: Returns the (pages, details) to write
+            interval: Seconds between snapshots
+        """
+        self.path = path
+        self._collect = collect
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.writes = 0
+        self.failures = 0
+        self.last_write: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the periodic writes and write a final snapshot."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.write()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.write()
+
+    async def write(self) -> None:
+        """Write a snapshot now; failures are logged and counted."""
+        started = time.perf_counter()
+        try:
+            pages, details = self._collect()
+            counts = await asyncio.to_thread(write_snapshot, self.path, pages, details)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Catalog snapshot write to {self.path} failed: {e}")
+            return
+        self.writes += 1
+        self.last_write = {**counts, "seconds": round(time.perf_counter() - started, 4), "at": time.time()}
+        logger.info(f"Wrote catalog snapshot {self.path}: {counts}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "interval": self.interval,
+            "writes": self.writes,
+            "failures": self.failures,
+            "last_write": self.last_write,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect a catalog snapshot")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="Print snapshot counts and age")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    try:
+        with Snapshot(args.path) as snapshot:
+            print(json.dumps(snapshot.stats(), indent=2))
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Cold-start timing report and background warm-up.
+Records when the app finished importing, when it started accepting requests and
+when it answered its first request, measured from process start where /proc is
+available (otherwise from when this module was imported). Under gunicorn with
+preload_app the clock starts in the master, so worker figures include the
+shared import. Warm-up steps (loading the lazily imported agent pipeline) are
+timed here too; they run after the server is already accepting connections.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process was started (Linux only), or None."""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            stat = f.read()
+        # Fields after the parenthesized command name start at field 3; starttime is field 22
+        start_ticks = int(stat.rsplit(b")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupReport:
+    """Startup milestones and warm-up step durations of this server process."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        age = process_age()
+        self.measured_from = "process_start" if age is not None else "import"
+        self._origin = clock() - (age or 0.0)
+        self.milestones: Dict[str, float] = {}
+        self.warmup: Dict[str, float] = {}
+        self.warmup_error: Optional[str] = None
+
+    def mark(self, milestone: str) -> None:
+        """Record a milestone (once) as seconds since the origin."""
+        self.milestones.setdefault(milestone, round(self._clock() - self._origin, 4))
+
+    def first_response(self) -> None:
+        """Record the first answered request and log the startup summary."""
+        self.mark("first_response")
+        logger.info(
+            f"Startup ({self.measured_from}): "
+            + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.milestones.items())
+            + (f"; warm-up {sum(self.warmup.values()) * 1000:.0f}ms" if self.warmup else "")
+        )
+
+    def warm_up(self, steps: Sequence[Tuple[str, Callable[[], Any]]]) -> None:
+        """
+        Run warm-up steps in order, timing each one.
+        A failing step is logged and recorded; later steps still run.
+
+        Args:
+            steps: (name, callable) pairs
+        """
+        for name, step in steps:
+            started = self._clock()
+            try:
+                step()
+            except Exception as e:
+                self.warmup_error = f"{name}: {e}"
+                logger.error(f"Warm-up step '{name}' failed: {e}")
+            self.warmup[name] = round(self.warmup.get(name, 0.0) + self._clock() - started, 4)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "measured_from": self.measured_from,
+            "pid": os.getpid(),
+            **self.milestones,
+            "warmup": dict(self.warmup),
+            "warmup_error": self.warmup_error,
+        }
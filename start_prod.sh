@@ -1,11 +1,13 @@
 #!/bin/bash
 
 # Production server start script
-# This script starts the FastAPI server for production deployment
+# This script starts the FastAPI server for production deployment with one
+# uvicorn worker per core under gunicorn (see gunicorn.conf.py; set
+# WEB_CONCURRENCY to override the worker count)
 
 echo "🚀 Starting Roblox Outfit Marketplace Backend Server (Production Mode)..."
-echo "📱 Server will be available at: http://0.0.0.0:8000"
+echo "📱 Server will be available at: http://0.0.0.0:${PORT:-8000}"
 echo ""
 
 # Start the server without reload for production
-uvicorn server.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py server.main:app
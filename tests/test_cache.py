@@ -0,0 +1,92 @@
+"""TTLCache freshness, stale-while-revalidate, eviction and restore, driven by a fake clock."""
+
+import asyncio
+
+from server.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10.0, stale_ttl=100.0, clock=clock)
+    calls = []
+
+    async def loader():
+        calls.append(clock.now)
+        await asyncio.sleep(0)
+        return f"v{len(calls)}"
+
+    async def scenario():
+        assert await cache.get_or_fetch("k", loader) == "v1"
+        clock.now = 5.0
+        assert await cache.get_or_fetch("k", loader) == "v1"
+        clock.now = 20.0
+        # Both stale reads get the old value; only one refresh is started
+        assert await cache.get_or_fetch("k", loader) == "v1"
+        assert await cache.get_or_fetch("k", loader) == "v1"
+        await asyncio.gather(*cache._tasks)
+        assert await cache.get_or_fetch("k", loader) == "v2"
+
+    asyncio.run(scenario())
+    assert calls == [0.0, 20.0]
+    assert (cache.hits, cache.stale_hits, cache.misses, cache.refreshes) == (2, 2, 1, 1)
+
+
+def test_entries_expire_after_stale_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10.0, stale_ttl=5.0, clock=clock)
+    cache.set("k", "v")
+    clock.now = 12.0
+    assert cache.get("k") is None
+    assert len(cache) == 1
+    clock.now = 16.0
+    assert cache.get("k") is None
+    assert len(cache) == 0
+    assert cache.expirations == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+
+
+def test_fresh_for_backdates_short_lived_values():
+    clock = FakeClock()
+    cache = TTLCache(ttl=100.0, stale_ttl=100.0, clock=clock,
+                     fresh_for=lambda value: 10.0 if value == "partial" else 100.0)
+    cache.set("partial", "partial")
+    cache.set("full", "full")
+    assert [(key, age) for key, _, age in cache.entries()] == [("partial", 90.0), ("full", 0.0)]
+    clock.now = 11.0
+    assert cache.get("partial") is None
+    assert cache.get("full") == "full"
+
+
+def test_restore_keeps_the_newer_entry():
+    clock = FakeClock()
+    clock.now = 1000.0
+    cache = TTLCache(ttl=10.0, stale_ttl=100.0, clock=clock)
+    cache.set("k", "local")
+    assert not cache.restore("k", "older", age=5.0)
+    assert cache.get("k") == "local"
+
+    clock.now = 1008.0
+    assert cache.restore("k", "newer", age=1.0)
+    assert cache.get("k") == "newer"
+    assert not cache.restore("gone", "expired", age=111.0)
+    assert cache.restore("new", "restored", age=20.0)
+    assert cache.get("new") is None
+    assert cache.entries()[-1] == ("new", "restored", 20.0)
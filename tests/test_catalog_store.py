@@ -0,0 +1,46 @@
+"""Local catalog store: relevance order, favorites and queries from worker threads."""
+
+import asyncio
+
+from agents.catalog_store import CatalogRecord, CatalogStore
+
+
+def record(asset_id, name, item_type="shirt", themes="gothic", price=10, favorites=None):
+    return CatalogRecord(asset_id, name, item_type, themes, price, "creator", favorites)
+
+
+def test_search_orders_by_relevance():
+    store = CatalogStore(":memory:")
+    store.upsert_many([
+        record(1, "plain black shirt", themes="casual"),
+        record(2, "gothic gothic gothic shirt"),
+        record(3, "red shirt", themes="casual"),
+        record(4, "gothic pants", item_type="pants"),
+    ])
+    found = store.search("gothic", types=["shirt"])
+    assert [r.asset_id for r in found] == [2]
+    found = store.search("shirt")
+    # The shortest name with the keyword ranks first under bm25
+    assert found[0].asset_id == 3
+    assert {r.asset_id for r in found} == {1, 2, 3}
+
+
+def test_favorites_survive_updates_without_them():
+    store = CatalogStore(":memory:")
+    store.upsert_many([record(1, "gothic shirt", favorites=500)])
+    store.upsert_many([record(1, "gothic shirt", themes="dark", favorites=None)])
+    (found,) = store.search("gothic")
+    assert found.favorites == 500
+    assert found.themes == "gothic dark"
+
+
+def test_worker_threads_share_the_store():
+    store = CatalogStore(":memory:")
+
+    async def write_then_read():
+        await asyncio.to_thread(store.upsert_many, [record(1, "gothic shirt")])
+        return await asyncio.gather(*(asyncio.to_thread(store.search, "gothic") for _ in range(4)))
+
+    results = asyncio.run(write_then_read())
+    assert all([r.asset_id for r in found] == [1] for found in results)
+    store.close()
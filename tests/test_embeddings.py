@@ -0,0 +1,32 @@
+"""Semantic theme resolution of prompts that share no words with the rules."""
+
+import re
+
+from agents import embeddings
+from agents.rules import get_rules
+
+PARAPHRASES = {
+    "vampires and witches": "gothic",
+    "tuxedos for weddings": "formal",
+    "skaters and runners": "sporty",
+    "astronauts aboard spaceships": "futuristic",
+    "noble kings and queens": "medieval",
+}
+
+
+def words(text: str):
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def test_paraphrases_resolve_without_shared_words():
+    rules = get_rules()
+    vocabulary = set().union(*(words(phrase) for phrases in rules.theme_phrases for phrase in phrases))
+    for prompt, theme in PARAPHRASES.items():
+        # The answer must not be in the data: no keyword hit and no word of any theme phrase
+        assert not words(prompt) & vocabulary, prompt
+        assert rules.theme_matcher.first(prompt) is None
+        assert embeddings.resolve_theme(prompt, rules) == theme, prompt
+
+
+def test_unrelated_text_stays_unresolved():
+    assert embeddings.resolve_theme("lawyer in a courtroom", get_rules()) is None
@@ -0,0 +1,90 @@
+"""Catalog crawler requests share the live fetches' circuit breaker and upstream limiter."""
+
+import asyncio
+
+import httpx
+
+from server.ingest import CatalogIngestor
+from server.ratelimit import TokenBucketLimiter
+from server.resilience import CircuitBreaker
+
+
+class FailingClient:
+    """Catalog client answering every search with a 503."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, path, params=None):
+        self.calls += 1
+        return httpx.Response(503, request=httpx.Request("GET", "https://catalog.test" + path))
+
+
+def ingestor(client, **kwargs) -> CatalogIngestor:
+    return CatalogIngestor(
+        client_factory=lambda: client,
+        search_path="/v1/search/items/details",
+        keywords_for_theme=lambda theme: [theme],
+        themes=["gothic"],
+        rate=0,
+        **kwargs,
+    )
+
+
+def test_crawler_failures_trip_the_shared_breaker():
+    client = FailingClient()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60.0)
+    crawler = ingestor(client, breaker=breaker)
+
+    for _ in range(3):
+        assert asyncio.run(crawler.crawl_keyword("gothic", "gothic")) is None
+    assert breaker.state == CircuitBreaker.OPEN
+    # The third keyword was skipped without an upstream call
+    assert client.calls == 2
+    assert crawler.skipped == 1
+
+
+def test_crawler_skips_when_upstream_limit_is_reached():
+    client = FailingClient()
+    limiter = TokenBucketLimiter(rate=0.001, burst=1)
+    limiter.try_acquire()
+    crawler = ingestor(client, upstream_limiter=limiter)
+
+    assert asyncio.run(crawler.crawl_keyword("gothic", "gothic")) is None
+    assert client.calls == 0
+    assert crawler.skipped == 1
+
+
+class PagedClient:
+    """Catalog client serving two pages per (keyword, category)."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def get(self, path, params=None):
+        self.calls.append((params["keyword"], params["categoryFilter"], params.get("cursor")))
+        page = 1 if params.get("cursor") else 0
+        body = {
+            "data": [{"id": 100 * page + i, "name": f"item {i}"} for i in range(1, 4)],
+            "nextPageCursor": None if page else "next",
+        }
+        return httpx.Response(200, json=body, request=httpx.Request("GET", "https://catalog.test" + path))
+
+
+def test_crawler_hands_every_category_and_page_to_on_page():
+    client = PagedClient()
+    pages = []
+
+    async def on_page(keyword, category, page_number, items, next_cursor):
+        pages.append((keyword, category, page_number, len(items), next_cursor))
+
+    crawler = ingestor(client, on_page=on_page, category_filters=["CommunityCreations", "Featured"])
+    asyncio.run(crawler.run_cycle())
+    assert pages == [
+        ("gothic", "CommunityCreations", 0, 3, "next"),
+        ("gothic", "CommunityCreations", 1, 3, None),
+        ("gothic", "Featured", 0, 3, "next"),
+        ("gothic", "Featured", 1, 3, None),
+    ]
+    assert client.calls[1] == ("gothic", "CommunityCreations", "next")
+    assert crawler.stats()["theme_items"] == {"gothic": 12}
@@ -0,0 +1,37 @@
+"""Keyword matcher: longest-match and label precedence, word boundaries and plurals."""
+
+from agents.keyword_matcher import KeywordMatcher
+
+
+def test_longest_match_wins_over_label_order():
+    matcher = KeywordMatcher({"medieval": ["medieval"], "knight": ["medieval warrior"]})
+    assert matcher.first("a medieval warrior outfit") == "knight"
+    assert matcher.find_all("a medieval warrior outfit") == ["knight"]
+    # Without the longer phrase the shorter keyword still matches
+    assert matcher.first("a medieval outfit") == "medieval"
+    assert matcher.find_all("medieval warrior in a medieval castle") == ["medieval", "knight"]
+
+
+def test_label_order_breaks_ties_between_separate_hits():
+    matcher = KeywordMatcher({"gothic": ["dark", "goth"], "kawaii": ["cute"]})
+    assert matcher.first("cute but dark") == "gothic"
+    assert matcher.first("cute but dark", exclude=["gothic"]) == "kawaii"
+    assert matcher.find_all("cute but dark") == ["gothic", "kawaii"]
+
+
+def test_matches_respect_word_boundaries():
+    matcher = KeywordMatcher({"greeting": ["hi", "hello"], "futuristic": ["sci-fi"]})
+    assert matcher.first("this is it") is None
+    assert matcher.first("oh hi there") == "greeting"
+    assert matcher.first("Hi!") == "greeting"
+    assert matcher.first("a sci-fi look") == "futuristic"
+    assert matcher.first("science fiction") is None
+
+
+def test_trailing_plural_s_is_tolerated():
+    matcher = KeywordMatcher({"knight": ["knight"], "formal": ["suit"], "sporty": ["sneaker"]})
+    assert matcher.first("knights of old") == "knight"
+    assert matcher.first("two suits") == "formal"
+    assert matcher.first("red sneakers") == "sporty"
+    # Short words are not de-pluralized
+    assert KeywordMatcher({"x": ["hi"]}).first("his") is None
@@ -0,0 +1,90 @@
+"""Outfit assembly: one item per slot by item type, budget feasibility and top-N alternatives."""
+
+import itertools
+import random
+
+import numpy as np
+
+from agents import orchestrator, outfit_solver
+from agents.contracts import OutfitRecord, TagSpec
+
+
+def brute_force(scores, prices, budget, top_n):
+    """Every one-per-slot combination within budget, best first."""
+    outfits = []
+    for picks in itertools.product(*(range(len(slot)) for slot in scores)):
+        cost = sum(prices[slot][pick] for slot, pick in enumerate(picks))
+        if budget is None or cost <= budget:
+            outfits.append(sum(scores[slot][pick] for slot, pick in enumerate(picks)))
+    return sorted(outfits, reverse=True)[:top_n]
+
+
+def random_instance(rng, slots=4, candidates=8):
+    scores = [[rng.uniform(0, 10) for _ in range(candidates)] for _ in range(slots)]
+    prices = [[rng.randrange(0, 100) for _ in range(candidates)] for _ in range(slots)]
+    return scores, prices
+
+
+def test_best_outfit_fits_budget_and_is_optimal():
+    rng = random.Random(1)
+    for _ in range(20):
+        scores, prices = random_instance(rng)
+        budget = rng.randrange(40, 250)
+        solved = outfit_solver.solve([np.array(s) for s in scores], [np.array(p, dtype=float) for p in prices],
+                                     budget=budget)
+        best = solved[0]
+        assert -1 not in best.picks
+        assert best.cost == sum(prices[slot][pick] for slot, pick in enumerate(best.picks)) <= budget
+        assert abs(best.score - brute_force(scores, prices, budget, 1)[0]) < 1e-9
+
+
+def test_top_n_alternatives_match_exhaustive_search():
+    rng = random.Random(2)
+    for budget in (None, 150):
+        scores, prices = random_instance(rng)
+        solved = outfit_solver.solve([np.array(s) for s in scores], [np.array(p, dtype=float) for p in prices],
+                                     budget=budget, top_n=5)
+        assert len({outfit.picks for outfit in solved}) == 5
+        expected = brute_force(scores, prices, budget, 5)
+        assert [round(outfit.score, 9) for outfit in solved] == [round(score, 9) for score in expected]
+
+
+def test_min_diff_keeps_alternatives_apart():
+    rng = random.Random(3)
+    scores, prices = random_instance(rng)
+    solved = outfit_solver.solve([np.array(s) for s in scores], [np.array(p, dtype=float) for p in prices],
+                                 top_n=4, min_diff=2)
+    for a, b in itertools.combinations(solved, 2):
+        assert sum(x != y for x, y in zip(a.picks, b.picks)) >= 2
+
+
+def test_outfit_has_one_item_per_type():
+    # Every search also returns items of other types: shirts for "boots", hats for "cape"
+    candidates = {
+        part: [OutfitRecord(f"{part}-{i}", item_type, 10) for i, item_type in enumerate(types)]
+        for part, types in {
+            "shirt": ["shirt", "hat", "shirt"],
+            "pants": ["shirt", "shirt", "pants"],
+            "boots": ["shirt", "boots", "shoes"],
+            "cape": ["hat", "hat", "shirt"],
+            "accessories": ["shirt", "accessory"],
+        }.items()
+    }
+    tag_spec = TagSpec(theme="gothic", parts=list(candidates))
+    for outfit_budget in (None, 200):
+        tag_spec.outfit_budget = outfit_budget
+        outfit = orchestrator.assemble(candidates, tag_spec, limit=10, seed=0)
+        types = [item.type for item in outfit]
+        assert types.count("shirt") == 1 and "pants" in types
+        assert len({item.assetId for item in outfit}) == len(outfit)
+        # Hats have no slot of their own here, so at most one fills "accessories"
+        assert types.count("hat") + types.count("accessory") <= 1
+        assert len(outfit) == 4
+        for alternative in orchestrator.solve_outfits(candidates, tag_spec, n=3, seed=0):
+            assert [item.type for item in alternative].count("shirt") == 1
+
+
+def test_unknown_types_stay_with_their_part():
+    candidates = {"shirt": [OutfitRecord("1", "Asset")], "pants": [OutfitRecord("2", "Asset"), OutfitRecord("3", "hat")]}
+    slotted = orchestrator.slot_candidates(candidates, TagSpec(theme="casual", parts=["shirt", "pants", "shoes"]))
+    assert {part: [item.assetId for item in items] for part, items in slotted.items()} == {"shirt": ["1"], "pants": ["2"]}
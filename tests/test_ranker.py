@@ -0,0 +1,20 @@
+"""Seeded ranking must not depend on the order candidates arrived in."""
+
+import random
+
+from agents import ranker_agent
+from agents.contracts import OutfitRecord, TagSpec
+
+
+def test_seeded_scores_ignore_candidate_order():
+    items = [OutfitRecord(str(1000 + i), ("hat", "shirt", "pants")[i % 3], favorites=i * 10) for i in range(40)]
+    shuffled = items[:]
+    random.Random(1).shuffle(shuffled)
+    tag_spec = TagSpec(theme="gothic", parts=["hat", "shirt", "pants"])
+
+    first, second = ranker_agent.score_batch([(items, tag_spec), (shuffled, tag_spec)], seed=1234)
+    by_asset = dict(zip((item.assetId for item in items), first.tolist()))
+    assert dict(zip((item.assetId for item in shuffled), second.tolist())) == by_asset
+
+    ranked, reranked = ranker_agent.rank_batch([(items, tag_spec), (shuffled, tag_spec)], seed=1234)
+    assert [item.assetId for item in ranked] == [item.assetId for item in reranked]
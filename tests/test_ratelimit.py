@@ -0,0 +1,33 @@
+"""All-or-nothing charging across per-user token buckets."""
+
+from server.ratelimit import KeyedRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_rejected_batch_charges_nobody():
+    limiter = KeyedRateLimiter(rate=1.0, burst=2.0, clock=FakeClock())
+    assert limiter.try_acquire(2) == 0.0
+    assert limiter.try_acquire(2) == 0.0
+
+    # User 2 is empty, so the batch is rejected and user 1 keeps both tokens
+    assert limiter.try_acquire_all([1, 2]) == 1.0
+    assert limiter.try_acquire(1) == 0.0
+    assert limiter.try_acquire(1) == 0.0
+    assert limiter.try_acquire(1) > 0.0
+
+
+def test_allowed_batch_charges_every_key_once():
+    clock = FakeClock()
+    limiter = KeyedRateLimiter(rate=1.0, burst=1.0, clock=clock)
+    assert limiter.try_acquire_all([1, 2, 2]) == 0.0
+    assert limiter.try_acquire_all([1]) == 1.0
+    assert limiter.try_acquire_all([2]) == 1.0
+    clock.now = 1.0
+    assert limiter.try_acquire_all([1, 2]) == 0.0
@@ -0,0 +1,130 @@
+"""Circuit breaker half-open probing and outcome recording for catalog calls."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from server import main
+from server.ratelimit import TokenBucketLimiter
+from server.resilience import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def half_open_breaker() -> CircuitBreaker:
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10.0, half_open_max_calls=1, clock=clock)
+    breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    return breaker
+
+
+def test_release_frees_half_open_probe_slot():
+    breaker = half_open_breaker()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class HangingClient:
+    """Catalog client whose requests never complete."""
+
+    async def get(self, *args, **kwargs):
+        await asyncio.sleep(3600)
+
+
+def test_cancelled_catalog_fetch_releases_probe(monkeypatch):
+    breaker = half_open_breaker()
+    monkeypatch.setattr(main, "catalog_breaker", breaker)
+    monkeypatch.setattr(main, "get_catalog_client", lambda: HangingClient())
+
+    async def cancel_probe():
+        task = asyncio.ensure_future(main.fetch_catalog_page("gothic"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel_probe())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # The next fetch may probe again and can close the breaker
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class FailingDetailsClient:
+    """Catalog client whose details endpoint always answers 503."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def post(self, path, **kwargs):
+        self.calls += 1
+        return httpx.Response(503, request=httpx.Request("POST", "https://catalog.test" + path))
+
+
+def test_asset_details_failures_trip_the_breaker(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60.0)
+    client = FailingDetailsClient()
+    monkeypatch.setattr(main, "catalog_breaker", breaker)
+    monkeypatch.setattr(main, "get_catalog_client", lambda: client)
+
+    for _ in range(3):
+        with pytest.raises(Exception):
+            asyncio.run(main.fetch_asset_details(["1", "2"]))
+    assert breaker.state == CircuitBreaker.OPEN
+    assert client.calls == 2
+
+
+def test_asset_details_probe_closes_the_breaker(monkeypatch):
+    breaker = half_open_breaker()
+
+    class DetailsClient:
+        async def post(self, path, **kwargs):
+            return httpx.Response(200, json={"data": [{"id": 1, "assetType": 8, "favoriteCount": 3}]},
+                                  request=httpx.Request("POST", "https://catalog.test" + path))
+
+    monkeypatch.setattr(main, "catalog_breaker", breaker)
+    monkeypatch.setattr(main, "get_catalog_client", lambda: DetailsClient())
+    assert asyncio.run(main.fetch_asset_details(["1"])) == {"1": ("hat", None, 3)}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_breaker_spends_no_upstream_quota(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+    limiter = TokenBucketLimiter(rate=1.0, burst=1.0, clock=FakeClock())
+    monkeypatch.setattr(main, "catalog_breaker", breaker)
+    monkeypatch.setattr(main, "catalog_upstream_limiter", limiter)
+    monkeypatch.setattr(main, "get_catalog_client", lambda: HangingClient())
+
+    assert asyncio.run(main.fetch_catalog_page("gothic")) is None
+    with pytest.raises(RuntimeError):
+        asyncio.run(main.fetch_asset_details(["1"]))
+    assert limiter.allowed == 0
+    assert limiter.try_acquire() == 0.0
+
+
+def test_upstream_rejection_releases_probe_slot(monkeypatch):
+    breaker = half_open_breaker()
+    limiter = TokenBucketLimiter(rate=1.0, burst=1.0, clock=FakeClock())
+    limiter.try_acquire()
+    monkeypatch.setattr(main, "catalog_breaker", breaker)
+    monkeypatch.setattr(main, "catalog_upstream_limiter", limiter)
+
+    assert asyncio.run(main.fetch_catalog_page("gothic")) is None
+    assert breaker.allow_request()
@@ -0,0 +1,55 @@
+"""Per-user session memo and avoidance of recently shown items."""
+
+from agents import orchestrator
+from agents.contracts import OutfitRecord, TagSpec
+from server.sessions import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def outfit(*asset_ids):
+    return [OutfitRecord(str(asset_id), "shirt") for asset_id in asset_ids]
+
+
+def test_memo_answers_identical_requests_until_it_expires():
+    clock = FakeClock()
+    sessions = SessionStore(memo_ttl=30.0, clock=clock)
+    key = ("gothic", None)
+    sessions.record(1, key, outfit(11, 12))
+
+    clock.now = 30.0
+    assert [(item.assetId, item.type) for item in sessions.memo(1, key)] == [("11", "shirt"), ("12", "shirt")]
+    assert sessions.memo(1, ("pirate", None)) is None
+    assert sessions.memo(2, key) is None
+    clock.now = 30.1
+    assert sessions.memo(1, key) is None
+    assert (sessions.memo_hits, sessions.memo_misses) == (1, 3)
+
+
+def test_sessions_expire_after_idle_ttl():
+    clock = FakeClock()
+    sessions = SessionStore(ttl=60.0, clock=clock)
+    sessions.record(1, ("gothic", None), outfit(11))
+    clock.now = 61.0
+    assert sessions.seen(1) == frozenset()
+    assert sessions.recent_themes(1) == ()
+    assert len(sessions) == 0
+
+
+def test_seen_items_are_bounded_and_avoided():
+    sessions = SessionStore(max_seen=3, clock=FakeClock())
+    sessions.record(1, ("gothic", None), outfit(1, 2))
+    sessions.record(1, ("gothic", 1), outfit(3, 4))
+    assert sessions.seen(1) == {"2", "3", "4"}
+
+    candidates = {"shirt": outfit(3, 4, 5)}
+    tag_spec = TagSpec(theme="gothic", parts=["shirt"])
+    for seed in range(6):
+        picked = orchestrator.assemble(candidates, tag_spec, limit=6, seed=seed, seen=sessions.seen(1))
+        assert [item.assetId for item in picked] == ["5"]
@@ -0,0 +1,49 @@
+"""Coalescing of identical concurrent calls."""
+
+import asyncio
+
+import pytest
+
+from server.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_run_once():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["item"]
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("gothic", load) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert results == [["item"]] * 5
+    assert results[0] is results[4]
+    assert len(calls) == 1
+    assert (flight.leaders, flight.coalesced) == (1, 4)
+    assert not flight.in_flight("gothic")
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("gothic", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    # The failed call is forgotten, so the next caller retries
+    with pytest.raises(RuntimeError):
+        asyncio.run(flight.do("gothic", fail))
+    assert len(calls) == 2
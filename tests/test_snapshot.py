@@ -0,0 +1,74 @@
+"""Catalog snapshot round trip into the caches, and rejection of damaged files."""
+
+import pytest
+
+from agents.contracts import OutfitRecord
+from server import main
+from server.cache import TTLCache
+from server.catalog_pages import CatalogPage
+from server.snapshot import Snapshot, write_snapshot
+
+NOW = 1_700_000_000.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def write_sample(path):
+    shirt = OutfitRecord("101", "shirt", 25, 400)
+    pages = [
+        ("gothic", "1", 30, 0, CatalogPage([shirt, OutfitRecord("102", "pants")], "cursor-2"), 20.0),
+        ("gothic", "1", 30, 1, CatalogPage([shirt]), 10.0),
+        ("pirate", "1", 30, 0, CatalogPage([OutfitRecord("103", "hat", 5)]), 5000.0),
+    ]
+    details = [("101", ("shirt", 25, 400), 30.0), ("104", (None, None, None), 3.0)]
+    return write_snapshot(str(path), pages, details, now=NOW)
+
+
+def test_snapshot_round_trip_restores_the_caches(tmp_path):
+    path = tmp_path / "catalog-snapshot.bin"
+    assert write_sample(path)["pages"] == 3
+
+    clock = FakeClock()
+    clock.now = 100.0
+    pages_cache = TTLCache(ttl=300.0, stale_ttl=3600.0, clock=clock)
+    details_cache = TTLCache(ttl=300.0, stale_ttl=3600.0, clock=clock)
+    with Snapshot(str(path)) as snapshot:
+        pages = snapshot.pages(3900.0, 10, now=NOW)
+        details = snapshot.details(3900.0, 10, now=NOW)
+
+    # The expired page is dropped; the rest come back oldest first with their ages
+    assert [(keyword, number, age) for keyword, _, _, number, _, age in pages] == [
+        ("gothic", 0, 20.0), ("gothic", 1, 10.0)
+    ]
+    first = pages[0][4]
+    assert first.next_cursor == "cursor-2"
+    assert [(item.assetId, item.type, item.price, item.favorites) for item in first.items] == [
+        ("101", "shirt", 25, 400), ("102", "pants", None, None)
+    ]
+    assert details == [("101", ("shirt", 25, 400), 30.0), ("104", (None, None, None), 3.0)]
+
+    for keyword, category, _, number, page, age in pages:
+        assert pages_cache.restore((keyword, category, number), page, age)
+    for asset_id, value, age in details:
+        assert details_cache.restore(asset_id, value, age)
+    assert pages_cache.get(("gothic", "1", 1)).items == [OutfitRecord("101", "shirt", 25, 400)]
+    assert details_cache.entries()[0] == ("101", ("shirt", 25, 400), 30.0)
+
+
+def test_truncated_snapshot_is_rejected_and_ignored(tmp_path, monkeypatch):
+    path = tmp_path / "catalog-snapshot.bin"
+    write_sample(path)
+    path.write_bytes(path.read_bytes()[:-64])
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
+
+    monkeypatch.setattr(main, "CATALOG_SNAPSHOT_PATH", str(path))
+    monkeypatch.setattr(main, "snapshot_restore", {})
+    assert main.read_snapshot() is None
+    assert "error" in main.snapshot_restore